@@ -14,6 +14,7 @@ from django.utils.timezone import now
 from django.db.models import Q, Subquery, OuterRef
 from django.conf import settings
 
+from tg_bot.services.user_cache import tg_user_cache
 from server.logger import logger
 
 from tg_bot.bot.abstract import AbstractBot
@@ -494,18 +495,8 @@ class ParserBot(AbstractBot):
     async def handle_links(
         self, items, product_type, parse_func, update: Update, context: CallbackContext
     ):
-        user_obj = update.effective_user
         # Получаем или создаем пользователя
-        user, created = await TgUser.objects.aget_or_create(
-            tg_id=update.effective_user.id,
-            defaults={
-                "username": user_obj.username,
-                "first_name": user_obj.first_name,
-                "last_name": user_obj.last_name,
-                "language_code": user_obj.language_code,
-                "is_bot": user_obj.is_bot,
-            },
-        )
+        user = await tg_user_cache.get_user(update.effective_user)
 
         pictures = []
         default_template = await ProductTemplate.aget_default_template()
@@ -4,7 +4,7 @@ from django.utils.html import format_html
 
 from tg_bot.admin import BotFileInline
 from .models.team import Season, Team, Card
-from .models.roll import UserRoll, RosterUser
+from .models.roll import UserRoll, RosterUser, UserCollection, LeaderboardEntry, UserCardSummary
 from .models.tech import RollLimit, RarityWeight, BotText
 
 
@@ -126,6 +126,37 @@ class UserRollAdmin(admin.ModelAdmin):
     def has_add_permission(self, request):
         return False
 
+
+@admin.register(UserCollection)
+class UserCollectionAdmin(admin.ModelAdmin):
+    list_display = ["user", "season", "unique_count", "duplicates_count", "updated_at"]
+    list_filter = ["season"]
+    search_fields = ["user__username", "user__first_name", "user__tg_id"]
+    readonly_fields = ["user", "season", "card_counts", "unique_count", "duplicates_count", "updated_at"]
+
+    def has_add_permission(self, request):
+        return False
+
+@admin.register(LeaderboardEntry)
+class LeaderboardEntryAdmin(admin.ModelAdmin):
+    list_display = ["user", "season", "unique_count", "teams_completed", "completed_at", "updated_at"]
+    list_filter = ["season"]
+    search_fields = ["user__username", "user__first_name", "user__tg_id"]
+    readonly_fields = ["user", "season", "unique_count", "teams_completed", "completed_at", "updated_at"]
+
+    def has_add_permission(self, request):
+        return False
+
+@admin.register(UserCardSummary)
+class UserCardSummaryAdmin(admin.ModelAdmin):
+    list_display = ["user", "card", "season", "copies_total", "copies_burned", "first_rolled_at"]
+    list_filter = ["season"]
+    search_fields = ["user__username", "user__first_name", "user__tg_id", "card__name"]
+    readonly_fields = ["user", "card", "season", "copies_total", "copies_burned", "first_rolled_at", "last_rolled_at"]
+
+    def has_add_permission(self, request):
+        return False
+
 @admin.register(RosterUser)
 class RosterUserAdmin(admin.ModelAdmin):
     # Поля, которые отображаются в списке пользователей гачи
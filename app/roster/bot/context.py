@@ -0,0 +1,47 @@
+# roster/bot/context.py
+from tg_bot.models import TgUser, Bot
+
+from roster.models.team import Season
+from roster.models.tech import RollLimit
+
+
+class GachaContext:
+    """
+    Данные одного апдейта GachaBot.
+
+    Пользователь, бот, сезон и лимиты загружаются при первом обращении
+    и дальше берутся из памяти, поэтому хэндлеры и вспомогательные методы
+    могут запрашивать их сколько угодно раз за апдейт.
+    """
+
+    _NOT_LOADED = object()
+
+    def __init__(self, gacha_bot, tg_user):
+        self.gacha_bot = gacha_bot
+        self.tg_user = tg_user
+        self._user = self._NOT_LOADED
+        self._bot = self._NOT_LOADED
+        self._season = self._NOT_LOADED
+        self._limits = self._NOT_LOADED
+
+    async def get_user(self) -> TgUser:
+        if self._user is self._NOT_LOADED:
+            self._user = await self.gacha_bot.get_or_create_user(self.tg_user)
+        return self._user
+
+    async def get_bot(self) -> Bot | None:
+        if self._bot is self._NOT_LOADED:
+            self._bot = await self.gacha_bot.get_bot_instance()
+        return self._bot
+
+    async def get_season(self) -> Season | None:
+        if self._season is self._NOT_LOADED:
+            self._season = await self.gacha_bot.get_active_season(await self.get_bot())
+        return self._season
+
+    async def get_limits(self) -> list[RollLimit]:
+        """Все лимиты бота (обычные и премиум) одним запросом."""
+        if self._limits is self._NOT_LOADED:
+            bot = await self.get_bot()
+            self._limits = [limit async for limit in RollLimit.objects.filter(bot=bot)]
+        return self._limits
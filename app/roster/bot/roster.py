@@ -1,8 +1,5 @@
 # roster/bot.py
-import random
-import os
-import redis
-from datetime import timedelta
+from html import escape
 from typing import List
 from asgiref.sync import sync_to_async
 
@@ -23,18 +20,18 @@ from tg_bot.bot.abstract import AbstractBot
 from tg_bot.models import TgUser, Bot, BotFile
 
 from roster.models.team import Season, Team, Card
-from roster.models.roll import UserRoll, RosterUser
-from roster.models.tech import RollLimit, BotText, RarityWeight
-
+from roster.models.roll import RosterUser, UserCollection
+from roster.models.tech import BotText
+from roster.bot.context import GachaContext
+from roster.services.roll_limiter import roll_limiter
+from roster.services.collection import aget_collection, arecord_rolls, SeasonClosedError
+from roster.services.sampler import get_sampler
+from roster.services.layout import get_season_layout
+from roster.services.leaderboard import leaderboard
+
+from tg_bot.services.user_cache import tg_user_cache
 from server.logger import logger
 
-redis_client = redis.StrictRedis(
-    host=os.getenv("REDIS_HOST"),
-    port=os.getenv("REDIS_PORT"),
-    db=3,
-    decode_responses=True,
-)
-
 
 class GachaBot(AbstractBot):
     DEFAULT_LIMITS = {
@@ -43,6 +40,10 @@ class GachaBot(AbstractBot):
         "daily": 10,
         "craft": 5,
     }
+    MULTI_ROLL_COUNT = 10
+    LEADERBOARD_SIZE = 10
+    SEASON_CLOSED_TEXT = "🏁 Сезон только что завершился. Загляни позже!"
+
     def __init__(self):
         self.handlers = self.get_handlers()
 
@@ -51,6 +52,8 @@ class GachaBot(AbstractBot):
             CommandHandler("start", self.handle_start, filters.ChatType.PRIVATE),
             CommandHandler("me", self.handle_me, filters.ChatType.PRIVATE),
             CommandHandler(["roll", "get", "roll_craft"], self.handle_roll, filters.ChatType.PRIVATE),
+            CommandHandler("roll10", self.handle_multi_roll, filters.ChatType.PRIVATE),
+            CommandHandler("top", self.handle_top, filters.ChatType.PRIVATE),
             CallbackQueryHandler(
                 self.handle_roll_album, pattern=r"^rollimg_\d+(_\d+){2,11}$"
             ),
@@ -60,19 +63,10 @@ class GachaBot(AbstractBot):
 
     async def get_or_create_user(self, tg_user) -> TgUser:
         """Находит или создаёт TgUser по данным Telegram."""
-        user, _ = await TgUser.objects.aget_or_create(
-            tg_id=tg_user.id,
-            defaults={
-                "username": tg_user.username,
-                "first_name": tg_user.first_name,
-                "last_name": tg_user.last_name,
-                "language_code": tg_user.language_code,
-                "is_bot": tg_user.is_bot,
-            },
-        )
+        user = await tg_user_cache.get_user(tg_user)
         # 2. Находим или создаем гача-профиль для этого пользователя
         roster_user, _ = await RosterUser.objects.aget_or_create(
-            user=user,
+            user_id=user.pk,
             defaults={
                 "is_premium": False,
                 "description": "",
@@ -84,10 +78,9 @@ class GachaBot(AbstractBot):
         user.roster_user = roster_user
         return user
 
-    async def get_active_season(self) -> Season | None:
-        """Возвращает активный сезон или None."""
+    async def get_active_season(self, bot: Bot | None) -> Season | None:
+        """Возвращает активный сезон бота или None."""
         try:
-            bot = await self.get_bot_instance()
             return await Season.objects.filter(
                 is_active=True,
                 end_date__gte=now(),
@@ -105,30 +98,22 @@ class GachaBot(AbstractBot):
         
     async def get_roll_limits(
         self, 
-        tg_user, 
+        ctx: GachaContext, 
         limit_types: list[str] | str, 
     ) -> dict[str, int]:
         """
         Принимает список лимитов (или один лимит) и возвращает словарь {тип_лимита: значение}.
-        Делает ВСЕГО ОДИН запрос за пользователем и ОДИН запрос за всеми лимитами сразу.
+        Пользователь и все лимиты бота берутся из контекста апдейта (загружаются один раз).
         """
         # Переводим в список, если пришла одна строка
         if isinstance(limit_types, str):
             limit_types = [limit_types]
             
-        # 1. Один запрос за юзером (создание или получение)
-        bot = await self.get_bot_instance()
-        user = await self.get_or_create_user(tg_user)
+        user = await ctx.get_user()
         is_premium = user.roster_user.is_premium
 
-        # 2. Один запрос в базу: выгребаем сразу ВСЕ нужные лимиты для этого бота
-        # И для премиума, и обычные (чтобы сделать фоллбек в памяти, а не в БД)
-        limits_queryset = RollLimit.objects.filter(
-            bot=bot,
-            limit_type__in=limit_types
-        )
-        
-        db_limits = [limit async for limit in limits_queryset]
+        # И премиум, и обычные лимиты уже в памяти — фоллбек делаем без запросов к БД
+        db_limits = await ctx.get_limits()
         
         # Собираем финальный результат
         result = {}
@@ -147,34 +132,25 @@ class GachaBot(AbstractBot):
                 
         return result
     
-    async def get_gacha_stats(self, tg_user) -> dict:
+    async def get_gacha_stats(self, ctx: GachaContext, collection: UserCollection | None = None) -> dict:
         """
-        Считает уникальные карты и дубли пользователя за сезон (без учета скрафченных).
+        Возвращает уникальные карты и дубли пользователя за сезон (без учета скрафченных)
+        из сводки коллекции. Свежую сводку (например, после броска) можно передать в collection.
         Динамически подтягивает лимит на обмен карт и предлагает /roll_craft при наличии жетонов.
         """
-        user = await self.get_or_create_user(tg_user)
-        bot = await self.get_bot_instance()
-        season = await self.get_active_season()
+        if collection is None:
+            user = await ctx.get_user()
+            season = await ctx.get_season()
+            collection = await aget_collection(user.pk, season.id)
         
         # 1. Тянем лимит на крафт из нашей готовой системы лимитов
-        limits = await self.get_roll_limits(tg_user, "craft")
+        limits = await self.get_roll_limits(ctx, "craft")
         craft_limit = limits.get("craft", 5)
 
-        # 2. Тянем все живые роллы за сезон
-        active_rolls = []
-        async for roll in UserRoll.objects.filter(
-            user=user,
-            season=season,
-            is_used_for_craft=False
-        ):
-            active_rolls.append(roll.card_id)
-
-        total_active_count = len(active_rolls)
-        unique_collected_set = set(active_rolls)
-        unique_collected_count = len(unique_collected_set)
-        
-        # Считаем дубли: общее кол-во минус уникальные
-        duplicates_count = max(0, total_active_count - unique_collected_count)
+        # 2. Уникальные карты и дубли уже посчитаны в сводке
+        unique_collected_set = collection.collected_ids
+        unique_collected_count = collection.unique_count
+        duplicates_count = collection.duplicates_count
         
         # Сколько полных обменов доступно
         available_crafts = duplicates_count // craft_limit
@@ -206,17 +182,32 @@ class GachaBot(AbstractBot):
             "shop_text": shop_text,                       # Готовая строка с подсказкой или без
         }
         
+    async def reply_roll_denied(self, update: Update, admission, limits: dict) -> bool:
+        """Сообщает о кулдауне или исчерпанном лимите. Возвращает True, если бросок не допущен."""
+        if admission.cooldown_ttl > 0:
+            await update.message.reply_text(f"⏳ Подожди {admission.cooldown_ttl} сек. перед следующим броском!")
+            return True
+
+        if not admission:
+            if admission.daily_used >= limits["daily"]:
+                await update.message.reply_text(f"⛔ Дневной лимит исчерпан: {admission.daily_used}/{limits['daily']}.")
+            else:
+                await update.message.reply_text(f"⛔ Лимит за 2 часа исчерпан: {admission.bihourly_used}/{limits['bihourly']}.")
+            return True
+
+        return False
+
     # ─── /start ──────────────────────────────────────────────────────
 
     async def handle_start(self, update: Update, context: CallbackContext):
         """Приветствие и краткая справка."""
-        tg_user = update.effective_user
-        user = await self.get_or_create_user(tg_user)
-        bot = await self.get_bot_instance()
+        ctx = GachaContext(self, update.effective_user)
+        user = await ctx.get_user()
+        bot = await ctx.get_bot()
         
         limits = await self.get_roll_limits(
             limit_types=["daily"], 
-            tg_user=tg_user,
+            ctx=ctx,
         )
 
         try:
@@ -240,10 +231,10 @@ class GachaBot(AbstractBot):
     # ─── /roll (он же /get) ──────────────────────────────────────────
     async def handle_roll(self, update: Update, context: CallbackContext):
         """Случайный бросок карты."""
-        tg_user = update.effective_user
-        user = await self.get_or_create_user(tg_user)
-        bot = await self.get_bot_instance()
-        season = await self.get_active_season()
+        ctx = GachaContext(self, update.effective_user)
+        user = await ctx.get_user()
+        bot = await ctx.get_bot()
+        season = await ctx.get_season()
 
         # 1. Начальные проверки
         if not season:
@@ -251,101 +242,82 @@ class GachaBot(AbstractBot):
             return
 
         is_craft_mode = update.message.text.startswith("/roll_craft")
-        limits = await self.get_roll_limits(tg_user, ["cooldown", "daily", "bihourly", "craft"])
-        stats = await self.get_gacha_stats(tg_user)
-
-        # 2. Проверка кулдауна (Redis)
-        redis_key = f"roll:{user.tg_id}:{bot.id}"
-        if redis_client.exists(redis_key):
-            ttl = redis_client.ttl(redis_key)
-            await update.message.reply_text(f"⏳ Подожди {ttl} сек. перед следующим броском!")
-            return
+        limits = await self.get_roll_limits(ctx, ["cooldown", "daily", "bihourly", "craft"])
+        stats = await self.get_gacha_stats(ctx)
 
-        # 3. Проверка лимитов (БД)
-        day_ago = now() - timedelta(hours=24)
-        two_hours_ago = now() - timedelta(hours=2)
-        
-        rolls_today = await UserRoll.objects.filter(user=user, bot=bot, rolled_at__gte=day_ago).acount()
-        if rolls_today >= limits["daily"]:
-            await update.message.reply_text(f"⛔ Дневной лимит исчерпан: {rolls_today}/{limits['daily']}.")
+        # 2-3. Проверка кулдауна и лимитов с резервированием броска (Redis)
+        admission = await roll_limiter.admit(user, bot, limits)
+        if await self.reply_roll_denied(update, admission, limits):
             return
 
-        rolls_bihourly = await UserRoll.objects.filter(user=user, bot=bot, rolled_at__gte=two_hours_ago).acount()
-        if rolls_bihourly >= limits["bihourly"]:
-            await update.message.reply_text(f"⛔ Лимит за 2 часа исчерпан: {rolls_bihourly}/{limits['bihourly']}.")
-            return
+        # Резерв подтверждается только записанными бросками, иначе снимается
+        roll_ids = []
+        try:
+            await self._roll_card(update, ctx, limits, stats, is_craft_mode, roll_ids)
+        finally:
+            if roll_ids:
+                await roll_limiter.confirm(user, bot, admission, roll_ids)
+            else:
+                await roll_limiter.release(user, bot, admission)
+
+    async def _roll_card(self, update: Update, ctx: GachaContext, limits: dict, stats: dict, is_craft_mode: bool, roll_ids: list):
+        """Выбирает и записывает карту; ID записанного броска добавляется в roll_ids."""
+        user = await ctx.get_user()
+        bot = await ctx.get_bot()
+        season = await ctx.get_season()
 
         # 4. Логика крафта (проверка условий перед роллом)
         if is_craft_mode and stats["available_crafts"] < 1:
             await update.message.reply_text(f"❌ Недостаточно дубликатов. Нужно {limits['craft']}.")
             return
 
-        # 5. Выбор карты
-        all_cards = [card async for card in Card.objects.filter(team__season=season).select_related("team")]
+        # 5. Выбор карты (выборка по весам кэшируется на сезон)
+        try:
+            sampler = await get_sampler(season.id, bot.id)
+        except ValueError as e:
+            await update.message.reply_text(f"⚠️ Ошибка в формуле весов: {e}")
+            return
+
+        all_cards = sampler.cards
         if not all_cards:
             await update.message.reply_text("🃏 В сезоне пока нет карт.")
             return
         
+        exclude = None
         if is_craft_mode:
-            all_cards = [card for card in all_cards if card.id not in stats["collected_ids"]]
+            exclude = stats["collected_ids"]
+            all_cards = [card for card in all_cards if card.id not in exclude]
             if not all_cards:
                 await update.message.reply_text("🏆 Вы уже собрали ВСЕ карты! Крафт не нужен.")
                 return
 
-        rarity_weight = await RarityWeight.objects.filter(
-            bot=bot,
-            enabled=True
-        ).afirst()
-        
-        if rarity_weight:
-            # Кешируем веса по звездам чтобы не считать для каждой карты отдельно
-            star_weights = {}
-            try:
-                for star in set(card.stars for card in all_cards):
-                    star_weights[star] = rarity_weight.calculate_weight(star)
-                
-                weights = [star_weights[card.stars] for card in all_cards]
-            except ValueError as e:
-                await update.message.reply_text(f"⚠️ Ошибка в формуле весов: {e}")
-                return
-        else:
-            # Fallback если нет активной записи
-            import math
-            weights = [1 / (math.factorial(card.stars) * (card.stars + 1)) for card in all_cards]
-
-        picked_card = random.choices(all_cards, weights=weights, k=1)[0]
+        picked_card = sampler.draw(1, exclude=exclude)[0]
 
-        # 6. Запись броска в БД
-        await UserRoll.objects.acreate(user=user, bot=bot, card=picked_card, season=season)
+        # 6-7. Запись броска и списание дублей при крафте — одной транзакцией со сводкой коллекции
+        try:
+            new_roll_ids, burned_count, collection = await arecord_rolls(
+                user.pk,
+                bot.id,
+                season.id,
+                [picked_card.id],
+                burn_count=limits['craft'] if is_craft_mode else 0,
+            )
+        except SeasonClosedError:
+            await update.message.reply_text(self.SEASON_CLOSED_TEXT)
+            return
+        roll_ids.extend(new_roll_ids)
         
-        # 7. Обработка крафта (списание дублей)
         craft_notice = ""
         if is_craft_mode:
-            all_rolls = [r async for r in UserRoll.objects.filter(user=user, season=season, is_used_for_craft=False).order_by('rolled_at')]
-            seen_ids, to_burn = set(), []
-            for r in all_rolls:
-                if r.card_id in seen_ids: to_burn.append(r.id)
-                else: seen_ids.add(r.card_id)
-            
-            ids_to_update = to_burn[:limits['craft']]
-            await UserRoll.objects.filter(id__in=ids_to_update).aupdate(is_used_for_craft=True)
-            craft_notice = f"🔥 Использовано {len(ids_to_update)} дубликатов!\n\n"
+            craft_notice = f"🔥 Использовано {burned_count} дубликатов!\n\n"
 
-        # 8. Обновление данных для интерфейса
-        stats = await self.get_gacha_stats(tg_user)
+        # 8. Обновление данных для интерфейса и рейтинга
+        stats = await self.get_gacha_stats(ctx, collection)
         collected_ids = stats["collected_ids"]
+        await leaderboard.record(season.id, user.pk, await get_season_layout(season.id), collected_ids)
         
         # 9. Формирование клавиатуры
-        teams = [t async for t in Team.objects.filter(season=season).order_by("name").prefetch_related("cards")]
-        keyboard = []
-        for team in teams:
-            cards = [c async for c in team.cards.all().order_by("id")]
-            team_collected = sum(1 for c in cards if c.id in collected_ids)
-            status = "✅ " if team_collected == len(cards) and len(cards) > 0 else "🃏 "
-            
-            slots = [str(c.id) if c.id in collected_ids else "0" for c in cards[:10]]
-            keyboard.append([InlineKeyboardButton(f"{status}{team.name} ({team_collected}/{len(cards)})", 
-                             callback_data=f"rollimg_{team.id}_" + "_".join(slots))])
+        keyboard = await self.build_collection_keyboard(season, collected_ids)
 
     # 10. Ответ пользователю
         try:
@@ -375,15 +347,124 @@ class GachaBot(AbstractBot):
                                          caption=text, reply_markup=InlineKeyboardMarkup(keyboard), 
                                          parse_mode=ParseMode.HTML)
 
-        # 11. Установка кулдауна в конце
-        redis_client.setex(redis_key, limits["cooldown"], picked_card.id)
+    # ─── /roll10 ─────────────────────────────────────────────────────
+    async def handle_multi_roll(self, update: Update, context: CallbackContext):
+        """Серия бросков: до MULTI_ROLL_COUNT карт за одну проверку лимитов и одну запись."""
+        ctx = GachaContext(self, update.effective_user)
+        user = await ctx.get_user()
+        bot = await ctx.get_bot()
+        season = await ctx.get_season()
+
+        if not season:
+            await update.message.reply_text("⏳ Сейчас нет активного сезона. Загляни позже!")
+            return
+
+        limits = await self.get_roll_limits(ctx, ["cooldown", "daily", "bihourly", "craft"])
+
+        # Резервируем сразу min(MULTI_ROLL_COUNT, остаток лимитов) бросков
+        admission = await roll_limiter.admit(user, bot, limits, count=self.MULTI_ROLL_COUNT)
+        if await self.reply_roll_denied(update, admission, limits):
+            return
+
+        roll_ids = []
+        try:
+            await self._roll_cards(update, ctx, admission.allowed, roll_ids)
+        finally:
+            if roll_ids:
+                await roll_limiter.confirm(user, bot, admission, roll_ids)
+            else:
+                await roll_limiter.release(user, bot, admission)
+
+    async def _roll_cards(self, update: Update, ctx: GachaContext, count: int, roll_ids: list):
+        """Вытягивает count карт одним вызовом выборки и записывает их одним bulk_create."""
+        user = await ctx.get_user()
+        bot = await ctx.get_bot()
+        season = await ctx.get_season()
+
+        try:
+            sampler = await get_sampler(season.id, bot.id)
+        except ValueError as e:
+            await update.message.reply_text(f"⚠️ Ошибка в формуле весов: {e}")
+            return
+
+        if not sampler.cards:
+            await update.message.reply_text("🃏 В сезоне пока нет карт.")
+            return
+
+        collected_before = (await self.get_gacha_stats(ctx))["collected_ids"]
+        picked_cards = sampler.draw(count)
+
+        try:
+            new_roll_ids, _, collection = await arecord_rolls(
+                user.pk,
+                bot.id,
+                season.id,
+                [card.id for card in picked_cards],
+            )
+        except SeasonClosedError:
+            await update.message.reply_text(self.SEASON_CLOSED_TEXT)
+            return
+        roll_ids.extend(new_roll_ids)
+
+        stats = await self.get_gacha_stats(ctx, collection)
+        await leaderboard.record(season.id, user.pk, await get_season_layout(season.id), stats["collected_ids"])
+
+        # Альбом с вытянутыми картами (MULTI_ROLL_COUNT не больше 10 — лимит медиагруппы)
+        image_ids = await Card.aget_image_ids(picked_cards, bot.id)
+        seen_ids = set(collected_before)
+        media_group = []
+        lines = []
+        for card in picked_cards:
+            is_new = card.id not in seen_ids
+            seen_ids.add(card.id)
+            line = f"{'⭐' * card.stars} <b>{card.name}</b> — {card.team.name}{' 🆕' if is_new else ''}"
+            lines.append(line)
+            media_group.append(
+                InputMediaPhoto(
+                    media=image_ids[card.id],
+                    caption=line,
+                    parse_mode=ParseMode.HTML,
+                )
+            )
+
+        # Медиагруппа в Telegram — от 2 до 10 элементов, одну карту шлем фото
+        if len(media_group) == 1:
+            await update.message.reply_photo(photo=media_group[0].media, caption=lines[0], parse_mode=ParseMode.HTML)
+        else:
+            await update.message.reply_media_group(media=media_group)
+
+        new_count = len(seen_ids) - len(collected_before)
+        text = (
+            f"🎲 Бросков: {len(picked_cards)}\n\n"
+            + "\n".join(lines)
+            + f"\n\n🆕 Новых карт: {new_count}\n"
+            f"📊 Прогресс: {stats['unique_count']}/{len(sampler.cards)} уникальных карт\n"
+            f"{stats['shop_text']}"
+        )
+        keyboard = await self.build_collection_keyboard(season, stats["collected_ids"])
+        await update.message.reply_html(text, reply_markup=InlineKeyboardMarkup(keyboard))
+
+    async def build_collection_keyboard(self, season: Season, collected_ids: set) -> list:
+        """Кнопки альбомов команд с прогрессом пользователя."""
+        layout = await get_season_layout(season.id)
+        keyboard = []
+        for team in layout.teams_by_name:
+            cards = team.cards
+            team_collected = team.count_collected(collected_ids)
+            status = "✅ " if team_collected == len(cards) and len(cards) > 0 else "🃏 "
+            
+            slots = [str(c.id) if c.id in collected_ids else "0" for c in cards[:10]]
+            keyboard.append([InlineKeyboardButton(f"{status}{team.name} ({team_collected}/{len(cards)})", 
+                             callback_data=f"rollimg_{team.id}_" + "_".join(slots))])
+        return keyboard
     
     async def handle_roll_album(self, update: Update, context: CallbackContext):
         """Показывает альбом команды, где открытые карты = image, скрытые = image_hidden."""
         query = update.callback_query
         await query.answer()
 
-        bot = await self.get_bot_instance()
+        ctx = GachaContext(self, update.effective_user)
+        bot = await ctx.get_bot()
         if not bot:
             await query.edit_message_text("🤖 Бот не настроен.")
             return
@@ -450,42 +531,77 @@ class GachaBot(AbstractBot):
                 media=media_group,
             )
 
+    # ─── /top ────────────────────────────────────────────────────────
+
+    async def handle_top(self, update: Update, context: CallbackContext):
+        """Рейтинг сезона по уникальным картам и место пользователя."""
+        ctx = GachaContext(self, update.effective_user)
+        user = await ctx.get_user()
+        season = await ctx.get_season()
+
+        if not season:
+            await update.message.reply_text("⏳ Сейчас нет активного сезона.")
+            return
+
+        top = await leaderboard.get_top(season.id, self.LEADERBOARD_SIZE)
+        if not top:
+            await update.message.reply_text("🏁 В рейтинге пока никого нет. Сделай первый /roll!")
+            return
+
+        layout = await get_season_layout(season.id)
+        users = {
+            tg_user.id: tg_user
+            async for tg_user in TgUser.objects.filter(id__in=[entry.user_id for entry in top])
+        }
+        medals = {1: "🥇", 2: "🥈", 3: "🥉"}
+
+        lines = []
+        for entry in top:
+            player = users.get(entry.user_id)
+            if player and player.username:
+                name = f"@{escape(player.username)}"
+            else:
+                name = escape((player and player.first_name) or "Игрок")
+            completed = " 🏆" if entry.completed_at else ""
+            lines.append(
+                f"{medals.get(entry.rank, f'{entry.rank}.')} {name} — "
+                f"{entry.unique_count}/{layout.cards_count} карт, команд: {entry.teams_completed}{completed}"
+            )
+
+        me = await leaderboard.get_rank(season.id, user.pk)
+        if me:
+            my_line = f"📍 Твое место: {me.rank} ({me.unique_count}/{layout.cards_count} карт)"
+        else:
+            my_line = "📍 Тебя пока нет в рейтинге"
+
+        await update.message.reply_html(
+            f"🏆 <b>Рейтинг — {season.name}</b>\n\n" + "\n".join(lines) + f"\n\n{my_line}"
+        )
+
     # ─── /me ─────────────────────────────────────────────────────────
 
     async def handle_me(self, update: Update, context: CallbackContext):
         """Показывает прогресс пользователя за текущий сезон."""
-        tg_user = update.effective_user
-        user = await self.get_or_create_user(tg_user)
-        bot = await self.get_bot_instance()
-        season = await self.get_active_season()
+        ctx = GachaContext(self, update.effective_user)
+        user = await ctx.get_user()
+        bot = await ctx.get_bot()
+        season = await ctx.get_season()
 
         if not season:
             await update.message.reply_text("⏳ Сейчас нет активного сезона.")
             return
         
-        # Гарантируем создание/получение пользователя со связью RosterUser
-        user = await self.get_or_create_user(tg_user)
         is_premium = user.roster_user.is_premium
 
         # ─── 1. Сбор лимитов и состояния бросков ──────────────────────
-        limits = await self.get_roll_limits(tg_user, ["cooldown", "daily"])
+        limits = await self.get_roll_limits(ctx, ["cooldown", "daily"])
         cooldown_sec = limits.get("cooldown")
         daily_limit = limits.get("daily")
         
-        # Сколько уже сделано за последние 24 часа
-        day_ago = now() - timedelta(hours=24)
-        rolls_today = await UserRoll.objects.filter(
-            user=user,
-            bot=bot,
-            rolled_at__gte=day_ago,
-        ).acount()
-        
+        # Сколько уже сделано за последние 24 часа и текущий кулдаун (Redis)
+        rolls_today, ttl = await roll_limiter.get_usage(user, bot)
         available_rolls = max(0, daily_limit - rolls_today)
         
-        # Проверяем текущий кулдаун в Redis
-        redis_key = f"roll:{user.tg_id}:{bot.id}"
-        ttl = redis_client.ttl(redis_key) if redis_client.exists(redis_key) else 0
-        
         if available_rolls == 0:
             cooldown_status = "❌ Попытки на сегодня исчерпаны. Жди обновления лимитов!\n"
         elif ttl > 0:
@@ -496,26 +612,17 @@ class GachaBot(AbstractBot):
         premium_status = "Да" if is_premium else "Нет ( /buy_premium )"
 
         # ─── 2. Сбор статистики по картам и командам ──────────────────
-        rolls = UserRoll.objects.filter(
-            user=user,
-            season=season,
-        ).select_related("card", "card__team")
-
-        teams_dict: dict = {}
-        async for roll in rolls:
-            team_name = roll.card.team.name
-            if team_name not in teams_dict:
-                teams_dict[team_name] = set()
-            teams_dict[team_name].add(roll.card.name)
-
-        all_teams = Team.objects.filter(season=season).prefetch_related("cards")
+        collection = await aget_collection(user.pk, season.id)
+        collected_ids = collection.collected_ids
+
+        layout = await get_season_layout(season.id)
         all_cards_count = 0
         collected_count = 0
         teams_lines = []
 
-        async for team in all_teams:
-            team_cards = [card async for card in team.cards.all()]
-            collected = teams_dict.get(team.name, set())
+        for team in layout.teams:
+            team_cards = team.cards
+            collected = {card.name for card in team_cards if card.id in collected_ids}
             team_collected = len(collected)
             team_total = len(team_cards)
 
@@ -0,0 +1,61 @@
+# roster/management/commands/benchmark_rarity_formula.py
+import math
+import timeit
+
+from django.core.management.base import BaseCommand
+
+from roster.models.tech import RarityWeight
+from roster.services.formula import compile_formula, evaluate_range, STAR_RANGE
+
+
+def legacy_weights(formula, coefficient):
+    """Прежний способ: подстановка {star} и eval на каждую звезду."""
+    safe_dict = {
+        '__builtins__': {},
+        'math': math,
+        'abs': abs,
+        'round': round,
+        'min': min,
+        'max': max,
+    }
+    return {
+        star: float(eval(formula.replace('{star}', str(star)), {"__builtins__": {}}, safe_dict)) * coefficient
+        for star in STAR_RANGE
+    }
+
+
+class Command(BaseCommand):
+    help = 'Сравнивает скорость расчета весов редкости: eval формулы против скомпилированной формулы'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--formula',
+            type=str,
+            default=RarityWeight._meta.get_field('formula').default,
+            help='Формула с {star} (по умолчанию — формула модели)',
+        )
+        parser.add_argument(
+            '--number',
+            type=int,
+            default=10000,
+            help='Количество расчетов всего диапазона ★1-★5',
+        )
+
+    def handle(self, *args, **options):
+        formula = options['formula']
+        number = options['number']
+
+        legacy = legacy_weights(formula, 1.0)
+        compiled = evaluate_range(formula)
+        if any(not math.isclose(legacy[star], compiled[star]) for star in STAR_RANGE):
+            self.stdout.write(self.style.ERROR(f'Результаты расходятся: {legacy} != {compiled}'))
+            return
+
+        compile_formula.cache_clear()
+        legacy_time = timeit.timeit(lambda: legacy_weights(formula, 1.0), number=number)
+        compiled_time = timeit.timeit(lambda: evaluate_range(formula), number=number)
+
+        self.stdout.write(f'Формула: {formula}')
+        self.stdout.write(f'eval:          {legacy_time / number * 1e6:.2f} мкс на диапазон')
+        self.stdout.write(f'скомпилирована: {compiled_time / number * 1e6:.2f} мкс на диапазон')
+        self.stdout.write(self.style.SUCCESS(f'Ускорение: x{legacy_time / compiled_time:.1f}'))
@@ -0,0 +1,208 @@
+# roster/management/commands/close_season.py
+import os
+import gzip
+import json
+from datetime import timedelta
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db import transaction
+from django.db.models import Count, Min, Max, Q
+from django.utils.timezone import now
+
+from roster.models.team import Season
+from roster.models.roll import UserRoll, UserRollArchive, UserCardSummary, UserCollection
+from roster.services.collection import lock_season
+from roster.services.leaderboard import get_keys, SEASONS_KEY
+from roster.services.roll_limiter import WINDOW_KEY_TEMPLATE, ROLL_MEMBER
+from roster.tasks import redis_client, rebuild_leaderboard
+
+
+class Command(BaseCommand):
+    help = (
+        'Закрывает неактивный сезон: сводит броски в UserCardSummary, '
+        'опционально выгружает их в gzip JSONL и переносит UserRoll в архив'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--season-id',
+            type=int,
+            required=True,
+            help='ID сезона',
+        )
+        parser.add_argument(
+            '--export',
+            type=str,
+            help='Путь к файлу .jsonl.gz для выгрузки бросков перед переносом',
+        )
+        parser.add_argument(
+            '--no-archive',
+            action='store_true',
+            help='Удалить броски без переноса в UserRollArchive (останутся только итоги и выгрузка)',
+        )
+        parser.add_argument(
+            '--batch-size',
+            type=int,
+            default=5000,
+            help='Сколько бросков переносить за одну транзакцию (по умолчанию: 5000)',
+        )
+        parser.add_argument(
+            '--force',
+            action='store_true',
+            help='Закрыть сезон, даже если он активен и еще не закончился',
+        )
+
+    def handle(self, *args, **options):
+        try:
+            season = Season.objects.get(id=options['season_id'])
+        except Season.DoesNotExist:
+            raise CommandError(f"Сезон {options['season_id']} не найден")
+
+        if season.is_active and season.end_date > now() and not options['force']:
+            raise CommandError(f'Сезон "{season.name}" еще идет. Используйте --force, чтобы закрыть его')
+
+        # Выгрузка предыдущего запуска могла содержать броски, которых уже нет в UserRoll
+        if options['export'] and os.path.exists(options['export']):
+            raise CommandError(f"Файл {options['export']} уже существует, укажите другой путь для выгрузки")
+
+        rolls = UserRoll.objects.filter(season=season)
+        if options['no_archive'] and not options['export']:
+            self.stdout.write(self.style.WARNING('Броски будут удалены без архива и выгрузки'))
+
+        self.stop_rolls(season)
+
+        # Итоги считаются до переноса. Если запуск прервался посреди переноса,
+        # пересчет по оставшимся броскам испортил бы их — поэтому не трогаем.
+        if UserCardSummary.objects.filter(season=season).exists():
+            self.stdout.write('Итоги по картам уже посчитаны предыдущим запуском')
+        else:
+            summaries = self.write_summaries(season, rolls)
+            self.stdout.write(f'Итогов по картам: {summaries}')
+            # Итоговый рейтинг — по всем броскам, пока они еще в UserRoll
+            players = rebuild_leaderboard(season.id)
+            self.stdout.write(f'Мест в итоговом рейтинге: {players}')
+
+        if options['export']:
+            exported = self.export_rolls(rolls, options['export'])
+            self.stdout.write(f"Выгружено бросков: {exported} → {options['export']}")
+
+        moved = self.move_rolls(rolls, options['batch_size'], archive=not options['no_archive'])
+        self.stdout.write(f'Перенесено из UserRoll: {moved}')
+
+        self.cleanup(season)
+
+        season.closed_at = now()
+        season.is_active = False
+        season.save(update_fields=['closed_at', 'is_active'])
+
+        self.stdout.write(self.style.SUCCESS(f'Сезон "{season.name}" закрыт'))
+
+    def stop_rolls(self, season):
+        """
+        Снимает сезон с активных до подсчета итогов. Исключительная блокировка
+        дожидается бросков, которые уже записываются; новые броски после неё
+        видят неактивный сезон и отклоняются (record_rolls).
+        """
+        with transaction.atomic():
+            lock_season(season.id, shared=False)
+            Season.objects.filter(id=season.id).update(is_active=False)
+        season.is_active = False
+
+    def cleanup(self, season):
+        """Сводки коллекций и живой рейтинг закрытого сезона больше не нужны."""
+        deleted, _ = UserCollection.objects.filter(season=season).delete()
+        self.stdout.write(f'Удалено сводок коллекций: {deleted}')
+
+        keys = get_keys(season.id)
+        pipe = redis_client.pipeline(transaction=True)
+        pipe.delete(*keys.values())
+        pipe.srem(SEASONS_KEY, season.id)
+        pipe.execute()
+
+    def write_summaries(self, season, rolls) -> int:
+        """Один GROUP BY по (пользователь, карта) и upsert итогов."""
+        rows = rolls.values('user_id', 'card_id').annotate(
+            copies_total=Count('id'),
+            copies_burned=Count('id', filter=Q(is_used_for_craft=True)),
+            first_rolled_at=Min('rolled_at'),
+            last_rolled_at=Max('rolled_at'),
+        ).order_by()
+
+        summaries = [
+            UserCardSummary(season=season, **row)
+            for row in rows.iterator()
+        ]
+        UserCardSummary.objects.bulk_create(
+            summaries,
+            batch_size=1000,
+            update_conflicts=True,
+            unique_fields=['season', 'user', 'card'],
+            update_fields=['copies_total', 'copies_burned', 'first_rolled_at', 'last_rolled_at'],
+        )
+        return len(summaries)
+
+    def export_rolls(self, rolls, path) -> int:
+        exported = 0
+        fields = ['id', 'user_id', 'bot_id', 'card_id', 'season_id', 'rolled_at', 'is_used_for_craft']
+        # 'x' — не перезаписывать существующий файл, даже если он появился после проверки
+        with gzip.open(path, 'xt', encoding='utf-8') as export_file:
+            for row in rolls.order_by('id').values(*fields).iterator(chunk_size=5000):
+                row['rolled_at'] = row['rolled_at'].isoformat()
+                export_file.write(json.dumps(row, ensure_ascii=False) + '\n')
+                exported += 1
+        return exported
+
+    def move_rolls(self, rolls, batch_size, archive=True) -> int:
+        """
+        Переносит броски пачками, каждая пачка — отдельная транзакция.
+        Перенесенные броски убираются из окон лимитов в Redis.
+        """
+        moved = 0
+        while True:
+            with transaction.atomic():
+                batch = list(
+                    rolls.order_by('id').select_for_update(of=('self',)).values(
+                        'id', 'user_id', 'bot_id', 'card_id', 'season_id', 'rolled_at', 'is_used_for_craft',
+                        'user__tg_id',
+                    )[:batch_size]
+                )
+                if not batch:
+                    break
+                window_members = self.get_window_members(batch)
+                for row in batch:
+                    del row['user__tg_id']
+
+                if archive:
+                    UserRollArchive.objects.bulk_create([
+                        UserRollArchive(original_id=row['id'], **{k: v for k, v in row.items() if k != 'id'})
+                        for row in batch
+                    ])
+                # Без сигналов: ради сброса сводок закрытого сезона Django загрузил бы
+                # каждый бросок в память и удалял бы их по одному
+                batch_rolls = UserRoll.objects.filter(id__in=[row['id'] for row in batch])
+                batch_rolls._raw_delete(batch_rolls.db)
+
+            self.remove_from_windows(window_members)
+            moved += len(batch)
+            self.stdout.write(f'  ...{moved}')
+        return moved
+
+    def get_window_members(self, batch) -> dict:
+        """Элементы окон бросков (roll:window:*) за последние сутки: ключ окна -> ["u:{id}", ...]."""
+        window_start = now() - timedelta(hours=24)
+        members = {}
+        for row in batch:
+            if row['rolled_at'] < window_start:
+                continue
+            window_key = WINDOW_KEY_TEMPLATE.format(tg_id=row['user__tg_id'], bot_id=row['bot_id'])
+            members.setdefault(window_key, []).append(ROLL_MEMBER.format(roll_id=row['id']))
+        return members
+
+    def remove_from_windows(self, window_members: dict):
+        # Иначе reconcile_roll_windows удалит их сам, не найдя в UserRoll
+        if not window_members:
+            return
+        pipe = redis_client.pipeline(transaction=False)
+        for window_key, members in window_members.items():
+            pipe.zrem(window_key, *members)
+        pipe.execute()
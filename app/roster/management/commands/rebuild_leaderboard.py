@@ -0,0 +1,31 @@
+# roster/management/commands/rebuild_leaderboard.py
+from django.core.management.base import BaseCommand, CommandError
+
+from roster.models.team import Season
+from roster.tasks import rebuild_leaderboard
+
+
+class Command(BaseCommand):
+    help = 'Пересобирает рейтинг сезона (Redis и LeaderboardEntry) по UserRoll'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--season-id',
+            type=int,
+            help='ID сезона (по умолчанию — все активные сезоны)',
+        )
+
+    def handle(self, *args, **options):
+        if options['season_id']:
+            season = Season.objects.filter(id=options['season_id']).first()
+            if not season:
+                raise CommandError(f"Сезон {options['season_id']} не найден")
+            if season.closed_at:
+                raise CommandError(f"Сезон {season.id} закрыт: его рейтинг итоговый и не пересобирается")
+            season_ids = [options['season_id']]
+        else:
+            season_ids = list(Season.objects.filter(is_active=True, closed_at__isnull=True).values_list('id', flat=True))
+
+        for season_id in season_ids:
+            players = rebuild_leaderboard(season_id)
+            self.stdout.write(self.style.SUCCESS(f'Сезон {season_id}: пересобрано {players} игроков'))
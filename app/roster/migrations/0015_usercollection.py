@@ -0,0 +1,32 @@
+# Generated by Django 5.2 on 2026-10-19 10:52
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('roster', '0014_alter_bottext_text_type'),
+        ('tg_bot', '0038_bot_username'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='UserCollection',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('card_counts', models.JSONField(default=dict, help_text='ID карты → количество живых (не сожженных в крафте) копий', verbose_name='Карты')),
+                ('unique_count', models.PositiveIntegerField(default=0, verbose_name='Уникальных карт')),
+                ('duplicates_count', models.PositiveIntegerField(default=0, verbose_name='Дублей')),
+                ('updated_at', models.DateTimeField(auto_now=True, verbose_name='Обновлено')),
+                ('season', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='collections', to='roster.season', verbose_name='Сезон')),
+                ('user', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='collections', to='tg_bot.tguser', verbose_name='Пользователь')),
+            ],
+            options={
+                'verbose_name': 'Коллекция пользователя',
+                'verbose_name_plural': 'Коллекции пользователей',
+                'constraints': [models.UniqueConstraint(fields=('user', 'season'), name='unique_user_season_collection')],
+            },
+        ),
+    ]
@@ -0,0 +1,34 @@
+# Generated by Django 5.2 on 2026-10-19 10:56
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('roster', '0015_usercollection'),
+        ('tg_bot', '0038_bot_username'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='LeaderboardEntry',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('unique_count', models.PositiveIntegerField(default=0, verbose_name='Уникальных карт')),
+                ('teams_completed', models.PositiveIntegerField(default=0, verbose_name='Собрано команд')),
+                ('completed_at', models.DateTimeField(blank=True, help_text='Время первого полного сбора всех карт сезона', null=True, verbose_name='Коллекция собрана')),
+                ('updated_at', models.DateTimeField(auto_now=True, verbose_name='Обновлено')),
+                ('season', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='leaderboard', to='roster.season', verbose_name='Сезон')),
+                ('user', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='leaderboard_entries', to='tg_bot.tguser', verbose_name='Пользователь')),
+            ],
+            options={
+                'verbose_name': 'Место в рейтинге',
+                'verbose_name_plural': 'Рейтинг',
+                'ordering': ['-unique_count', 'completed_at'],
+                'indexes': [models.Index(fields=['season', '-unique_count'], name='roster_lead_season__c65161_idx')],
+                'constraints': [models.UniqueConstraint(fields=('season', 'user'), name='unique_season_user_leaderboard')],
+            },
+        ),
+    ]
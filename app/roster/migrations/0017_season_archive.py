@@ -0,0 +1,55 @@
+# Generated by Django 5.2 on 2026-10-19 10:57
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('roster', '0016_leaderboardentry'),
+        ('tg_bot', '0038_bot_username'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='season',
+            name='closed_at',
+            field=models.DateTimeField(blank=True, help_text='Когда броски сезона были сведены в итоги и перенесены в архив (close_season)', null=True, verbose_name='Закрыт'),
+        ),
+        migrations.CreateModel(
+            name='UserRollArchive',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('original_id', models.BigIntegerField(verbose_name='ID в UserRoll')),
+                ('rolled_at', models.DateTimeField(verbose_name='Время ролла')),
+                ('is_used_for_craft', models.BooleanField(default=False, verbose_name='Использовано для крафта')),
+                ('bot', models.ForeignKey(db_index=False, on_delete=django.db.models.deletion.CASCADE, related_name='archived_rolls', to='tg_bot.bot', verbose_name='Бот')),
+                ('card', models.ForeignKey(db_index=False, on_delete=django.db.models.deletion.CASCADE, related_name='archived_rolls', to='roster.card', verbose_name='Карта')),
+                ('season', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='archived_rolls', to='roster.season', verbose_name='Сезон')),
+                ('user', models.ForeignKey(db_index=False, on_delete=django.db.models.deletion.CASCADE, related_name='archived_rolls', to='tg_bot.tguser', verbose_name='Пользователь')),
+            ],
+            options={
+                'verbose_name': 'Архивный ролл',
+                'verbose_name_plural': 'Архив роллов',
+            },
+        ),
+        migrations.CreateModel(
+            name='UserCardSummary',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('copies_total', models.PositiveIntegerField(default=0, verbose_name='Всего копий')),
+                ('copies_burned', models.PositiveIntegerField(default=0, verbose_name='Сожжено в крафте')),
+                ('first_rolled_at', models.DateTimeField(verbose_name='Первый ролл')),
+                ('last_rolled_at', models.DateTimeField(verbose_name='Последний ролл')),
+                ('card', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='summaries', to='roster.card', verbose_name='Карта')),
+                ('season', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='card_summaries', to='roster.season', verbose_name='Сезон')),
+                ('user', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='card_summaries', to='tg_bot.tguser', verbose_name='Пользователь')),
+            ],
+            options={
+                'verbose_name': 'Итог по карте',
+                'verbose_name_plural': 'Итоги по картам',
+                'constraints': [models.UniqueConstraint(fields=('season', 'user', 'card'), name='unique_season_user_card_summary')],
+            },
+        ),
+    ]
@@ -75,4 +75,190 @@ class UserRoll(models.Model):
         ]
 
     def __str__(self):
-        return f"{self.user} → {self.card} ({self.rolled_at:%d.%m.%Y %H:%M})"
\ No newline at end of file
+        return f"{self.user} → {self.card} ({self.rolled_at:%d.%m.%Y %H:%M})"
+
+class UserCollection(models.Model):
+    """
+    Сводка коллекции пользователя за сезон.
+    Обновляется в одной транзакции с роллами и крафтом (roster.services.collection),
+    чтобы статистика читалась одной строкой, а не перебором UserRoll.
+    """
+    user = models.ForeignKey(
+        'tg_bot.TgUser',
+        on_delete=models.CASCADE,
+        related_name='collections',
+        verbose_name='Пользователь'
+    )
+    season = models.ForeignKey(
+        Season,
+        on_delete=models.CASCADE,
+        related_name='collections',
+        verbose_name='Сезон'
+    )
+    card_counts = models.JSONField(
+        default=dict,
+        verbose_name='Карты',
+        help_text='ID карты → количество живых (не сожженных в крафте) копий'
+    )
+    unique_count = models.PositiveIntegerField(default=0, verbose_name='Уникальных карт')
+    duplicates_count = models.PositiveIntegerField(default=0, verbose_name='Дублей')
+    updated_at = models.DateTimeField(auto_now=True, verbose_name='Обновлено')
+
+    class Meta:
+        verbose_name = 'Коллекция пользователя'
+        verbose_name_plural = 'Коллекции пользователей'
+        constraints = [
+            models.UniqueConstraint(fields=['user', 'season'], name='unique_user_season_collection'),
+        ]
+
+    def __str__(self):
+        return f"{self.user} — {self.season}: {self.unique_count} уник., {self.duplicates_count} дублей"
+
+    @property
+    def collected_ids(self) -> set[int]:
+        return {int(card_id) for card_id, count in self.card_counts.items() if count > 0}
+
+    def add_cards(self, card_ids):
+        for card_id in card_ids:
+            key = str(card_id)
+            self.card_counts[key] = self.card_counts.get(key, 0) + 1
+        self.recalculate()
+
+    def remove_cards(self, card_ids):
+        for card_id in card_ids:
+            key = str(card_id)
+            count = self.card_counts.get(key, 0) - 1
+            if count > 0:
+                self.card_counts[key] = count
+            else:
+                self.card_counts.pop(key, None)
+        self.recalculate()
+
+    def recalculate(self):
+        self.unique_count = len(self.card_counts)
+        self.duplicates_count = sum(self.card_counts.values()) - self.unique_count
+
+
+class LeaderboardEntry(models.Model):
+    """
+    Сохраненная копия рейтинга сезона. Живой рейтинг хранится в Redis
+    (roster.services.leaderboard) и периодически переносится сюда.
+    """
+    season = models.ForeignKey(
+        Season,
+        on_delete=models.CASCADE,
+        related_name='leaderboard',
+        verbose_name='Сезон'
+    )
+    user = models.ForeignKey(
+        'tg_bot.TgUser',
+        on_delete=models.CASCADE,
+        related_name='leaderboard_entries',
+        verbose_name='Пользователь'
+    )
+    unique_count = models.PositiveIntegerField(default=0, verbose_name='Уникальных карт')
+    teams_completed = models.PositiveIntegerField(default=0, verbose_name='Собрано команд')
+    completed_at = models.DateTimeField(
+        null=True,
+        blank=True,
+        verbose_name='Коллекция собрана',
+        help_text='Время первого полного сбора всех карт сезона'
+    )
+    updated_at = models.DateTimeField(auto_now=True, verbose_name='Обновлено')
+
+    class Meta:
+        ordering = ['-unique_count', 'completed_at']
+        verbose_name = 'Место в рейтинге'
+        verbose_name_plural = 'Рейтинг'
+        constraints = [
+            models.UniqueConstraint(fields=['season', 'user'], name='unique_season_user_leaderboard'),
+        ]
+        indexes = [
+            models.Index(fields=['season', '-unique_count']),
+        ]
+
+    def __str__(self):
+        return f"{self.user} — {self.season}: {self.unique_count}"
+
+
+class UserCardSummary(models.Model):
+    """
+    Итог закрытого сезона: сколько копий каждой карты получил пользователь.
+    Заполняется командой close_season перед переносом UserRoll в архив.
+    """
+    season = models.ForeignKey(
+        Season,
+        on_delete=models.CASCADE,
+        related_name='card_summaries',
+        verbose_name='Сезон'
+    )
+    user = models.ForeignKey(
+        'tg_bot.TgUser',
+        on_delete=models.CASCADE,
+        related_name='card_summaries',
+        verbose_name='Пользователь'
+    )
+    card = models.ForeignKey(
+        Card,
+        on_delete=models.CASCADE,
+        related_name='summaries',
+        verbose_name='Карта'
+    )
+    copies_total = models.PositiveIntegerField(default=0, verbose_name='Всего копий')
+    copies_burned = models.PositiveIntegerField(default=0, verbose_name='Сожжено в крафте')
+    first_rolled_at = models.DateTimeField(verbose_name='Первый ролл')
+    last_rolled_at = models.DateTimeField(verbose_name='Последний ролл')
+
+    class Meta:
+        verbose_name = 'Итог по карте'
+        verbose_name_plural = 'Итоги по картам'
+        constraints = [
+            models.UniqueConstraint(fields=['season', 'user', 'card'], name='unique_season_user_card_summary'),
+        ]
+
+    def __str__(self):
+        return f"{self.user} → {self.card}: {self.copies_total}"
+
+
+class UserRollArchive(models.Model):
+    """
+    Броски закрытых сезонов. Вынесены из UserRoll, чтобы рабочая таблица
+    и её индексы содержали только живые сезоны. Индексов здесь нет намеренно.
+    """
+    original_id = models.BigIntegerField(verbose_name='ID в UserRoll')
+    user = models.ForeignKey(
+        'tg_bot.TgUser',
+        on_delete=models.CASCADE,
+        related_name='archived_rolls',
+        db_index=False,
+        verbose_name='Пользователь'
+    )
+    bot = models.ForeignKey(
+        'tg_bot.Bot',
+        on_delete=models.CASCADE,
+        related_name='archived_rolls',
+        db_index=False,
+        verbose_name='Бот'
+    )
+    card = models.ForeignKey(
+        Card,
+        on_delete=models.CASCADE,
+        related_name='archived_rolls',
+        db_index=False,
+        verbose_name='Карта'
+    )
+    season = models.ForeignKey(
+        Season,
+        on_delete=models.CASCADE,
+        related_name='archived_rolls',
+        verbose_name='Сезон'
+    )
+    rolled_at = models.DateTimeField(verbose_name='Время ролла')
+    is_used_for_craft = models.BooleanField(default=False, verbose_name='Использовано для крафта')
+
+    class Meta:
+        verbose_name = 'Архивный ролл'
+        verbose_name_plural = 'Архив роллов'
+
+    def __str__(self):
+        return f"{self.user_id} → {self.card_id} ({self.rolled_at:%d.%m.%Y %H:%M})"
@@ -9,6 +9,12 @@ class Season(models.Model):
     start_date = models.DateTimeField()
     end_date = models.DateTimeField()
     is_active = models.BooleanField(default=True)
+    closed_at = models.DateTimeField(
+        null=True,
+        blank=True,
+        verbose_name='Закрыт',
+        help_text='Когда броски сезона были сведены в итоги и перенесены в архив (close_season)'
+    )
     bot = models.ForeignKey(
         Bot,
         blank=True,
@@ -72,6 +78,10 @@ class Card(models.Model, BotFileMixin):
     async def aget_image_id(self, bot_id):
         return await self.aget_file_id(bot_id, field_name="image")
 
+    @classmethod
+    async def aget_image_ids(cls, cards, bot_id) -> dict:
+        return await cls.aget_file_ids(cards, bot_id)
+
     async def aget_image_hidden_id(self, bot_id):
         return await self.aget_file_id(bot_id, field_name="image_hidden")
 
@@ -7,6 +7,7 @@ from django.db.models import Q, UniqueConstraint
 from django.core.exceptions import ValidationError
 
 from tg_bot.models import Bot
+from roster.services.formula import evaluate_range, FormulaError
 
 class RollLimit(models.Model):
     LIMIT_TYPE_CHOICES = [
@@ -144,48 +145,20 @@ class RarityWeight(models.Model):
     
     def _validate_formula_result(self):
         """Проверка, что результат вычисления > 0 для всех уровней редкости"""
-        safe_dict = {
-            '__builtins__': {},
-            'math': math,
-            'abs': abs,
-            'round': round,
-            'min': min,
-            'max': max,
-        }
-        
-        for test_star in range(1, 6):
-            try:
-                test_formula = self.formula.replace('{star}', str(test_star))
-                result = eval(test_formula, {"__builtins__": {}}, safe_dict)
-                
-                if not isinstance(result, (int, float)):
-                    raise ValidationError({
-                        'formula': f'Формула должна возвращать число. Для ★{test_star} получен тип: {type(result).__name__}'
-                    })
-                
-                if result <= 0:
-                    raise ValidationError({
-                        'formula': f'Вес для ★{test_star} должен быть > 0. Получено: {result}'
-                    })
-                
-                if math.isinf(result) or math.isnan(result):
-                    raise ValidationError({
-                        'formula': f'Некорректный результат для ★{test_star}: {result}'
-                    })
-                    
-            except ZeroDivisionError:
-                raise ValidationError({
-                    'formula': f'Деление на ноль при расчете веса для ★{test_star}'
-                })
-            except (SyntaxError, NameError, TypeError) as e:
+        try:
+            results = evaluate_range(self.formula)
+        except FormulaError as e:
+            raise ValidationError({'formula': str(e)})
+
+        for test_star, result in results.items():
+            if math.isinf(result) or math.isnan(result):
                 raise ValidationError({
-                    'formula': f'Ошибка в формуле для ★{test_star}: {str(e)}'
+                    'formula': f'Некорректный результат для ★{test_star}: {result}'
                 })
-            except ValidationError:
-                raise
-            except Exception as e:
+
+            if result <= 0:
                 raise ValidationError({
-                    'formula': f'Ошибка вычисления для ★{test_star}: {str(e)}'
+                    'formula': f'Вес для ★{test_star} должен быть > 0. Получено: {result}'
                 })
     
     def calculate_weight(self, star):
@@ -201,34 +174,22 @@ class RarityWeight(models.Model):
         if not 1 <= star <= 5:
             raise ValueError("Уровень редкости должен быть от 1 до 5")
         
-        safe_dict = {
-            '__builtins__': {},
-            'math': math,
-            'abs': abs,
-            'round': round,
-            'min': min,
-            'max': max,
-        }
-        
-        formula = self.formula.replace('{star}', str(star))
-        
         try:
-            result = eval(formula, {"__builtins__": {}}, safe_dict)
-            return float(result) * self.coefficient
-        except Exception as e:
+            return evaluate_range(self.formula, self.coefficient, stars=[star])[star]
+        except FormulaError as e:
             raise ValueError(f"Ошибка вычисления веса: {str(e)}")
     
     def get_all_weights(self):
         """
-        Получить все веса для редкостей 1-5
+        Получить все веса для редкостей 1-5 (формула компилируется один раз)
         
         Returns:
             dict: {star: weight}
         """
-        weights = {}
-        for star in range(1, 6):
-            weights[star] = self.calculate_weight(star)
-        return weights
+        try:
+            return evaluate_range(self.formula, self.coefficient)
+        except FormulaError as e:
+            raise ValueError(f"Ошибка вычисления веса: {str(e)}")
     
     def get_probabilities(self):
         """
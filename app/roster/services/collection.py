@@ -0,0 +1,155 @@
+# roster/services/collection.py
+from asgiref.sync import sync_to_async
+from django.db import connection, transaction
+
+from roster.models.team import Season
+from roster.models.roll import UserRoll, UserCollection
+
+
+# Рекомендательная блокировка сезона (первый ключ pg_advisory_xact_lock):
+# броски берут её разделяемой, close_season — исключительной, чтобы дождаться
+# записывающихся бросков и закрыть сезон для новых.
+SEASON_LOCK_NAMESPACE = 7301
+
+
+class SeasonClosedError(Exception):
+    """Сезон закрыт (или закрывается) — броски в него больше не записываются."""
+
+
+def lock_season(season_id, shared=True):
+    """Блокировка сезона до конца текущей транзакции. Вызывать внутри transaction.atomic()."""
+    function = "pg_advisory_xact_lock_shared" if shared else "pg_advisory_xact_lock"
+    with connection.cursor() as cursor:
+        cursor.execute(f"SELECT {function}(%s, %s)", [SEASON_LOCK_NAMESPACE, season_id])
+
+
+def _get_locked_collection(user_id, season_id) -> UserCollection:
+    """
+    Блокирует сводку пользователя за сезон (создает и заполняет из UserRoll,
+    если её ещё нет). Вызывать только внутри transaction.atomic().
+    """
+    collection, created = UserCollection.objects.select_for_update().get_or_create(
+        user_id=user_id,
+        season_id=season_id,
+    )
+    if created:
+        card_ids = UserRoll.objects.filter(
+            user_id=user_id,
+            season_id=season_id,
+            is_used_for_craft=False,
+        ).values_list("card_id", flat=True)
+        collection.add_cards(card_ids)
+        collection.save(update_fields=["card_counts", "unique_count", "duplicates_count", "updated_at"])
+    return collection
+
+
+def get_collection(user_id, season_id) -> UserCollection:
+    """Возвращает сводку коллекции; при первом обращении она заполняется из UserRoll."""
+    collection = UserCollection.objects.filter(user_id=user_id, season_id=season_id).first()
+    if collection is not None:
+        return collection
+    with transaction.atomic():
+        return _get_locked_collection(user_id, season_id)
+
+
+def invalidate_collection(user_id, season_id):
+    """
+    Удаляет сводку после правки бросков в обход record_rolls (админка, каскадное
+    удаление). При следующем обращении она заново заполнится из UserRoll.
+    """
+    UserCollection.objects.filter(user_id=user_id, season_id=season_id).delete()
+
+
+def invalidate_card_collections(card):
+    """Удаляет сводки сезона карты, в которых она есть, — перед удалением карты."""
+    UserCollection.objects.filter(
+        season__teams=card.team_id,
+        card_counts__has_key=str(card.pk),
+    ).delete()
+
+
+# Сжигание дублей одним запросом. FOR UPDATE нельзя совмещать с оконными
+# функциями в одном SELECT, поэтому строки сначала блокируются, а нумеруются
+# копии уже в отдельном CTE. Первая (самая старая) копия карты остается.
+BURN_DUPLICATES_SQL = """
+WITH locked AS (
+    SELECT id, card_id, rolled_at
+    FROM {table}
+    WHERE user_id = %(user_id)s
+      AND season_id = %(season_id)s
+      AND is_used_for_craft = FALSE
+      AND card_id = ANY(%(card_ids)s)
+    FOR UPDATE
+),
+ranked AS (
+    SELECT id, rolled_at,
+           ROW_NUMBER() OVER (PARTITION BY card_id ORDER BY rolled_at, id) AS copy_number
+    FROM locked
+),
+to_burn AS (
+    SELECT id
+    FROM ranked
+    WHERE copy_number > 1
+    ORDER BY rolled_at, id
+    LIMIT %(burn_count)s
+)
+UPDATE {table} AS roll
+SET is_used_for_craft = TRUE
+FROM to_burn
+WHERE roll.id = to_burn.id
+RETURNING roll.card_id
+"""
+
+
+def _burn_duplicates(user_id, season_id, collection: UserCollection, burn_count: int) -> list[int]:
+    """Сжигает burn_count самых ранних дублей и возвращает ID их карт."""
+    duplicated_ids = [int(card_id) for card_id, count in collection.card_counts.items() if count > 1]
+    if not duplicated_ids:
+        return []
+
+    with connection.cursor() as cursor:
+        cursor.execute(
+            BURN_DUPLICATES_SQL.format(table=UserRoll._meta.db_table),
+            {
+                "user_id": user_id,
+                "season_id": season_id,
+                "card_ids": duplicated_ids,
+                "burn_count": burn_count,
+            },
+        )
+        burned = [card_id for (card_id,) in cursor.fetchall()]
+
+    collection.remove_cards(burned)
+    return burned
+
+
+def record_rolls(user_id, bot_id, season_id, card_ids: list[int], burn_count: int = 0):
+    """
+    Записывает броски и, при крафте, сжигает burn_count дублей —
+    всё в одной транзакции со сводкой коллекции.
+    Возвращает (ID бросков, число сожженных дублей, сводка).
+    SeasonClosedError, если сезон уже закрыт командой close_season.
+    """
+    with transaction.atomic():
+        lock_season(season_id)
+        if not Season.objects.filter(id=season_id, is_active=True).exists():
+            raise SeasonClosedError(f"Сезон {season_id} закрыт")
+
+        collection = _get_locked_collection(user_id, season_id)
+
+        burned = []
+        if burn_count:
+            burned = _burn_duplicates(user_id, season_id, collection, burn_count)
+
+        rolls = UserRoll.objects.bulk_create([
+            UserRoll(user_id=user_id, bot_id=bot_id, season_id=season_id, card_id=card_id)
+            for card_id in card_ids
+        ])
+        collection.add_cards(card_ids)
+        collection.save(update_fields=["card_counts", "unique_count", "duplicates_count", "updated_at"])
+
+    return [roll.id for roll in rolls], len(burned), collection
+
+
+aget_collection = sync_to_async(get_collection)
+arecord_rolls = sync_to_async(record_rolls)
@@ -0,0 +1,162 @@
+# roster/services/formula.py
+import ast
+import math
+from functools import lru_cache
+
+
+STAR_RANGE = range(1, 6)
+
+# Ограничения, чтобы формула из админки не могла повесить процесс
+MAX_FACTORIAL_ARG = 170
+MAX_POW_EXPONENT = 100
+
+
+class FormulaError(ValueError):
+    """Формула содержит недопустимые конструкции или не вычисляется."""
+
+
+def _safe_factorial(value):
+    if value != int(value) or not 0 <= value <= MAX_FACTORIAL_ARG:
+        raise FormulaError(f"factorial допустим для целых от 0 до {MAX_FACTORIAL_ARG}")
+    return math.factorial(int(value))
+
+
+def _safe_pow(base, exponent):
+    if abs(exponent) > MAX_POW_EXPONENT:
+        raise FormulaError(f"Степень больше {MAX_POW_EXPONENT} не допускается")
+    return math.pow(base, exponent)
+
+
+MATH_FUNCTIONS = {
+    "factorial": _safe_factorial,
+    "pow": _safe_pow,
+    "sqrt": math.sqrt,
+}
+BUILTIN_FUNCTIONS = {
+    "abs": abs,
+    "round": round,
+    "min": min,
+    "max": max,
+}
+BIN_OPS = (ast.Add, ast.Sub, ast.Mult, ast.Div, ast.FloorDiv, ast.Mod, ast.Pow)
+UNARY_OPS = (ast.UAdd, ast.USub)
+
+
+class _FormulaCompiler(ast.NodeTransformer):
+    """
+    Проверяет дерево формулы по белому списку и переписывает вызовы
+    на безопасные функции: math.x(...) -> _x(...), a ** b -> _pow(a, b).
+    """
+
+    def visit_Expression(self, node):
+        node.body = self.visit(node.body)
+        return node
+
+    def visit_Constant(self, node):
+        if isinstance(node.value, bool) or not isinstance(node.value, (int, float)):
+            raise FormulaError(f"Недопустимая константа: {node.value!r}")
+        return node
+
+    def visit_Name(self, node):
+        if node.id != "star":
+            raise FormulaError(f"Недопустимое имя: {node.id}")
+        return node
+
+    def visit_UnaryOp(self, node):
+        if not isinstance(node.op, UNARY_OPS):
+            raise FormulaError(f"Недопустимый оператор: {type(node.op).__name__}")
+        node.operand = self.visit(node.operand)
+        return node
+
+    def visit_BinOp(self, node):
+        if not isinstance(node.op, BIN_OPS):
+            raise FormulaError(f"Недопустимый оператор: {type(node.op).__name__}")
+        left, right = self.visit(node.left), self.visit(node.right)
+        if isinstance(node.op, ast.Pow):
+            return ast.copy_location(
+                ast.Call(func=ast.Name(id="_pow", ctx=ast.Load()), args=[left, right], keywords=[]),
+                node,
+            )
+        node.left, node.right = left, right
+        return node
+
+    def visit_Call(self, node):
+        if node.keywords:
+            raise FormulaError("Именованные аргументы не поддерживаются")
+
+        func = node.func
+        if (
+            isinstance(func, ast.Attribute)
+            and isinstance(func.value, ast.Name)
+            and func.value.id == "math"
+            and func.attr in MATH_FUNCTIONS
+        ):
+            name = f"_{func.attr}"
+        elif isinstance(func, ast.Name) and func.id in BUILTIN_FUNCTIONS:
+            name = f"_{func.id}"
+        else:
+            raise FormulaError(f"Недопустимая функция: {ast.unparse(func)}")
+
+        return ast.copy_location(
+            ast.Call(
+                func=ast.Name(id=name, ctx=ast.Load()),
+                args=[self.visit(arg) for arg in node.args],
+                keywords=[],
+            ),
+            node,
+        )
+
+    def generic_visit(self, node):
+        raise FormulaError(f"Недопустимая конструкция: {type(node).__name__}")
+
+
+FORMULA_NAMESPACE = {
+    "__builtins__": {},
+    **{f"_{name}": function for name, function in MATH_FUNCTIONS.items()},
+    **{f"_{name}": function for name, function in BUILTIN_FUNCTIONS.items()},
+}
+
+
+@lru_cache(maxsize=128)
+def compile_formula(formula: str):
+    """
+    Разбирает формулу с подстановкой {star} один раз и возвращает функцию star -> вес.
+    Кэшируется по тексту формулы: новая версия RarityWeight с другой формулой
+    компилируется заново, неизменная — берется из кэша.
+    """
+    source = formula.replace("{star}", "star")
+    try:
+        tree = ast.parse(source, mode="eval")
+    except SyntaxError as e:
+        raise FormulaError(f"Синтаксическая ошибка: {e.msg}")
+
+    tree = ast.fix_missing_locations(_FormulaCompiler().visit(tree))
+    code = compile(tree, "<formula>", "eval")
+
+    def evaluate(star):
+        return eval(code, FORMULA_NAMESPACE, {"star": star})
+
+    return evaluate
+
+
+def evaluate_range(formula: str, coefficient: float = 1.0, stars=STAR_RANGE) -> dict[int, float]:
+    """
+    Вычисляет веса сразу для всего диапазона звезд.
+    Ошибки вычисления превращаются в FormulaError с номером звезды.
+    """
+    evaluate = compile_formula(formula)
+    weights = {}
+    for star in stars:
+        try:
+            result = evaluate(star)
+        except FormulaError:
+            raise
+        except ZeroDivisionError:
+            raise FormulaError(f"Деление на ноль при расчете веса для ★{star}")
+        except Exception as e:
+            raise FormulaError(f"Ошибка вычисления для ★{star}: {e}")
+
+        if isinstance(result, bool) or not isinstance(result, (int, float)):
+            raise FormulaError(f"Формула должна возвращать число. Для ★{star} получен тип: {type(result).__name__}")
+        weights[star] = float(result) * coefficient
+    return weights
@@ -0,0 +1,64 @@
+# roster/services/layout.py
+from roster.models.team import Team, Card
+from tg_bot.services.versioned_cache import VersionedCache
+from roster.services.versions import CARDS_SCOPE
+
+
+layout_cache = VersionedCache()
+
+
+class CardLayout:
+    __slots__ = ("id", "name", "stars")
+
+    def __init__(self, card_id, name, stars):
+        self.id = card_id
+        self.name = name
+        self.stars = stars
+
+
+class TeamLayout:
+    def __init__(self, team_id, name, stars, cards: list[CardLayout]):
+        self.id = team_id
+        self.name = name
+        self.stars = stars
+        self.cards = cards  # упорядочены по id, как слоты в колбэке rollimg_
+
+    def count_collected(self, collected_ids: set) -> int:
+        return sum(1 for card in self.cards if card.id in collected_ids)
+
+
+class SeasonLayout:
+    """
+    Неизменяемая раскладка сезона: команды (в порядке модели Team)
+    и их карты. Используется для клавиатур после броска и для /me.
+    """
+
+    def __init__(self, teams: list[TeamLayout]):
+        self.teams = teams
+        self.teams_by_name = sorted(teams, key=lambda team: team.name)
+        self.cards_count = sum(len(team.cards) for team in teams)
+
+
+async def build_season_layout(season_id) -> SeasonLayout:
+    cards_by_team = {}
+    async for card_id, team_id, name, stars in Card.objects.filter(
+        team__season_id=season_id,
+    ).order_by("id").values_list("id", "team_id", "name", "stars"):
+        cards_by_team.setdefault(team_id, []).append(CardLayout(card_id, name, stars))
+
+    teams = [
+        TeamLayout(team_id, name, stars, cards_by_team.get(team_id, []))
+        async for team_id, name, stars in Team.objects.filter(
+            season_id=season_id,
+        ).values_list("id", "name", "stars")
+    ]
+    return SeasonLayout(teams)
+
+
+async def get_season_layout(season_id) -> SeasonLayout:
+    """Кэшированная раскладка сезона; сбрасывается при изменении команд или карт."""
+    return await layout_cache.get(
+        ("layout", season_id),
+        lambda: build_season_layout(season_id),
+        scopes=[CARDS_SCOPE],
+    )
@@ -0,0 +1,154 @@
+# roster/services/leaderboard.py
+import os
+import time
+
+import redis.asyncio as aioredis
+
+from roster.services.layout import SeasonLayout
+from server.logger import logger
+
+
+redis_client = aioredis.StrictRedis(
+    host=os.getenv("REDIS_HOST", "localhost"),
+    port=int(os.getenv("REDIS_PORT", 6379)),
+    db=3,
+    decode_responses=True,
+)
+
+UNIQUE_KEY_TEMPLATE = "leaderboard:{season_id}:unique"
+TEAMS_KEY_TEMPLATE = "leaderboard:{season_id}:teams"
+COMPLETED_KEY_TEMPLATE = "leaderboard:{season_id}:completed"
+# Пользователи, чьи места изменились с последнего сохранения в LeaderboardEntry
+DIRTY_KEY_TEMPLATE = "leaderboard:{season_id}:dirty"
+SEASONS_KEY = "leaderboard:seasons"
+
+# Счет в unique — число уникальных карт плюс дробная добавка за полный сбор:
+# чем раньше собрана коллекция, тем она больше. int(счет) остается числом карт,
+# а при равном числе карт первым идет тот, кто собрал всё раньше.
+COMPLETED_SCALE = 2 ** 32
+
+# Обновление места за один запрос: время полного сбора пишется один раз (NX)
+# и сразу участвует в счете, даже если было записано предыдущим броском.
+# KEYS: unique, teams, completed, dirty, множество сезонов.
+# ARGV: пользователь, уникальных карт, собрано команд, собрано всё (0/1), время, сезон.
+RECORD_LUA = """
+local score = tonumber(ARGV[2])
+if ARGV[4] == '1' then
+    redis.call('ZADD', KEYS[3], 'NX', ARGV[5], ARGV[1])
+end
+local completed = redis.call('ZSCORE', KEYS[3], ARGV[1])
+if completed then
+    score = score + 1 - tonumber(completed) / 4294967296
+end
+redis.call('ZADD', KEYS[1], score, ARGV[1])
+redis.call('ZADD', KEYS[2], ARGV[3], ARGV[1])
+redis.call('SADD', KEYS[4], ARGV[1])
+redis.call('SADD', KEYS[5], ARGV[6])
+return 1
+"""
+
+
+def get_keys(season_id) -> dict:
+    return {
+        "unique": UNIQUE_KEY_TEMPLATE.format(season_id=season_id),
+        "teams": TEAMS_KEY_TEMPLATE.format(season_id=season_id),
+        "completed": COMPLETED_KEY_TEMPLATE.format(season_id=season_id),
+        "dirty": DIRTY_KEY_TEMPLATE.format(season_id=season_id),
+    }
+
+
+def get_rank_score(unique_count: int, completed_ts: float | None = None) -> float:
+    """Счет для sorted set unique (см. COMPLETED_SCALE)."""
+    if completed_ts is None:
+        return unique_count
+    return unique_count + 1 - completed_ts / COMPLETED_SCALE
+
+
+def count_completed_teams(layout: SeasonLayout, collected_ids: set) -> int:
+    return sum(
+        1 for team in layout.teams
+        if team.cards and team.count_collected(collected_ids) == len(team.cards)
+    )
+
+
+class LeaderboardEntryView:
+    """Строка рейтинга для вывода в боте."""
+
+    def __init__(self, user_id, rank, unique_count, teams_completed=0, completed_at=None):
+        self.user_id = user_id
+        self.rank = rank
+        self.unique_count = unique_count
+        self.teams_completed = teams_completed
+        self.completed_at = completed_at
+
+
+class Leaderboard:
+    """
+    Рейтинг сезона в sorted set'ах Redis, обновляется на каждый бросок и крафт.
+
+    unique — уникальные карты, teams — собранные команды,
+    completed — время первого полного сбора (пишется один раз, ZADD NX).
+    При равном числе карт выше тот, кто раньше собрал всё (см. get_rank_score).
+    В Postgres рейтинг сохраняется задачей persist_leaderboards.
+    """
+
+    def __init__(self, client=redis_client):
+        self.client = client
+        self.record_script = client.register_script(RECORD_LUA)
+
+    async def record(self, season_id, user_id, layout: SeasonLayout, collected_ids: set):
+        keys = get_keys(season_id)
+        unique_count = len(collected_ids)
+        is_complete = bool(layout.cards_count and unique_count >= layout.cards_count)
+        try:
+            await self.record_script(
+                keys=[keys["unique"], keys["teams"], keys["completed"], keys["dirty"], SEASONS_KEY],
+                args=[
+                    user_id,
+                    unique_count,
+                    count_completed_teams(layout, collected_ids),
+                    int(is_complete),
+                    time.time(),
+                    season_id,
+                ],
+            )
+        except Exception as e:
+            # Рейтинг восстанавливается командой rebuild_leaderboard, бросок не ломаем
+            logger.error(f"Не удалось обновить рейтинг сезона {season_id}: {e}")
+
+    async def get_top(self, season_id, limit=10) -> list[LeaderboardEntryView]:
+        keys = get_keys(season_id)
+        top = await self.client.zrevrange(keys["unique"], 0, limit - 1, withscores=True)
+        if not top:
+            return []
+
+        user_ids = [user_id for user_id, _ in top]
+        async with self.client.pipeline(transaction=False) as pipe:
+            pipe.zmscore(keys["teams"], user_ids)
+            pipe.zmscore(keys["completed"], user_ids)
+            teams, completed = await pipe.execute()
+
+        return [
+            LeaderboardEntryView(
+                user_id=int(user_id),
+                rank=rank,
+                unique_count=int(score),
+                teams_completed=int(teams[i] or 0),
+                completed_at=completed[i],
+            )
+            for i, (rank, (user_id, score)) in enumerate(enumerate(top, start=1))
+        ]
+
+    async def get_rank(self, season_id, user_id) -> LeaderboardEntryView | None:
+        keys = get_keys(season_id)
+        async with self.client.pipeline(transaction=False) as pipe:
+            pipe.zrevrank(keys["unique"], user_id)
+            pipe.zscore(keys["unique"], user_id)
+            pipe.zscore(keys["teams"], user_id)
+            rank, unique_count, teams = await pipe.execute()
+        if rank is None:
+            return None
+        return LeaderboardEntryView(user_id, rank + 1, int(unique_count), int(teams or 0))
+
+
+leaderboard = Leaderboard()
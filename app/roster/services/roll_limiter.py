@@ -0,0 +1,195 @@
+# roster/services/roll_limiter.py
+import os
+import time
+import uuid
+from datetime import timedelta
+
+import redis.asyncio as aioredis
+from django.utils.timezone import now
+
+from roster.models.roll import UserRoll
+
+
+redis_pool = aioredis.ConnectionPool(
+    host=os.getenv("REDIS_HOST", "localhost"),
+    port=int(os.getenv("REDIS_PORT", 6379)),
+    db=3,
+    decode_responses=True,
+    max_connections=50,
+)
+redis_client = aioredis.StrictRedis(connection_pool=redis_pool)
+
+COOLDOWN_KEY_TEMPLATE = "roll:{tg_id}:{bot_id}"
+WINDOW_KEY_TEMPLATE = "roll:window:{tg_id}:{bot_id}"
+SEEDED_KEY_TEMPLATE = "roll:window:{tg_id}:{bot_id}:seeded"
+
+DAY_MS = 24 * 60 * 60 * 1000
+BIHOURLY_MS = 2 * 60 * 60 * 1000
+
+# Элементы окна: "u:{id UserRoll}" для записанных бросков,
+# "r:{token}:{n}" для зарезервированных, но ещё не записанных.
+ROLL_MEMBER = "u:{roll_id}"
+
+# Допуск броска за один запрос к Redis.
+# KEYS[1] - окно бросков (zset, score = время в мс), KEYS[2] - кулдаун,
+# KEYS[3] - метка того, что окно заполнено из UserRoll.
+# ARGV: время (мс), кулдаун (сек), лимит за 2 часа, лимит за сутки,
+# сколько бросков зарезервировать, токен резерва.
+# Возвращает {-3} если окно не заполнено, {-1, ttl} при кулдауне,
+# {0, за сутки, за 2 часа} при исчерпанном лимите,
+# иначе {зарезервировано, за сутки, за 2 часа} с учетом резерва.
+ADMIT_LUA = """
+if redis.call('EXISTS', KEYS[3]) == 0 then
+    return {-3}
+end
+local ttl = redis.call('TTL', KEYS[2])
+if ttl > 0 then
+    return {-1, ttl}
+end
+local now_ms = tonumber(ARGV[1])
+redis.call('ZREMRANGEBYSCORE', KEYS[1], '-inf', now_ms - 86400000)
+local daily = redis.call('ZCARD', KEYS[1])
+local bihourly = redis.call('ZCOUNT', KEYS[1], now_ms - 7200000, '+inf')
+local allowed = math.min(
+    tonumber(ARGV[5]),
+    tonumber(ARGV[4]) - daily,
+    tonumber(ARGV[3]) - bihourly
+)
+if allowed <= 0 then
+    return {0, daily, bihourly}
+end
+for i = 1, allowed do
+    redis.call('ZADD', KEYS[1], now_ms, 'r:' .. ARGV[6] .. ':' .. i)
+end
+redis.call('PEXPIRE', KEYS[1], 86400000)
+if tonumber(ARGV[2]) > 0 then
+    redis.call('SET', KEYS[2], ARGV[6], 'EX', ARGV[2])
+end
+return {allowed, daily + allowed, bihourly + allowed}
+"""
+
+# Снятие резерва при неудачном броске: удаляет зарезервированные элементы
+# и кулдаун, если он был выставлен этим же резервом.
+# KEYS[1] - окно, KEYS[2] - кулдаун. ARGV: токен, количество.
+RELEASE_LUA = """
+for i = 1, tonumber(ARGV[2]) do
+    redis.call('ZREM', KEYS[1], 'r:' .. ARGV[1] .. ':' .. i)
+end
+if redis.call('GET', KEYS[2]) == ARGV[1] then
+    redis.call('DEL', KEYS[2])
+end
+return 1
+"""
+
+
+class RollAdmission:
+    """Результат проверки лимитов перед броском."""
+
+    def __init__(self, allowed=0, daily_used=0, bihourly_used=0, cooldown_ttl=0, token=None, now_ms=None):
+        self.allowed = allowed
+        self.daily_used = daily_used
+        self.bihourly_used = bihourly_used
+        self.cooldown_ttl = cooldown_ttl
+        self.token = token
+        self.now_ms = now_ms
+
+    def __bool__(self):
+        return self.allowed > 0
+
+
+class RollLimiter:
+    """
+    Скользящее окно бросков пользователя в Redis.
+
+    Кулдаун, лимит за 2 часа и лимит за сутки проверяются, а бросок
+    резервируется одним Lua-скриптом. Окно лениво заполняется из UserRoll
+    и периодически сверяется с базой задачей reconcile_roll_windows.
+    """
+
+    def __init__(self, client=redis_client):
+        self.client = client
+        self.admit_script = client.register_script(ADMIT_LUA)
+        self.release_script = client.register_script(RELEASE_LUA)
+
+    @staticmethod
+    def get_keys(tg_id, bot_id):
+        return [
+            WINDOW_KEY_TEMPLATE.format(tg_id=tg_id, bot_id=bot_id),
+            COOLDOWN_KEY_TEMPLATE.format(tg_id=tg_id, bot_id=bot_id),
+            SEEDED_KEY_TEMPLATE.format(tg_id=tg_id, bot_id=bot_id),
+        ]
+
+    async def seed(self, user, bot):
+        """Заполняет окно бросками пользователя за последние сутки."""
+        window_key, _, seeded_key = self.get_keys(user.tg_id, bot.id)
+        rolls = {
+            ROLL_MEMBER.format(roll_id=roll_id): int(rolled_at.timestamp() * 1000)
+            async for roll_id, rolled_at in UserRoll.objects.filter(
+                user=user,
+                bot=bot,
+                rolled_at__gte=now() - timedelta(hours=24),
+            ).values_list("id", "rolled_at")
+        }
+        async with self.client.pipeline(transaction=True) as pipe:
+            if rolls:
+                pipe.zadd(window_key, rolls)
+                pipe.pexpire(window_key, DAY_MS)
+            pipe.set(seeded_key, 1, ex=24 * 60 * 60)
+            await pipe.execute()
+
+    async def admit(self, user, bot, limits: dict, count: int = 1) -> RollAdmission:
+        """
+        Проверяет кулдаун и лимиты и резервирует до count бросков.
+        limits — словарь с ключами cooldown, bihourly, daily.
+        """
+        keys = self.get_keys(user.tg_id, bot.id)
+        token = uuid.uuid4().hex
+        now_ms = int(time.time() * 1000)
+        args = [now_ms, limits["cooldown"], limits["bihourly"], limits["daily"], count, token]
+
+        result = await self.admit_script(keys=keys, args=args)
+        if result[0] == -3:
+            await self.seed(user, bot)
+            result = await self.admit_script(keys=keys, args=args)
+
+        if result[0] == -1:
+            return RollAdmission(cooldown_ttl=result[1])
+        return RollAdmission(
+            allowed=result[0],
+            daily_used=result[1],
+            bihourly_used=result[2],
+            token=token if result[0] > 0 else None,
+            now_ms=now_ms,
+        )
+
+    async def confirm(self, user, bot, admission: RollAdmission, roll_ids: list[int]):
+        """Заменяет резерв на записанные броски; неиспользованный остаток снимается."""
+        window_key, _, _ = self.get_keys(user.tg_id, bot.id)
+        async with self.client.pipeline(transaction=True) as pipe:
+            pipe.zrem(window_key, *[f"r:{admission.token}:{i}" for i in range(1, admission.allowed + 1)])
+            if roll_ids:
+                pipe.zadd(window_key, {ROLL_MEMBER.format(roll_id=roll_id): admission.now_ms for roll_id in roll_ids})
+            await pipe.execute()
+
+    async def release(self, user, bot, admission: RollAdmission):
+        """Снимает резерв, если бросок не состоялся."""
+        if not admission.token:
+            return
+        window_key, cooldown_key, _ = self.get_keys(user.tg_id, bot.id)
+        await self.release_script(keys=[window_key, cooldown_key], args=[admission.token, admission.allowed])
+
+    async def get_usage(self, user, bot) -> tuple[int, int]:
+        """Возвращает (бросков за сутки, оставшийся кулдаун в секундах)."""
+        window_key, cooldown_key, seeded_key = self.get_keys(user.tg_id, bot.id)
+        if not await self.client.exists(seeded_key):
+            await self.seed(user, bot)
+
+        now_ms = int(time.time() * 1000)
+        async with self.client.pipeline(transaction=False) as pipe:
+            pipe.zcount(window_key, now_ms - DAY_MS, "+inf")
+            pipe.ttl(cooldown_key)
+            daily_used, ttl = await pipe.execute()
+        return daily_used, max(0, ttl)
+
+
+roll_limiter = RollLimiter()
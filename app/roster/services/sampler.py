@@ -0,0 +1,122 @@
+# roster/services/sampler.py
+import math
+import random
+from bisect import bisect_right
+from itertools import accumulate
+
+from roster.models.team import Card
+from roster.models.tech import RarityWeight
+from tg_bot.services.versioned_cache import VersionedCache
+from roster.services.versions import CARDS_SCOPE, RARITY_SCOPE
+
+
+# При крафте исключенные карты отбрасываются повторным броском, пока
+# оставшаяся вероятность не ниже этой доли; иначе строится отдельная выборка.
+MIN_REJECTION_MASS = 0.25
+
+sampler_cache = VersionedCache()
+
+
+def get_default_weight(star):
+    return 1 / (math.factorial(star) * (star + 1))
+
+
+class CardSampler:
+    """
+    Взвешенная выборка карт сезона по алиас-таблице (метод Воуза).
+    Строится один раз, каждый бросок — O(1).
+    """
+
+    def __init__(self, cards: list[Card], weights: list[float]):
+        self.cards = cards
+        total = sum(weights)
+        if total > 0:
+            self.probabilities = [weight / total for weight in weights]
+        else:
+            # Все веса нулевые (например, формула редкости дала 0) — равномерная выборка
+            self.probabilities = [1 / len(cards)] * len(cards) if cards else []
+        self.index = {card.id: i for i, card in enumerate(cards)}
+        self._build_alias()
+
+    def _build_alias(self):
+        n = len(self.probabilities)
+        self.prob = [0.0] * n
+        self.alias = [0] * n
+
+        scaled = [p * n for p in self.probabilities]
+        small = [i for i, p in enumerate(scaled) if p < 1.0]
+        large = [i for i, p in enumerate(scaled) if p >= 1.0]
+
+        while small and large:
+            less, more = small.pop(), large.pop()
+            self.prob[less] = scaled[less]
+            self.alias[less] = more
+            scaled[more] = scaled[more] + scaled[less] - 1.0
+            (small if scaled[more] < 1.0 else large).append(more)
+
+        # Остатки из-за погрешности округления
+        for i in large + small:
+            self.prob[i] = 1.0
+
+    def _draw_index(self) -> int:
+        i = random.randrange(len(self.prob))
+        return i if random.random() < self.prob[i] else self.alias[i]
+
+    def draw(self, k: int = 1, exclude: set | None = None) -> list[Card]:
+        """
+        Возвращает k карт (с повторениями) пропорционально весам.
+        exclude — ID карт, которые не должны выпасть (режим крафта).
+        """
+        if not self.cards:
+            return []
+
+        if not exclude:
+            return [self.cards[self._draw_index()] for _ in range(k)]
+
+        excluded_mass = sum(self.probabilities[self.index[card_id]] for card_id in exclude if card_id in self.index)
+        remaining_mass = 1.0 - excluded_mass
+
+        if remaining_mass >= MIN_REJECTION_MASS:
+            result = []
+            while len(result) < k:
+                card = self.cards[self._draw_index()]
+                if card.id not in exclude:
+                    result.append(card)
+            return result
+
+        # Почти всё собрано — выбираем из оставшихся по накопленным весам
+        remaining = [i for i, card in enumerate(self.cards) if card.id not in exclude]
+        if not remaining:
+            return []
+        cumulative = list(accumulate(self.probabilities[i] for i in remaining))
+        if cumulative[-1] <= 0:
+            return [self.cards[random.choice(remaining)] for _ in range(k)]
+        return [
+            self.cards[remaining[min(bisect_right(cumulative, random.random() * cumulative[-1]), len(remaining) - 1)]]
+            for _ in range(k)
+        ]
+
+
+async def build_sampler(season_id, bot_id) -> CardSampler:
+    cards = [card async for card in Card.objects.filter(team__season_id=season_id).select_related("team").order_by("id")]
+    rarity_weight = await RarityWeight.objects.filter(bot_id=bot_id, enabled=True).afirst()
+
+    stars = set(card.stars for card in cards)
+    if rarity_weight:
+        # Весь диапазон звезд за один проход; ValueError при ошибке в формуле
+        star_weights = rarity_weight.get_all_weights()
+        if not stars <= star_weights.keys():
+            raise ValueError("Уровень редкости должен быть от 1 до 5")
+    else:
+        star_weights = {star: get_default_weight(star) for star in stars}
+
+    return CardSampler(cards, [star_weights[card.stars] for card in cards])
+
+
+async def get_sampler(season_id, bot_id) -> CardSampler:
+    """Кэшированная выборка карт сезона; сбрасывается при изменении карт или весов."""
+    return await sampler_cache.get(
+        ("sampler", season_id, bot_id),
+        lambda: build_sampler(season_id, bot_id),
+        scopes=[CARDS_SCOPE, RARITY_SCOPE],
+    )
@@ -0,0 +1,15 @@
+# roster/services/versions.py
+from tg_bot.services.versioned_cache import bump_version
+
+
+# Области версий для кэшей гачи (см. tg_bot.services.versioned_cache)
+CARDS_SCOPE = "roster:cards"
+RARITY_SCOPE = "roster:rarity"
+
+
+def invalidate_cards():
+    bump_version(CARDS_SCOPE)
+
+
+def invalidate_rarity():
+    bump_version(RARITY_SCOPE)
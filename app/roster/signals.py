@@ -0,0 +1,59 @@
+# roster/signals.py
+from django.db.models.signals import pre_save, post_save, pre_delete, post_delete
+from django.dispatch import receiver
+
+from tg_bot.models import TgUser
+from roster.models.team import Season, Team, Card
+from roster.models.roll import UserRoll
+from roster.models.tech import RarityWeight
+from roster.services.versions import invalidate_cards, invalidate_rarity
+from roster.services.collection import invalidate_collection, invalidate_card_collections
+
+# Удаления, при которых сводки уже сброшены (или удалены каскадом) выше по цепочке
+COLLECTION_HANDLED_ORIGINS = (Card, Team, Season, TgUser)
+
+
+@receiver([post_save, post_delete], sender=Season)
+@receiver([post_save, post_delete], sender=Team)
+@receiver([post_save, post_delete], sender=Card)
+def on_cards_changed(sender, **kwargs):
+    """Карты, команды или сезоны изменились — кэши выборки и раскладки сезона устарели."""
+    invalidate_cards()
+
+
+@receiver([post_save, post_delete], sender=RarityWeight)
+def on_rarity_changed(sender, **kwargs):
+    invalidate_rarity()
+
+
+@receiver(pre_save, sender=UserRoll)
+def remember_roll_collection(sender, instance, **kwargs):
+    """При правке броска в админке сводка прежнего пользователя/сезона тоже устаревает."""
+    instance._collection_before = None
+    if instance.pk is not None:
+        instance._collection_before = UserRoll.objects.filter(pk=instance.pk).values_list(
+            "user_id", "season_id",
+        ).first()
+
+
+@receiver(post_save, sender=UserRoll)
+def on_roll_saved(sender, instance, **kwargs):
+    # record_rolls пишет через bulk_create и сигналов не вызывает
+    invalidate_collection(instance.user_id, instance.season_id)
+    before = getattr(instance, "_collection_before", None)
+    if before and before != (instance.user_id, instance.season_id):
+        invalidate_collection(*before)
+
+
+@receiver(post_delete, sender=UserRoll)
+def on_roll_deleted(sender, instance, origin=None, **kwargs):
+    origin_model = getattr(origin, "model", type(origin))
+    if issubclass(origin_model, COLLECTION_HANDLED_ORIGINS):
+        return
+    invalidate_collection(instance.user_id, instance.season_id)
+
+
+@receiver(pre_delete, sender=Card)
+def on_card_deleting(sender, instance, **kwargs):
+    """Броски карты удалятся каскадом — сводки с ней пересоберутся при следующем обращении."""
+    invalidate_card_collections(instance)
@@ -0,0 +1,220 @@
+# roster/tasks.py
+import os
+import time
+from collections import defaultdict
+from datetime import timedelta, datetime, timezone
+
+import redis
+from celery import shared_task
+from django.db.models import Min
+from django.utils.timezone import now
+
+from roster.models.team import Season, Team, Card
+from roster.models.roll import UserRoll, LeaderboardEntry
+from roster.services.roll_limiter import WINDOW_KEY_TEMPLATE, ROLL_MEMBER, DAY_MS
+from roster.services.leaderboard import get_keys, get_rank_score, SEASONS_KEY
+from server.logger import logger
+
+
+redis_client = redis.StrictRedis(
+    host=os.getenv("REDIS_HOST"),
+    port=os.getenv("REDIS_PORT"),
+    db=3,
+    decode_responses=True,
+)
+
+# Резерв старше этого срока остался от упавшего процесса
+STALE_RESERVATION_MS = 5 * 60 * 1000
+
+
+def _load_db_windows():
+    """Броски за последние сутки из UserRoll, сгруппированные по ключам окон."""
+    db_windows = defaultdict(dict)
+    rolls = UserRoll.objects.filter(
+        rolled_at__gte=now() - timedelta(hours=24),
+    ).values_list("user__tg_id", "bot_id", "id", "rolled_at")
+    for tg_id, bot_id, roll_id, rolled_at in rolls.iterator():
+        window_key = WINDOW_KEY_TEMPLATE.format(tg_id=tg_id, bot_id=bot_id)
+        db_windows[window_key][ROLL_MEMBER.format(roll_id=roll_id)] = int(rolled_at.timestamp() * 1000)
+    return db_windows
+
+
+@shared_task
+def reconcile_roll_windows():
+    """
+    Сверяет окна бросков в Redis (roll:window:*) с UserRoll за последние сутки.
+
+    Добавляет потерянные броски, удаляет броски, которых нет в базе,
+    и зависшие резервы. Окна, которых нет в Redis, не создаются —
+    они заполнятся лениво при следующем броске пользователя.
+    Запускается по расписанию через django_celery_beat.
+    """
+    started_ms = int(time.time() * 1000)
+    db_windows = _load_db_windows()
+
+    candidates = {}
+    for window_key in redis_client.scan_iter(match="roll:window:*", count=500):
+        if window_key.endswith(":seeded"):
+            continue
+
+        expected = db_windows.get(window_key, {})
+        stale = []
+        for member, score in redis_client.zrange(window_key, 0, -1, withscores=True):
+            # Броски новее выборки из базы не трогаем — их там ещё не может быть
+            if member.startswith("u:") and member not in expected and score < started_ms:
+                stale.append(member)
+            elif member.startswith("r:") and score < started_ms - STALE_RESERVATION_MS:
+                stale.append(member)
+        candidates[window_key] = stale
+
+    # Бросок мог быть допущен до started_ms, а записан в базу уже после выборки:
+    # перед удалением перепроверяем такие id по UserRoll
+    roll_ids = {
+        int(member[2:])
+        for stale in candidates.values()
+        for member in stale
+        if member.startswith("u:")
+    }
+    existing = {
+        ROLL_MEMBER.format(roll_id=roll_id)
+        for roll_id in UserRoll.objects.filter(id__in=roll_ids).values_list("id", flat=True)
+    } if roll_ids else set()
+
+    fixed = 0
+    for window_key, stale in candidates.items():
+        stale = [member for member in stale if member not in existing]
+        expected = db_windows.get(window_key, {})
+
+        pipe = redis_client.pipeline()
+        if stale:
+            pipe.zrem(window_key, *stale)
+        if expected:
+            pipe.zadd(window_key, expected)
+            pipe.pexpire(window_key, DAY_MS)
+        pipe.execute()
+        fixed += len(stale)
+
+    logger.info(f"Сверка окон бросков завершена, удалено лишних записей: {fixed}")
+
+
+def _save_leaderboard_entries(entries):
+    LeaderboardEntry.objects.bulk_create(
+        entries,
+        update_conflicts=True,
+        unique_fields=["season", "user"],
+        update_fields=["unique_count", "teams_completed", "completed_at", "updated_at"],
+    )
+
+
+def _from_timestamp(value):
+    return datetime.fromtimestamp(float(value), tz=timezone.utc) if value is not None else None
+
+
+@shared_task
+def persist_leaderboards(batch_size=1000):
+    """
+    Переносит изменившиеся места рейтинга из Redis в LeaderboardEntry.
+    Пишутся только пользователи из множества leaderboard:{season}:dirty.
+    Запускается по расписанию через django_celery_beat.
+    """
+    saved = 0
+    for season_id in redis_client.smembers(SEASONS_KEY):
+        keys = get_keys(season_id)
+        while True:
+            user_ids = redis_client.spop(keys["dirty"], batch_size)
+            if not user_ids:
+                break
+
+            try:
+                pipe = redis_client.pipeline(transaction=False)
+                pipe.zmscore(keys["unique"], user_ids)
+                pipe.zmscore(keys["teams"], user_ids)
+                pipe.zmscore(keys["completed"], user_ids)
+                unique, teams, completed = pipe.execute()
+
+                updated_at = now()
+                _save_leaderboard_entries([
+                    LeaderboardEntry(
+                        season_id=int(season_id),
+                        user_id=int(user_id),
+                        unique_count=int(unique[i] or 0),
+                        teams_completed=int(teams[i] or 0),
+                        completed_at=_from_timestamp(completed[i]),
+                        updated_at=updated_at,
+                    )
+                    for i, user_id in enumerate(user_ids)
+                ])
+                saved += len(user_ids)
+            except Exception as e:
+                # Возвращаем пользователей в очередь, чтобы сохранить их в следующий раз
+                redis_client.sadd(keys["dirty"], *user_ids)
+                logger.error(f"Ошибка сохранения рейтинга сезона {season_id}: {e}")
+                break
+
+    logger.info(f"Сохранено мест рейтинга: {saved}")
+
+
+@shared_task
+def rebuild_leaderboard(season_id):
+    """
+    Полностью пересобирает рейтинг сезона по UserRoll: и в Redis, и в LeaderboardEntry.
+    Используется для восстановления после потери данных Redis.
+    Закрытые сезоны пропускаются: их броски уже в архиве, а LeaderboardEntry —
+    итоговый рейтинг, который пересборка по пустому UserRoll стерла бы.
+    """
+    if Season.objects.filter(id=season_id, closed_at__isnull=False).exists():
+        logger.warning(f"Сезон {season_id} закрыт, рейтинг не пересобирается")
+        return 0
+
+    team_cards = defaultdict(set)
+    for team_id, card_id in Card.objects.filter(team__season_id=season_id).values_list("team_id", "id"):
+        team_cards[team_id].add(card_id)
+    teams = [cards for team_id in Team.objects.filter(season_id=season_id).values_list("id", flat=True)
+             if (cards := team_cards.get(team_id))]
+    cards_count = sum(len(cards) for cards in team_cards.values())
+
+    collected = defaultdict(set)
+    for user_id, card_id in UserRoll.objects.filter(
+        season_id=season_id,
+        is_used_for_craft=False,
+    ).values_list("user_id", "card_id").distinct():
+        collected[user_id].add(card_id)
+
+    # Время полного сбора: когда была впервые получена последняя недостающая карта
+    completed_users = [user_id for user_id, cards in collected.items() if cards_count and len(cards) >= cards_count]
+    completed_at = {}
+    for row in UserRoll.objects.filter(
+        season_id=season_id,
+        user_id__in=completed_users,
+    ).values("user_id", "card_id").annotate(first_rolled_at=Min("rolled_at")):
+        completed_at[row["user_id"]] = max(completed_at.get(row["user_id"], row["first_rolled_at"]), row["first_rolled_at"])
+
+    keys = get_keys(season_id)
+    pipe = redis_client.pipeline(transaction=True)
+    pipe.delete(keys["unique"], keys["teams"], keys["completed"], keys["dirty"])
+    entries = []
+    updated_at = now()
+    for user_id, cards in collected.items():
+        teams_completed = sum(1 for team in teams if team <= cards)
+        completed_ts = completed_at[user_id].timestamp() if user_id in completed_at else None
+        pipe.zadd(keys["unique"], {user_id: get_rank_score(len(cards), completed_ts)})
+        pipe.zadd(keys["teams"], {user_id: teams_completed})
+        if completed_ts is not None:
+            pipe.zadd(keys["completed"], {user_id: completed_ts})
+        entries.append(LeaderboardEntry(
+            season_id=season_id,
+            user_id=user_id,
+            unique_count=len(cards),
+            teams_completed=teams_completed,
+            completed_at=completed_at.get(user_id),
+            updated_at=updated_at,
+        ))
+    pipe.sadd(SEASONS_KEY, season_id)
+    pipe.execute()
+
+    LeaderboardEntry.objects.filter(season_id=season_id).exclude(user_id__in=collected.keys()).delete()
+    for start in range(0, len(entries), 1000):
+        _save_leaderboard_entries(entries[start:start + 1000])
+
+    logger.info(f"Рейтинг сезона {season_id} пересобран: {len(entries)} игроков")
+    return len(entries)
@@ -136,6 +136,12 @@ CACHES = {
     }
 }
 
+# Сколько секунд ИИ-трактовка переиспользуется для такого же расклада (0 — кэш выключен)
+AI_INTERPRETATION_CACHE_TTL = int(os.getenv("AI_INTERPRETATION_CACHE_TTL", 7 * 24 * 60 * 60))
+# ИИ-трактовки стримит отдельный процесс run_ai_worker, а не бот в своем цикле апдейтов
+AI_WORKER_ENABLED = (os.getenv("AI_WORKER_ENABLED") or "false").lower() == "true"
+AI_WORKER_CONCURRENCY = int(os.getenv("AI_WORKER_CONCURRENCY", 4))
+
 # Password validation
 # https://docs.djangoproject.com/en/3.2/ref/settings/#auth-password-validators
 
@@ -47,7 +47,7 @@ class AIApiKeyAdmin(admin.ModelAdmin):
             "description": "Выберите готового провайдера или укажите свой собственный URL."
         }),
         ("Статус и ограничения", {
-            "fields": ("is_active", "is_exhausted", "exhausted_until"),
+            "fields": ("is_active", "is_exhausted", "exhausted_until", "max_concurrency", "rpm_limit"),
         }),
         ("Системные даты", {
             "fields": ("created_at", "updated_at"),
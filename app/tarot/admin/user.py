@@ -1,5 +1,6 @@
 import csv
 from django.contrib import admin
+from django.db.models import Count, Q
 from django.http import HttpResponse
 from django.urls import reverse
 from django.utils.html import format_html
@@ -273,14 +274,15 @@ class AIReadingPageInline(admin.TabularInline):
 @admin.register(AIReadingInterpretation)
 class AIReadingInterpretationAdmin(admin.ModelAdmin):
     """Отдельная админка для глубокого анализа ИИ запросов и разбора ошибок"""
-    list_display = ("id", "status", "model_used", "prompt_tokens", "completion_tokens", "total_tokens", "created_at")
-    list_filter = ("status", "model_used", "created_at")
+    list_display = ("id", "status", "cache_hit", "model_used", "prompt_tokens", "completion_tokens", "total_tokens", "created_at")
+    list_filter = ("status", "cache_hit", "model_used", "created_at")
     search_fields = ("reading__id", "prompt_user", "error_message")
     ordering = ("-created_at",)
     
     inlines = [AIReadingPageInline]
     
     readonly_fields = ("created_at", "updated_at")
+    raw_id_fields = ("source_interpretation",)
     
     fieldsets = (
         ("Связи и Метаданные", {
@@ -292,6 +294,9 @@ class AIReadingInterpretationAdmin(admin.ModelAdmin):
         ("Результат выполнения", {
             "fields": ("error_message",),
         }),
+        ("Кэш", {
+            "fields": ("prompt_fingerprint", "cache_hit", "source_interpretation"),
+        }),
         ("Статистика токенов", {
             "fields": ("prompt_tokens", "completion_tokens", "total_tokens"),
         }),
@@ -299,4 +304,14 @@ class AIReadingInterpretationAdmin(admin.ModelAdmin):
             "fields": ("created_at", "updated_at"),
             "classes": ("collapse",)
         }),
-    )
\ No newline at end of file
+    )
+
+    def changelist_view(self, request, extra_context=None):
+        # Доля успешных ответов, отданных из кэша без запроса к модели
+        stats = AIReadingInterpretation.objects.filter(
+            status=AIReadingInterpretation.AIStatus.SUCCESS
+        ).aggregate(total=Count("id"), hits=Count("id", filter=Q(cache_hit=True)))
+        if stats["total"]:
+            hit_rate = round(stats["hits"] / stats["total"] * 100, 1)
+            self.message_user(request, f"Ответов из кэша: {stats['hits']} из {stats['total']} ({hit_rate}%)")
+        return super().changelist_view(request, extra_context=extra_context)
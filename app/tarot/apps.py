@@ -4,3 +4,6 @@ from django.apps import AppConfig
 class TarotConfig(AppConfig):
     default_auto_field = 'django.db.models.BigAutoField'
     name = 'tarot'
+
+    def ready(self):
+        from tarot import signals  # noqa: F401
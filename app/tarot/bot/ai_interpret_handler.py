@@ -1,12 +1,12 @@
 # ai_interpret_handler.py
+import asyncio
 import json
 import os
 from typing import List, Optional, Dict
 import redis.asyncio as aioredis
-import tiktoken
 import time
 import random
-from openai import AsyncOpenAI
+from functools import lru_cache
 
 from telegram import Update,  Message, InlineKeyboardMarkup, InlineKeyboardButton
 from telegram.ext import (
@@ -16,12 +16,10 @@ from telegram.ext import (
 from telegram.constants import ParseMode
 from telegram.error import BadRequest, RetryAfter
 
-from django.utils.timezone import now, timedelta
 from tg_bot.models import (
     TgUser, Bot
 )
 from tarot.models import (
-    AIReadingPage,
     UserReading,
     AIReadingInterpretation,
     AIApiKey
@@ -30,6 +28,11 @@ from server.logger import logger
 from django.conf import settings
 
 from tarot.utils.random import get_random_icon
+from tarot.utils.ai_stream import AIStreamBuffer, get_pages
+from tarot.utils.edit_coalescer import EditCoalescer
+from tarot.utils.ai_key_pool import ai_key_pool, is_quota_error
+from tarot.utils.ai_cache import make_prompt_fingerprint, find_cached_interpretation
+from tarot.utils.ai_queue import ai_job_queue, AIJobStatus
 
 # Инициализируем асинхронный клиент
 redis_client = aioredis.StrictRedis(
@@ -46,8 +49,23 @@ redis_client_bot = aioredis.StrictRedis(
 )
 
 REDIS_TTL_SECONDS = 10
+# Кулдаун между ИИ-запросами на одну пару провайдер/проект
+AI_COOLDOWN_SECONDS = 60
+AI_LAST_REQUEST_KEY_TEMPLATE = "ai:last_request:{provider}:{project}"
+AI_PROVIDERS_CACHE_TTL = 30
+
+AI_CRASH_TEXT = "❌ Произошел технический сбой. Пожалуйста, попробуйте создать новый расклад позже."
+AI_BUSY_TEXT = "⚠️ К сожалению, ИИ сейчас не может выполнить запрос. Попробуйте чуть позже."
+AI_CANCELLED_TEXT = "⏹ Генерация остановлена."
+DEFAULT_MODEL_NAME = "gemini-2.0-flash"
+# Сколько ключей пула пробуем, если ключ отказал до начала ответа
+MAX_KEY_ATTEMPTS = 3
 REDIS_KEY_TEMPLATE = "user:{user_id}:{category}"
 
+def get_last_request_key(provider: str, project_identifier: str) -> str:
+    return AI_LAST_REQUEST_KEY_TEMPLATE.format(provider=provider, project=project_identifier or "default")
+
+
 def is_markup_identical(markup1, markup2):
     # Если оба None — они идентичны
     if markup1 is None and markup2 is None:
@@ -59,10 +77,16 @@ def is_markup_identical(markup1, markup2):
     # Большинство объектов в python-telegram-bot поддерживают прямое сравнение
     return markup1 == markup2
 
-encoding = tiktoken.get_encoding("o200k_base") 
+@lru_cache(maxsize=1)
+def get_encoding():
+    # tiktoken при первой загрузке кодировки качает и разбирает словарь —
+    # делаем это при первом подсчете токенов, а не при импорте бота
+    import tiktoken
+    return tiktoken.get_encoding("o200k_base")
+
 
 def count_tokens(text: str) -> int:
-    return len(encoding.encode(text))
+    return len(get_encoding().encode(text))
 
 class AIInterpretHandler:
     """Обработчик для запуска ИИ-интерпретации раскладов."""
@@ -75,6 +99,8 @@ class AIInterpretHandler:
             bot_instance: Экземпляр основного бота для доступа к его методам и логам
         """
         self.bot = bot_instance
+        # (время загрузки, пары провайдер/проект) для should_add_ai_button
+        self._providers_cache = (0.0, None)
     
     @property
     def app_bot_id(self):
@@ -94,26 +120,32 @@ class AIInterpretHandler:
                 self.handle_ai_navigation_callback, 
                 pattern=r"^aipaged_",
             ),
+            # Остановка трактовки в очереди воркера или во время стриминга
+            CallbackQueryHandler(
+                self.handle_ai_cancel_callback,
+                pattern=r"^aicancel_",
+            ),
         ]
         
-    async def get_ai_paged_data(self, ai_log: AIReadingInterpretation, page_number: int):
+    def get_ai_paged_data(
+        self,
+        ai_log_id: int,
+        page_number: int,
+        pages: List[str],
+        is_pending: bool,
+        cancel_data: Optional[str] = None,
+    ):
         """
         Возвращает текст страницы и соответствующую клавиатуру.
+        Страницы передаются готовыми: из буфера стриминга или из get_pages.
+        cancel_data — callback кнопки остановки, показывается, пока идет генерация.
         """
-        await ai_log.arefresh_from_db()
-        is_pending = (ai_log.status == AIReadingInterpretation.AIStatus.PENDING)
-        
-        # 1. Получаем все страницы из базы
-        pages_qs = AIReadingPage.objects.filter(interpretation=ai_log).order_by("page_number")
-        pages = []
-        async for p in pages_qs:
-            pages.append(p)
         total_pages = len(pages)
         
         # 2. Определение текста
-        # Если страница существует в БД — берем ее
+        # Если страница уже есть — берем ее
         if page_number < total_pages:
-            text = pages[page_number].content
+            text = pages[page_number]
         else:
             # Если мы запрашиваем "будущую" страницу во время стриминга
             text = "⏳ Трактовка дополняется..."
@@ -123,7 +155,7 @@ class AIInterpretHandler:
         
         # Левая кнопка
         left_btn = (
-            InlineKeyboardButton("◀", callback_data=f"aipaged_{ai_log.id}_{page_number - 1}") 
+            InlineKeyboardButton("◀", callback_data=f"aipaged_{ai_log_id}_{page_number - 1}") 
             if page_number > 0 
             else InlineKeyboardButton(random_icon, callback_data="aipaged_ignore")
         )
@@ -135,71 +167,85 @@ class AIInterpretHandler:
         # Правая кнопка
         # Если идет генерация или есть еще страницы — добавляем кнопку "Вперед"
         if is_pending or (page_number < total_pages - 1):
-            right_btn = InlineKeyboardButton("▶", callback_data=f"aipaged_{ai_log.id}_{page_number + 1}")
+            right_btn = InlineKeyboardButton("▶", callback_data=f"aipaged_{ai_log_id}_{page_number + 1}")
         else:
             right_btn = InlineKeyboardButton(random_icon, callback_data="aipaged_ignore")
 
-        keyboard = InlineKeyboardMarkup(inline_keyboard=[[left_btn, center_btn, right_btn]])
+        inline_keyboard = [[left_btn, center_btn, right_btn]]
+        if is_pending and cancel_data:
+            inline_keyboard.append([InlineKeyboardButton("⏹ Остановить", callback_data=cancel_data)])
+        keyboard = InlineKeyboardMarkup(inline_keyboard=inline_keyboard)
         
         return text, keyboard
 
+    async def get_ai_providers(self) -> list[tuple[str, str]]:
+        """
+        Пары провайдер/проект исправных ключей бота.
+        Кэшируются локально на AI_PROVIDERS_CACHE_TTL, чтобы проверка кнопки не ходила в БД.
+        """
+        cached_at, providers = self._providers_cache
+        if providers is not None and time.monotonic() - cached_at < AI_PROVIDERS_CACHE_TTL:
+            return providers
+
+        healthy_keys = await ai_key_pool.get_healthy_keys(self.app_bot_id)
+        providers = sorted({(key.provider, key.project_identifier) for key in healthy_keys})
+        self._providers_cache = (time.monotonic(), providers)
+        return providers
+
+    async def mark_ai_request(self, api_key: AIApiKey):
+        """Запоминает время запроса к провайдеру ключа; ключ живет ровно столько, сколько кулдаун."""
+        try:
+            await redis_client.set(
+                get_last_request_key(api_key.provider, api_key.project_identifier),
+                time.time(),
+                ex=AI_COOLDOWN_SECONDS,
+            )
+        except Exception as e:
+            logger.warning(f"Не удалось записать кулдаун ИИ для ключа #{api_key.id}: {e}")
+
+    async def mark_ai_enqueued(self):
+        """
+        Занимает кулдаун при постановке трактовки в очередь воркера.
+        Ключ воркер выберет позже, поэтому занимаем первую свободную пару провайдер/проект:
+        иначе до старта задачи кнопка остается у всех и очередь забивается новыми трактовками.
+        """
+        try:
+            for provider, project_identifier in await self.get_ai_providers():
+                if await redis_client.set(
+                    get_last_request_key(provider, project_identifier),
+                    time.time(),
+                    ex=AI_COOLDOWN_SECONDS,
+                    nx=True,
+                ):
+                    return
+        except Exception as e:
+            logger.warning(f"Не удалось записать кулдаун ИИ при постановке в очередь: {e}")
+
     async def should_add_ai_button(self) -> bool:
         """
         Проверяет кулдаун на ИИ-генерации.
-        Если передан bot_obj, ищет его активный ключ и фильтрует интерпретации 
-        по провайдеру и идентификатору проекта этого ключа.
-        Иначе — проверяет глобально по всей базе.
+        Кулдаун считается отдельно для каждой пары провайдер/проект среди исправных
+        ключей бота: кнопка показывается, если свободна хотя бы одна пара.
+        Время последнего запроса лежит в Redis с TTL кулдауна — проверка одним MGET.
         """
-        AI_TIMEOUT = timedelta(seconds=60)
-        
         try:
-            # Базовый кверисет для поиска прошлых интерпретаций
-            interpretations_qs = AIReadingInterpretation.objects.all()
-            bot_obj = await Bot.objects.filter(id=self.app_bot_id).afirst()
-            
-            if bot_obj:
-                # 1. Ищем активный и неисчерпанный ключ для данного бота
-                # Берем самый свежий из доступных (или добавь свою логику приоритета)
-                active_key = await AIApiKey.objects.filter(
-                    bot=bot_obj,
-                    is_active=True,
-                    is_exhausted=False
-                ).order_by("-updated_at").afirst()
-                
-                if active_key:
-                    # 2. Фильтруем прошлые запуски ИИ именно по этому провайдеру и проекту.
-                    # Учитываем, что проект может быть пустой строкой или None.
-                    interpretations_qs = interpretations_qs.filter(
-                        ai_key__provider=active_key.provider,
-                        ai_key__project_identifier=active_key.project_identifier
-                    )
-                    logger.info(
-                        f"Проверка кулдауна ИИ для бота {bot_obj.username} по ключу: "
-                        f"Провайдер={active_key.provider}, Проект={active_key.project_identifier or 'дефолт'}"
-                    )
-                else:
-                    # Если у бота вообще нет активного ключа в базе, то и кулдаун проверять не для кого.
-                    # Кнопку можно не добавлять (или вернуть True, а ошибку отловить уже при клике)
-                    logger.warning(f"У бота {bot_obj.username} не найдено активных AI-ключей.")
-                    return False
-            else:
-                logger.info("Проверка кулдауна ИИ выполняется глобально (без привязки к боту/ключу).")
-
-            # 3. Получаем самую последнюю интерпретацию по выстроенным фильтрам
-            latest_interpretation = await interpretations_qs.order_by("-created_at").afirst()
-            
-            if latest_interpretation is None:
-                # Запросов с такими параметрами еще не было — кулдауна нет
-                return True
-                
-            time_passed = now() - latest_interpretation.created_at
-            
-            if time_passed > AI_TIMEOUT:
+            providers = await self.get_ai_providers()
+            if not providers:
+                # Если у бота нет исправного ключа, то и кулдаун проверять не для кого.
+                logger.warning(f"У бота {self.app_bot_id} не найдено активных AI-ключей.")
+                return False
+
+            last_requests = await redis_client.mget([
+                get_last_request_key(provider, project_identifier)
+                for provider, project_identifier in providers
+            ])
+            if any(last_request is None for last_request in last_requests):
                 return True
-                
+
+            time_passed = time.time() - max(float(last_request) for last_request in last_requests)
             logger.info(
-                f"ИИ-лимит активен. На этом провайдере/проекте запрос был {time_passed.total_seconds():.1f} сек. назад. "
-                f"Кнопка скрыта."
+                f"ИИ-лимит активен на всех провайдерах бота {self.app_bot_id}: "
+                f"последний запрос {time_passed:.1f} сек. назад. Кнопка скрыта."
             )
             return False
             
@@ -207,30 +253,22 @@ class AIInterpretHandler:
             logger.error(f"Ошибка при проверке кулдауна ИИ: {e}", exc_info=True)
             return False
 
-    async def run_ai_interpretation(self, reading: UserReading, message: Message) -> str:
+    async def run_ai_interpretation(
+        self,
+        reading: UserReading,
+        message: Message,
+        cancel_data: Optional[str] = None,
+    ) -> AIReadingInterpretation:
         """
         Выполняет запрос к AI на основе сохраненного расклада.
         Стримит ответ в Telegram, редактируя переданное сообщение `message`.
+        При отмене задачи (CancelledError) сохраняет уже полученный текст и пробрасывает отмену.
         """
-        # 1. Получаем бота и его активный ключ
+        # 1. Получаем бота и занимаем слот в наименее загруженном ключе пула
         bot_obj = await Bot.objects.filter(id=self.app_bot_id).afirst()
         if not bot_obj:
             raise ValueError(f"Бот с ID {self.app_bot_id} не найден в БД.")
 
-        active_key = await AIApiKey.objects.filter(
-            bot=bot_obj,
-            is_active=True,
-            is_exhausted=False
-        ).order_by("-updated_at").afirst()
-
-        if not active_key:
-            raise ValueError(f"У бота {bot_obj.username} нет активных API-ключей.")
-
-        # 2. Определяем параметры подключения и модель
-        base_url = active_key.custom_base_url if active_key.provider == AIApiKey.ProviderUrl.CUSTOM else active_key.provider
-        model_name = active_key.override_model_name or "gemini-2.0-flash"
-
-        prompt_system = active_key.system_prompt
         prompt_user = (
             f"Сделай мне трактовку расклада.\n"
             f"Инструмент/Категория: {reading.get_category_display()}\n"
@@ -238,54 +276,96 @@ class AIInterpretHandler:
         )
         if reading.original_query:
             prompt_user += f"\n\n💬 Вопрос/Контекст пользователя: {reading.original_query.strip()}"
+
+        # Такой же расклад с тем же системным промптом уже трактовали — отдаем готовые страницы
+        healthy_keys = await ai_key_pool.get_healthy_keys(bot_obj.id)
+        fingerprints = {key.id: make_prompt_fingerprint(key.system_prompt, reading) for key in healthy_keys}
+        cached_log = await find_cached_interpretation(set(fingerprints.values()))
+        if cached_log:
+            replayed_log = await self.replay_cached_interpretation(reading, message, cached_log, prompt_user)
+            if replayed_log:
+                return replayed_log
+
+        lease = await ai_key_pool.acquire(bot_obj.id, keys=healthy_keys)
+        if not lease:
+            raise ValueError(f"ИИ занят: у бота {bot_obj.username} нет свободных API-ключей.")
+        active_key = lease.key
+
+        # 2. Определяем параметры подключения и модель
+        model_name = active_key.override_model_name or DEFAULT_MODEL_NAME
+        prompt_system = active_key.system_prompt
         
         # 3. Создаем предварительную запись в базе со статусом PENDING
-        ai_log = await AIReadingInterpretation.objects.acreate(
-            reading=reading,
-            ai_key=active_key,
-            model_used=model_name,
-            prompt_system=prompt_system,
-            prompt_user=prompt_user,
-            status=AIReadingInterpretation.AIStatus.PENDING
+        try:
+            ai_log = await AIReadingInterpretation.objects.acreate(
+                reading=reading,
+                ai_key=active_key,
+                model_used=model_name,
+                prompt_system=prompt_system,
+                prompt_user=prompt_user,
+                prompt_fingerprint=fingerprints[active_key.id],
+                status=AIReadingInterpretation.AIStatus.PENDING
+            )
+        except Exception:
+            await ai_key_pool.release(lease)
+            raise
+
+        await self.mark_ai_request(active_key)
+        logger.info(
+            f"Запущен стриминг-запрос к ИИ [Лог #{ai_log.id}] через {active_key.final_base_url}, "
+            f"ключ #{active_key.id}, модель: {model_name}"
         )
 
-        logger.info(f"Запущен стриминг-запрос к ИИ [Лог #{ai_log.id}] через {base_url}, модель: {model_name}")
+        # Страницы копятся в буфере и пишутся в БД пачками, а не по одной
+        stream_buffer = AIStreamBuffer(ai_log.id)
+        await stream_buffer.start()
+        # Частоту правок сообщения подбирает коалесцер по задержке Telegram и 429
+        coalescer = EditCoalescer(message)
+        buffer_text = ""          # Накапливаем текст для текущей страницы
 
         try:
-            # 4. Инициализируем клиент OpenAI
-            client = AsyncOpenAI(
-                api_key=active_key.api_key,
-                base_url=base_url
-            )
-
-            extra_headers = {}
-            if active_key.project_identifier:
-                extra_headers["X-Goog-User-Project"] = active_key.project_identifier
-                
-            prompt_text = prompt_system + prompt_user
-            prompt_tokens = len(encoding.encode(prompt_text))
-            
             full_response_text = ""
 
-            # 5. Делаем асинхронный запрос с параметром stream=True
-            response_stream = await client.chat.completions.create(
-                model=model_name,
-                messages=[
-                    {"role": "system", "content": prompt_system},
-                    {"role": "user", "content": prompt_user}
-                ],
-                extra_headers=extra_headers if extra_headers else None,
-                stream=True  
-            )
+            # 4-5. Открываем стрим. Если ключ отказал до начала ответа (квота, сеть),
+            # переключаемся на следующий ключ пула
+            tried_key_ids = set()
+            while True:
+                try:
+                    response_stream = await self.open_ai_stream(active_key, model_name, prompt_system, prompt_user)
+                    break
+                except Exception as e:
+                    tried_key_ids.add(active_key.id)
+                    if is_quota_error(e):
+                        await ai_key_pool.mark_exhausted(active_key)
+
+                    next_lease = None
+                    if len(tried_key_ids) < MAX_KEY_ATTEMPTS:
+                        next_lease = await ai_key_pool.acquire(bot_obj.id, exclude=tried_key_ids, keys=healthy_keys)
+                    if not next_lease:
+                        raise
+
+                    logger.warning(
+                        f"Ключ #{active_key.id} не ответил ({e}), [Лог #{ai_log.id}] переключается на ключ #{next_lease.key.id}"
+                    )
+                    await ai_key_pool.release(lease)
+                    lease = next_lease
+                    active_key = lease.key
+                    model_name = active_key.override_model_name or DEFAULT_MODEL_NAME
+                    prompt_system = active_key.system_prompt
+
+                    ai_log.ai_key = active_key
+                    ai_log.model_used = model_name
+                    ai_log.prompt_system = prompt_system
+                    ai_log.prompt_fingerprint = fingerprints[active_key.id]
+                    await ai_log.asave(
+                        update_fields=["ai_key", "model_used", "prompt_system", "prompt_fingerprint", "updated_at"]
+                    )
+                    await self.mark_ai_request(active_key)
 
             # Переменные для сборки текста
-            buffer_text = ""          # Накапливаем текст для текущей страницы
             page_number = 0          
             page_counter = 0          
-            chunk_counter = 0
             LEN_LIMIT = 500
-            TG_UPDATE_INTERVAL = 1
-            last_tg_update_time = time.time()
             
             prompt_tokens = 0
             completion_tokens = 0
@@ -298,9 +378,7 @@ class AIInterpretHandler:
             # Если пользовательский запрос пустой, пишем "Пусто"
             user_text = prompt_user if prompt_user.strip() else "пусто"
 
-            await message.edit_text(
-                text=f"Системный промпт: {system_snippet}\n\nЗапрос: {user_text}"
-            )
+            await coalescer.update(f"Системный промпт: {system_snippet}\n\nЗапрос: {user_text}")
 
             # Читаем чанки по мере их поступления от API
             async for chunk in response_stream:
@@ -309,7 +387,6 @@ class AIInterpretHandler:
                     full_response_text += content
                     
                     buffer_text += content
-                    chunk_counter += 1
                     
                     # 1. Проверка лимита: если накопили 1000 — фиксируем страницу в БД
                     if len(buffer_text) >= LEN_LIMIT:
@@ -319,59 +396,31 @@ class AIInterpretHandler:
                         page_content = buffer_text[:split_index].strip()
                         buffer_text = buffer_text[split_index:].lstrip()
                         
-                        await AIReadingPage.objects.acreate(
-                            interpretation=ai_log,
-                            content=page_content,
-                            page_number=page_counter
-                        )
+                        await stream_buffer.add_page(page_content)
                         page_counter += 1
-                        chunk_counter = 0
                         # Теперь page_counter указывает на следующую (пустую) страницу
 
-                    # 2. Обновление Telegram
-                    current_time = time.time()
-                    time_since_last_update = current_time - last_tg_update_time
-                    is_first_chunk_of_page = (chunk_counter == 1)
-
-                    if (
-                            page_counter == 0 and
-                            time_since_last_update > TG_UPDATE_INTERVAL and
-                            len(buffer_text) > 10
-                        ):
-                        if buffer_text.strip():
-                            try:
-                                text, keyboard = await self.get_ai_paged_data(ai_log, page_number)
-                                await message.edit_text(
-                                    text=buffer_text.strip(), 
-                                    reply_markup=keyboard
-                                )
-                                last_tg_update_time = current_time
-                            except Exception as e:
-                                if "message is not modified" not in str(e).lower():
-                                    logger.warning(f"Ошибка обновления TG: {e}")
-                    elif page_counter > 0 and is_first_chunk_of_page:
-                        text, keyboard = await self.get_ai_paged_data(ai_log, page_number)
-                        
-                        try:
-                            if not is_markup_identical(message.reply_markup, keyboard):
-                                await message.edit_reply_markup(reply_markup=keyboard)
-                        except BadRequest as e:
-                            if "Message is not modified" not in str(e):
-                                raise e
+                    # 2. Обновление Telegram: пока первая страница не готова, показываем ее по мере роста,
+                    # потом — готовую первую страницу; одинаковые правки коалесцер не отправляет
+                    if page_counter > 0 or len(buffer_text) > 10:
+                        visible_text = stream_buffer.pages[0] if page_counter else buffer_text.strip()
+                        text, keyboard = self.get_ai_paged_data(
+                            ai_log.id, page_number, stream_buffer.pages, is_pending=True, cancel_data=cancel_data
+                        )
+                        await coalescer.update(visible_text, keyboard)
                 if chunk.usage:
                     prompt_tokens = chunk.usage.prompt_tokens
                     completion_tokens = chunk.usage.completion_tokens
                     total_tokens = chunk.usage.total_tokens
 
-            if buffer_text:
-                await AIReadingPage.objects.acreate(
-                    interpretation=ai_log,
-                    content=buffer_text,
-                    page_number=page_counter
-                )
+            # Хвост забираем до записи, чтобы при ошибке в finish он не попал в буфер дважды
+            tail, buffer_text = buffer_text, ""
+            await stream_buffer.finish(AIReadingInterpretation.AIStatus.SUCCESS, tail=tail)
             
             if not completion_tokens:
-                completion_tokens = len(encoding.encode(full_response_text))
+                # Провайдер не прислал usage — считаем токены сами
+                prompt_tokens = prompt_tokens or count_tokens(prompt_system + prompt_user)
+                completion_tokens = count_tokens(full_response_text)
                 total_tokens = prompt_tokens + completion_tokens
             
             # 8. Обновляем лог — УСПЕХ
@@ -381,46 +430,114 @@ class AIInterpretHandler:
             ai_log.status = AIReadingInterpretation.AIStatus.SUCCESS
             await ai_log.asave()
             
-            text, keyboard = await self.get_ai_paged_data(ai_log, page_number)
-            await message.edit_text(text=text, reply_markup=keyboard)
+            text, keyboard = self.get_ai_paged_data(
+                ai_log.id, page_number, stream_buffer.pages, is_pending=False
+            )
+            await coalescer.flush(text, keyboard)
 
-            logger.info(f"Стриминг ИИ #{ai_log.id} успешно завершен.")
+            logger.info(f"Стриминг ИИ #{ai_log.id} успешно завершен, правок сообщения: {coalescer.edits_sent}")
             return ai_log
 
+        except asyncio.CancelledError:
+            # Пользователь нажал «Остановить» или вышел таймаут воркера: сохраняем, что успели
+            logger.info(f"Стриминг ИИ #{ai_log.id} остановлен.")
+            try:
+                await stream_buffer.finish(AIReadingInterpretation.AIStatus.FAILED, tail=buffer_text)
+
+                ai_log.status = AIReadingInterpretation.AIStatus.FAILED
+                ai_log.error_message = "Генерация остановлена"
+                await ai_log.asave()
+
+                if stream_buffer.pages:
+                    text, keyboard = self.get_ai_paged_data(ai_log.id, 0, stream_buffer.pages, is_pending=False)
+                    await coalescer.flush(text, keyboard)
+                else:
+                    await coalescer.flush(AI_CANCELLED_TEXT)
+            except Exception as cancel_err:
+                logger.error(f"Не удалось сохранить остановленный лог #{ai_log.id}: {cancel_err}")
+            raise
+
         except Exception as e:
             # 9. Обновляем лог — ОШИБКА
             logger.error(f"Ошибка при стриминге API ИИ в логе #{ai_log.id}: {e}", exc_info=True)
+
+            # Уже сгенерированные страницы сохраняем вместе с недособранной последней
+            try:
+                await stream_buffer.finish(AIReadingInterpretation.AIStatus.FAILED, tail=buffer_text)
+            except Exception as buffer_err:
+                logger.error(f"Не удалось сохранить страницы лога #{ai_log.id}: {buffer_err}")
             
             ai_log.status = AIReadingInterpretation.AIStatus.FAILED
             ai_log.error_message = str(e)
             await ai_log.asave()
 
             # 10. ПРОВЕРКА ЛИМИТОВ КЛЮЧА
-            # Переводим текст ошибки в нижний регистр для надежного поиска совпадений
-            err_msg = str(e).lower()
-            
-            # Признаки того, что ключ исчерпан (429, 403, quota, rate limit)
-            is_quota_error = any(
-                phrase in err_msg 
-                for phrase in ["429", "rate_limit", "quota", "too many requests", "exhausted", "limit exceeded"]
-            )
-            
-            if is_quota_error:
-                logger.warning(f"💥 Обнаружено исчерпание лимитов для ключа #{active_key.id}! Отключаем.")
-                try:
-                    # Помечаем в БД, что лимит исчерпан
-                    active_key.is_exhausted = True
-                    # Опционально: можно заблокировать на 1 час вперед, если нужно
-                    # from django.utils import timezone
-                    # api_key_obj.exhausted_until = timezone.now() + timezone.timedelta(hours=1)
-                    
-                    await active_key.asave()
-                    logger.info(f"Ключ #{active_key.id} успешно переведен в статус is_exhausted=True")
-                except Exception as db_err:
-                    logger.error(f"Не удалось обновить статус API ключа в БД: {db_err}")
+            # Ключ исчерпан (429, quota) — отключаем до exhausted_until, пул вернет его сам
+            if is_quota_error(e) and not active_key.is_exhausted:
+                await ai_key_pool.mark_exhausted(active_key)
 
             # Пробрасываем ошибку дальше, чтобы сработал верхний уровень (например, возврат кнопки пользователю)
             raise e
+        finally:
+            await ai_key_pool.release(lease)
+
+    async def replay_cached_interpretation(
+        self,
+        reading: UserReading,
+        message: Message,
+        source_log: AIReadingInterpretation,
+        prompt_user: str,
+    ) -> AIReadingInterpretation | None:
+        """
+        Показывает страницы готовой интерпретации без запроса к модели.
+        Попадание пишется отдельной записью с cache_hit=True — по ним считается доля попаданий.
+        """
+        _, pages = await get_pages(source_log.id)
+        if not pages:
+            return None
+
+        # ai_key не заполняем: попадание не тратит квоту ключа и не должно влиять на его кулдаун
+        ai_log = await AIReadingInterpretation.objects.acreate(
+            reading=reading,
+            model_used=source_log.model_used,
+            prompt_system=source_log.prompt_system,
+            prompt_user=prompt_user,
+            prompt_fingerprint=source_log.prompt_fingerprint,
+            cache_hit=True,
+            source_interpretation=source_log,
+            status=AIReadingInterpretation.AIStatus.SUCCESS
+        )
+
+        # Навигация идет по страницам исходной интерпретации
+        text, keyboard = self.get_ai_paged_data(source_log.id, 0, pages, is_pending=False)
+        await message.edit_text(text=text, reply_markup=keyboard)
+
+        logger.info(f"ИИ-трактовка [Лог #{ai_log.id}] взята из кэша: исходный лог #{source_log.id}")
+        return ai_log
+
+    async def open_ai_stream(self, api_key: AIApiKey, model_name: str, prompt_system: str, prompt_user: str):
+        """Открывает стриминг-запрос к провайдеру ключа."""
+        # openai тяжелый при импорте, а нужен только на первом запросе к ИИ
+        from openai import AsyncOpenAI
+
+        client = AsyncOpenAI(
+            api_key=api_key.api_key,
+            base_url=api_key.final_base_url
+        )
+
+        extra_headers = {}
+        if api_key.project_identifier:
+            extra_headers["X-Goog-User-Project"] = api_key.project_identifier
+
+        return await client.chat.completions.create(
+            model=model_name,
+            messages=[
+                {"role": "system", "content": prompt_system},
+                {"role": "user", "content": prompt_user}
+            ],
+            extra_headers=extra_headers if extra_headers else None,
+            stream=True  
+        )
         
     async def handle_ai_reading_callback(self, update: Update, context: CallbackContext):
         query = update.callback_query
@@ -463,11 +580,11 @@ class AIInterpretHandler:
             if is_critical:
                 logger.error(f"Критическая ошибка: {e}", exc_info=True)
                 display_btn_text = "💥 Ошибка"
-                error_text = "❌ Произошел технический сбой. Пожалуйста, попробуйте создать новый расклад позже."
+                error_text = AI_CRASH_TEXT
             else:
                 logger.warning(f"Бизнес-ошибка ({query.data}): {e}")
                 display_btn_text = "⏳ ИИ занят" if "занят" in str(e).lower() else "🔄 Ошибка обработки"
-                error_text = "⚠️ К сожалению, ИИ сейчас не может выполнить запрос. Попробуйте чуть позже."
+                error_text = AI_BUSY_TEXT
 
             # 2. Обновление клавиатуры
             error_markup = get_keyboard_with_error(display_btn_text, message)
@@ -505,6 +622,15 @@ class AIInterpretHandler:
             # 2. УСПЕХ: Удаляем кнопку и запускаем процесс
             new_markup = get_keyboard_without_button()
             await query.edit_message_reply_markup(reply_markup=new_markup)
+            if settings.AI_WORKER_ENABLED:
+                # Стрим пойдет в воркере run_ai_worker, цикл апдейтов бота его не ждет
+                message = await query.message.reply_text(
+                    '⏳ Трактовка в очереди...',
+                    reply_to_message_id=reading.message_id,
+                )
+                await self.enqueue_ai_interpretation(query, reading, message)
+                return
+
             message = await query.message.reply_text(
                 '⏳ Начинаем генерацию...', 
                 reply_to_message_id=reading.message_id,
@@ -528,13 +654,49 @@ class AIInterpretHandler:
         _, ai_log_id, page_num = query.data.split("_")
         page_number = int(page_num)
         
-        ai_log = await AIReadingInterpretation.objects.aget(id=ai_log_id)
-        
-        # Если статус PENDING, просто уведомляем
-        if ai_log.status == AIReadingInterpretation.AIStatus.PENDING:
-            await query.answer("⏳ Подождите, генерация еще идет...", show_alert=False)
+        # Во время генерации страницы отдаются из буфера стриминга, без чтения БД
+        status, pages = await get_pages(int(ai_log_id))
+        if status is None:
+            await query.answer("Трактовка не найдена", show_alert=False)
             return
 
-        text, keyboard = await self.get_ai_paged_data(ai_log, page_number)
+        is_pending = (status == AIReadingInterpretation.AIStatus.PENDING)
+        text, keyboard = self.get_ai_paged_data(int(ai_log_id), page_number, pages, is_pending)
         await query.edit_message_text(text=text, reply_markup=keyboard)
-        await query.answer()
\ No newline at end of file
+        await query.answer()
+
+    async def enqueue_ai_interpretation(self, query, reading: UserReading, message: Message):
+        """Ставит трактовку в очередь воркера; сообщение `message` воркер будет править сам."""
+        job_id, ahead = await ai_job_queue.enqueue(
+            query.from_user.id,
+            bot_id=self.app_bot_id,
+            reading_id=reading.id,
+            chat_id=message.chat_id,
+            chat_type=message.chat.type,
+            message_id=message.message_id,
+        )
+        if not job_id:
+            raise ValueError("⏳ ИИ занят: у пользователя уже есть трактовки в очереди")
+        await self.mark_ai_enqueued()
+
+        text = '⏳ Трактовка в очереди...'
+        if ahead:
+            text += f' Впереди: {ahead}'
+        keyboard = InlineKeyboardMarkup([[InlineKeyboardButton("⏹ Остановить", callback_data=f"aicancel_{job_id}")]])
+        await message.edit_text(text, reply_markup=keyboard)
+        logger.info(f"ИИ-трактовка расклада #{reading.id} поставлена в очередь: задача {job_id}, впереди {ahead}")
+
+    async def handle_ai_cancel_callback(self, update: Update, context: CallbackContext):
+        """Обработка кнопки «Остановить» (aicancel_)."""
+        query = update.callback_query
+        job_id = query.data.split("_", 1)[1]
+
+        previous_status = await ai_job_queue.cancel(job_id, query.from_user.id)
+        if previous_status is None:
+            await query.answer("Трактовку уже не остановить", show_alert=False)
+            return
+
+        await query.answer("Останавливаем...")
+        # Запущенную задачу остановит воркер и сам поправит сообщение
+        if previous_status == AIJobStatus.QUEUED:
+            await query.edit_message_text(AI_CANCELLED_TEXT)
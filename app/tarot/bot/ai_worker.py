@@ -0,0 +1,145 @@
+# tarot/bot/ai_worker.py
+import asyncio
+from types import SimpleNamespace
+
+from django.utils.timezone import now
+from telegram import Bot as TelegramBot, Chat, Message
+from telegram.error import BadRequest
+
+from tg_bot.models import Bot
+from tarot.models import UserReading
+from tarot.bot.ai_interpret_handler import AIInterpretHandler, AI_BUSY_TEXT, AI_CRASH_TEXT
+from tarot.utils.ai_queue import ai_job_queue, AIJobStatus
+from server.logger import logger
+
+
+# Как часто проверяем, не отменили ли запущенные задачи (сек)
+CANCEL_CHECK_INTERVAL = 1
+# Дольше генерация идти не может — столько же живет аренда ключа в пуле
+JOB_TIMEOUT = 5 * 60
+
+
+class AIWorker:
+    """
+    Отдельный процесс для ИИ-трактовок.
+
+    Берет задачи из AIJobQueue по кругу пользователей, держит не больше
+    concurrency стримов одновременно и правит сообщение трактовки через
+    Bot API того бота, из которого пришла задача.
+    """
+
+    def __init__(self, concurrency: int):
+        self.semaphore = asyncio.Semaphore(concurrency)
+        self.running: dict[str, asyncio.Task] = {}
+        self.cancelled: set[str] = set()
+        self.telegram_bots: dict[int, TelegramBot] = {}
+        self.handlers: dict[int, AIInterpretHandler] = {}
+
+    async def run(self):
+        watcher = asyncio.create_task(self.watch_cancellations())
+        try:
+            while True:
+                await self.semaphore.acquire()
+                try:
+                    job = await ai_job_queue.dequeue()
+                except Exception as e:
+                    self.semaphore.release()
+                    logger.error(f"Ошибка чтения очереди ИИ: {e}", exc_info=True)
+                    await asyncio.sleep(CANCEL_CHECK_INTERVAL)
+                    continue
+
+                if job is None:
+                    self.semaphore.release()
+                    continue
+                self.running[job["id"]] = asyncio.create_task(self.run_job(job))
+        finally:
+            watcher.cancel()
+            for task in self.running.values():
+                task.cancel()
+            await asyncio.gather(*self.running.values(), return_exceptions=True)
+            for telegram_bot in self.telegram_bots.values():
+                await telegram_bot.shutdown()
+
+    async def watch_cancellations(self):
+        while True:
+            await asyncio.sleep(CANCEL_CHECK_INTERVAL)
+            try:
+                statuses = await ai_job_queue.get_statuses(list(self.running))
+            except Exception as e:
+                logger.warning(f"Не удалось проверить отмену ИИ-задач: {e}")
+                continue
+
+            for job_id, status in statuses.items():
+                task = self.running.get(job_id)
+                # Повторный cancel() прервал бы сохранение уже остановленной трактовки
+                if status == AIJobStatus.CANCELLED and task and job_id not in self.cancelled:
+                    self.cancelled.add(job_id)
+                    task.cancel()
+
+    async def get_telegram_bot(self, bot_id: int) -> TelegramBot:
+        if bot_id not in self.telegram_bots:
+            bot_obj = await Bot.objects.aget(id=bot_id)
+            telegram_bot = TelegramBot(bot_obj.token)
+            await telegram_bot.initialize()
+            self.telegram_bots[bot_id] = telegram_bot
+        return self.telegram_bots[bot_id]
+
+    def get_handler(self, bot_id: int) -> AIInterpretHandler:
+        # Обработчику от бота нужен только app_bot_id
+        if bot_id not in self.handlers:
+            self.handlers[bot_id] = AIInterpretHandler(SimpleNamespace(app_bot_id=bot_id))
+        return self.handlers[bot_id]
+
+    async def run_job(self, job: dict):
+        job_id = job["id"]
+        message = None
+        try:
+            bot_id = int(job["bot_id"])
+            telegram_bot = await self.get_telegram_bot(bot_id)
+
+            # Сообщение уже отправлено ботом, воркеру нужна только ссылка на него
+            message = Message(
+                message_id=int(job["message_id"]),
+                date=now(),
+                chat=Chat(id=int(job["chat_id"]), type=job["chat_type"]),
+            )
+            message.set_bot(telegram_bot)
+
+            reading = await UserReading.objects.aget(id=int(job["reading_id"]))
+            logger.info(f"Воркер ИИ взял задачу {job_id}: расклад #{reading.id}, бот {bot_id}")
+
+            await asyncio.wait_for(
+                self.get_handler(bot_id).run_ai_interpretation(reading, message, cancel_data=f"aicancel_{job_id}"),
+                timeout=JOB_TIMEOUT,
+            )
+            await ai_job_queue.set_status(job_id, AIJobStatus.DONE)
+
+        except asyncio.CancelledError:
+            # Трактовка уже сохранила, что успела, и поправила сообщение
+            logger.info(f"ИИ-задача {job_id} остановлена")
+            raise
+        except asyncio.TimeoutError:
+            # Как и при отмене, сообщение уже показывает сохраненную часть
+            logger.warning(f"ИИ-задача {job_id} остановлена по таймауту {JOB_TIMEOUT} сек")
+            await self.report_failure(job_id, None, None)
+        except ValueError as e:
+            logger.warning(f"ИИ-задача {job_id} не выполнена: {e}")
+            await self.report_failure(job_id, message, AI_BUSY_TEXT)
+        except Exception as e:
+            logger.error(f"Критическая ошибка ИИ-задачи {job_id}: {e}", exc_info=True)
+            await self.report_failure(job_id, message, AI_CRASH_TEXT)
+        finally:
+            self.running.pop(job_id, None)
+            self.cancelled.discard(job_id)
+            self.semaphore.release()
+
+    async def report_failure(self, job_id: str, message: Message | None, error_text: str | None):
+        try:
+            await ai_job_queue.set_status(job_id, AIJobStatus.FAILED)
+            if message and error_text:
+                await message.edit_text(error_text)
+        except BadRequest as br:
+            if "message is not modified" not in str(br).lower():
+                logger.warning(f"Не удалось сообщить об ошибке ИИ-задачи {job_id}: {br}")
+        except Exception as e:
+            logger.warning(f"Не удалось сообщить об ошибке ИИ-задачи {job_id}: {e}")
@@ -8,14 +8,13 @@ from telegram.ext import (
     filters
 )
 from telegram.constants import ParseMode
-from django.db.models import IntegerField
-from django.db.models.functions import Cast
 
 from tarot.models import (
     TarotCardItem,
     OraculumItem,
     UserReading,
 )
+from tarot.utils.album import get_album_index, ORACULUM_ALBUM_TYPES
 from server.logger import logger
 
 
@@ -71,23 +70,14 @@ class AllCardHandler:
         img_id = await card.aget_file_id(self.app_bot_id)
 
         # Определяем лимит для кнопок в зависимости от типа
-        if item_type == "card":
-            total_count = await TarotCardItem.objects.filter(tarot_card__card_id=target_id).acount()
-        elif item_type == "deck":
-            total_count = await TarotCardItem.objects.filter(deck_id=target_id).acount()
-        elif item_type == "all":
-            total_count = await TarotCardItem.objects.acount()
-        elif item_type == "oraculum-deck":
-            total_count = await OraculumItem.objects.filter(deck_id=target_id).acount()
-        elif item_type == "oraculum":
-            total_count = await OraculumItem.objects.acount()
-        elif item_type == "reading": 
+        if item_type == "reading":
             reading = await UserReading.objects.aget(id=target_id)
             if reading.card_ids[card_index].get('flip', False):
                 card_text += ' ⬇️'
             total_count = len(reading.card_ids)
         else:
-            total_count = 0
+            # Число страниц альбома берем из индекса, без COUNT по таблице
+            total_count = len(await get_album_index(item_type, None if target_id == "None" else target_id))
 
         keyboard = []
 
@@ -118,7 +108,7 @@ class AllCardHandler:
             reading = await UserReading.objects.aget(id=target_id)
             if card_index >= reading.count:
                 reading.count = card_index + 1
-                await reading.asave()
+                await reading.asave(update_fields=["count", "updated_at"])
             
             # Берем ID карты из списка сохраненных в ридинге
             card_info = reading.card_ids[card_index]
@@ -129,28 +119,16 @@ class AllCardHandler:
             
             return await TarotCardItem.objects.select_related('tarot_card', 'deck').aget(**filter_kwargs)
 
-        if item_type == "card":
-            base_query = TarotCardItem.objects.filter(tarot_card__card_id=target_id)
-        elif item_type == "deck":
-            base_query = TarotCardItem.objects.filter(
-                deck_id=target_id
-            ).order_by(Cast('tarot_card__card_id', output_field=IntegerField()))
-        elif item_type == "all":
-            base_query = TarotCardItem.objects.all().order_by(
-                'deck_id',
-                Cast('tarot_card__card_id', output_field=IntegerField())
-            )
-        elif item_type == "oraculum-deck":
-            base_query = OraculumItem.objects.filter(deck_id=target_id)
-        elif item_type == "oraculum":
-            base_query = OraculumItem.objects.all()
-        else:
+        # Альбомы листаются по индексу id в памяти: страница — выборка по первичному ключу
+        album_index = await get_album_index(item_type, target_id)
+        if not 0 <= card_index < len(album_index):
             return None
 
-        qs = base_query.select_related('tarot_card', 'deck').prefetch_related("files")[card_index : card_index + 1]
-        async for card in qs:
-            return card
-        return None
+        if item_type in ORACULUM_ALBUM_TYPES:
+            qs = OraculumItem.objects.select_related('deck')
+        else:
+            qs = TarotCardItem.objects.select_related('tarot_card', 'deck')
+        return await qs.prefetch_related("files").filter(id=album_index[card_index]).afirst()
 
     async def handle_album(self, update: Update, context: CallbackContext):
         """Обработчик команды /all."""
@@ -232,11 +210,11 @@ class AllCardHandler:
         
         user = await self.bot.get_or_create_tg_user(update)
         options = self.bot.parse_reading_options(msg_text)
-        reading = None
+        journal = None
 
         try:
-            # 1. Создание ридинга БЕЗ текста
-            reading = await self.bot.save_reading(
+            # 1. Расклад в статусе PENDING; карты и итог допишутся одним UPDATE
+            journal = await self.bot.start_reading(
                 user=user, 
                 message_id=update.effective_message.message_id,
                 text="", 
@@ -248,10 +226,6 @@ class AllCardHandler:
                 card_ids=[],
                 original_query=options.get('original_query'),
             )
-            # 2. Статус PENDING
-            reading.reading_status = UserReading.ReadingStatus.PENDING
-            await reading.asave(update_fields=['reading_status'])
-
             # Логика получения
             deck = await self.bot.get_deck(options.get("deck"), options.get("deck_keyword", None))
             cards = await self.bot.get_cards(
@@ -263,25 +237,22 @@ class AllCardHandler:
             )
             
             # Заполняем данные
-            reading.text = "Полная колода"
-            reading.deck_id = deck.id if deck else None
-            reading.card_ids = [{"id": str(c["card_id"]), "flip": c["flipped"]} for c in cards]
-            await reading.asave(update_fields=['text', 'deck_id', 'card_ids'])
-            
+            journal.update(
+                text="Полная колода",
+                deck_id=deck.id if deck else None,
+                card_ids=[{"id": str(c["card_id"]), "flip": c["flipped"]} for c in cards],
+            )
+            # 2. Статус SUCCESS — листалке нужен id расклада
+            reading = await journal.commit()
             
             # 3. Отправка
             original_card = cards[0]["card_instance"]
             card = await TarotCardItem.objects.select_related('tarot_card', 'deck').aget(id=original_card.id)
             img_id, card_text, keyboard = await self.make_only_card_message(card, reading.id, 0, item_type="reading")
             await update.message.reply_photo(img_id, caption=card_text, reply_markup=keyboard)
-            
-            # 4. Статус SUCCESS
-            reading.reading_status = UserReading.ReadingStatus.SUCCESS
-            await reading.asave(update_fields=['reading_status'])
 
         except Exception as e:
             logger.error(f"Ошибка /all: {e}", exc_info=True)
-            if reading:
-                reading.reading_status = UserReading.ReadingStatus.ERROR
-                await reading.asave(update_fields=['reading_status'])
+            if journal:
+                await journal.fail()
             await update.message.reply_text(self.bot.cards_handler.messages.get_error_message("generic", error_details=str(e)), ParseMode.HTML)
\ No newline at end of file
@@ -46,6 +46,7 @@ from tarot.models import (
     UserReading,
 )
 from tg_bot.models import BotFileCache
+from tarot.utils.reading_journal import ReadingJournal
 from server.logger import logger
 from django.conf import settings
 
@@ -105,7 +106,7 @@ class CardsHandler:
             MessageHandler(
                 filters.TEXT
                 & filters.ChatType.PRIVATE
-                & filters.Regex(r"^(?i)(таро|tarot)\s"),
+                & filters.Regex(r"(?i)^(таро|tarot)\s"),
                 self.handle_tarot_text,
             ),
             
@@ -133,7 +134,7 @@ class CardsHandler:
         if await self.bot.check_reading_cooldown(update, category):
             return
 
-        reading = None
+        journal = None
         try:
             user = await self.bot.get_or_create_tg_user(update)
             
@@ -151,8 +152,8 @@ class CardsHandler:
                 options = self.bot.parse_reading_options(msg_text)
             logger.info(f"Опции расклада разобраны: {options}")
 
-            # Создаём чтение сразу после парсинга опций
-            reading = await self.bot.save_reading(
+            # Расклад в статусе PENDING; карты и итог допишутся одним UPDATE
+            journal = await self.bot.start_reading(
                 user=user,
                 message_id=update.effective_message.message_id,
                 text="",
@@ -164,9 +165,6 @@ class CardsHandler:
                 card_ids=[],
                 original_query=options.get('original_query'),
             )
-            reading.reading_status = UserReading.ReadingStatus.PENDING
-            await reading.asave()
-
             status_message = await update.message.reply_text(
                 self.messages.get_loading(), parse_mode=ParseMode.HTML
             )
@@ -192,11 +190,12 @@ class CardsHandler:
                         ", ".join([await self.bot.format_card_name(c) for c in cards])
 
             # ✅ Успех — вставляем данные и меняем статус
-            reading.text = result_text
-            reading.deck_id = deck.id if deck else None
-            reading.card_ids = card_records
-            reading.reading_status = UserReading.ReadingStatus.SUCCESS
-            await reading.asave()
+            journal.update(
+                text=result_text,
+                deck_id=deck.id if deck else None,
+                card_ids=card_records,
+            )
+            reading = await journal.commit()
             logger.info(f"Результат гадания сохранен в БД, ID записи: {reading.id}")
 
             # 3. Подготовка клавиатуры и отправка
@@ -226,9 +225,8 @@ class CardsHandler:
         except Exception as e:
             logger.error(f"Ошибка при обработке команды /card: {e}", exc_info=True)
             # ❌ Ошибка
-            if reading:
-                reading.reading_status = UserReading.ReadingStatus.ERROR
-                await reading.asave()
+            if journal:
+                await journal.fail()
             await update.message.reply_text(
                 self.messages.get_error_message("generic", error_details=str(e)),
                 parse_mode=ParseMode.HTML
@@ -239,6 +237,7 @@ class CardsHandler:
         await query.answer()
         logger.info(f"Получен callback-запрос: {query.data}")
 
+        journal = None
         try:
             _, reading_id = query.data.split("_")
             user = await self.bot.get_or_create_tg_user(update)
@@ -255,9 +254,11 @@ class CardsHandler:
                 await query.edit_message_reply_markup(reply_markup=None)
                 return
 
-            # Статус: начинаем обработку
-            reading.reading_status = UserReading.ReadingStatus.PENDING
-            await reading.asave()
+            # PENDING в БД — защита от повторного нажатия, остальное пишется одной записью в конце
+            journal = await ReadingJournal.claim(reading)
+            if not journal:
+                logger.info(f"Расклад {reading_id} уже дополняется, повторное нажатие пропущено.")
+                return
 
             # === Подготовка данных ===
             exclude_cards = [str(item.get("id") if isinstance(item, dict) else item) for item in (reading.card_ids or [])]
@@ -272,8 +273,7 @@ class CardsHandler:
             )
 
             if not new_card:
-                reading.reading_status = UserReading.ReadingStatus.ERROR
-                await reading.asave()
+                await journal.fail()
                 await query.edit_message_text(
                     self.messages.get_error_message("no_cards")
                 )
@@ -285,11 +285,10 @@ class CardsHandler:
             new_card_data = [{"id": c["card_id"], "flip": c["flipped"]} for c in new_card]
             logger.info(f"Выбраны новые карты: {[c['name'] + ' ' + str(c['flipped']) for c in new_card]}")
 
-            reading.text = f"{reading.text}, {new_card_text}"
-            reading.count += 1
+            journal.update(text=f"{reading.text}, {new_card_text}", count=reading.count + 1)
             reading.card_ids.extend(new_card_data)
-            reading.reading_status = UserReading.ReadingStatus.SUCCESS
-            await reading.asave()
+            journal.mark_changed("card_ids")
+            await journal.commit()
 
             # === Отправка результата ===
             send_card_kwargs = {"reading_id": reading.id, "send_type": "tarot"}
@@ -304,9 +303,8 @@ class CardsHandler:
         except Exception as e:
             logger.error(f"Ошибка при обработке добора карты: {e}", exc_info=True)
             # ❌ Ошибка
-            if reading:
-                reading.reading_status = UserReading.ReadingStatus.ERROR
-                await reading.asave()
+            if journal:
+                await journal.fail()
             await query.edit_message_text(
                 self.messages.get_error_message("generic", error_details=str(e)),
                 parse_mode=ParseMode.HTML
@@ -320,13 +318,13 @@ class CardsHandler:
         if await self.bot.check_reading_cooldown(update, category):
             return
 
-        reading = None
+        journal = None
         try:
             user = await self.bot.get_or_create_tg_user(update)
             options = self.bot.parse_reading_options(msg_text)
 
-            # Создаём чтение сразу после парсинга
-            reading = await self.bot.save_reading(
+            # Расклад в статусе PENDING; карты и итог допишутся одним UPDATE
+            journal = await self.bot.start_reading(
                 user=user,
                 message_id=update.effective_message.message_id,
                 text="",
@@ -337,9 +335,6 @@ class CardsHandler:
                 is_major_only=False,
                 card_ids=[]
             )
-            reading.reading_status = UserReading.ReadingStatus.PENDING
-            await reading.asave()
-
             status_message = await update.message.reply_text(
                 self.messages.get_loading(), parse_mode=ParseMode.HTML,
             )
@@ -360,11 +355,12 @@ class CardsHandler:
             result_text = f"{deck.name if deck else 'Дефолтный оракул'}: " + \
                         ", ".join([await self.bot.format_card_name(c) for c in cards])
 
-            reading.text = result_text
-            reading.deck_id = deck.id if deck else None
-            reading.card_ids = card_records
-            reading.reading_status = UserReading.ReadingStatus.SUCCESS
-            await reading.asave()
+            journal.update(
+                text=result_text,
+                deck_id=deck.id if deck else None,
+                card_ids=card_records,
+            )
+            reading = await journal.commit()
             logger.info(f"Результат оракула сохранен в БД, ID: {reading.id}")
 
             # 4. Отправка карт
@@ -386,9 +382,8 @@ class CardsHandler:
 
         except Exception as e:
             logger.error(f"Ошибка при обработке команды /oraculum: {e}", exc_info=True)
-            if reading:
-                reading.reading_status = UserReading.ReadingStatus.ERROR
-                await reading.asave()
+            if journal:
+                await journal.fail()
             await update.message.reply_text(
                 self.messages.get_error_message("generic", error_details=str(e)),
                 parse_mode=ParseMode.HTML
@@ -400,7 +395,7 @@ class CardsHandler:
         await query.answer()
         logger.info(f"Получен callback-запрос: {query.data}")
         
-        reading = None
+        journal = None
         try:
             # Получаем reading_id напрямую из callback_data
             _, reading_id = query.data.split("_")
@@ -415,9 +410,11 @@ class CardsHandler:
                 )
                 return
 
-            # Статус: начинаем обработку
-            reading.reading_status = UserReading.ReadingStatus.PENDING
-            await reading.asave()
+            # PENDING в БД — защита от повторного нажатия, остальное пишется одной записью в конце
+            journal = await ReadingJournal.claim(reading)
+            if not journal:
+                logger.info(f"Расклад {reading_id} уже дополняется, повторное нажатие пропущено.")
+                return
             
             # 2. Подготовка исключений (извлекаем card_ids из БД)
             exclude_cards = [
@@ -435,8 +432,7 @@ class CardsHandler:
             )
 
             if not new_card:
-                reading.reading_status = UserReading.ReadingStatus.ERROR
-                await reading.asave()
+                await journal.fail()
                 await query.edit_message_text(
                     self.messages.get_error_message("no_cards")
                 )
@@ -447,11 +443,10 @@ class CardsHandler:
             new_card_text = ", ".join([await self.bot.format_card_name(c) for c in new_card])
             logger.info(f"Выбраны новые карты: {[c['name'] + ' ' + str(c['flipped']) for c in new_card]}")
             
-            reading.text = f"{reading.text}, {new_card_text}"
-            reading.count += 1
+            journal.update(text=f"{reading.text}, {new_card_text}", count=reading.count + 1)
             reading.card_ids.extend(new_card_data)
-            reading.reading_status = UserReading.ReadingStatus.SUCCESS
-            await reading.asave()
+            journal.mark_changed("card_ids")
+            await journal.commit()
 
             # 5. Отправка карты через унифицированный send_card
             await self.send_card(
@@ -466,9 +461,8 @@ class CardsHandler:
 
         except Exception as e:
             logger.error(f"Ошибка при доборе карты Оракула: {e}", exc_info=True)
-            if reading:
-                reading.reading_status = UserReading.ReadingStatus.ERROR
-                await reading.asave()
+            if journal:
+                await journal.fail()
             await query.edit_message_text(
                 self.messages.get_error_message("generic", error_details=str(e)),
                 parse_mode=ParseMode.HTML,
@@ -40,18 +40,16 @@ from tg_bot.models import (
 from tarot.models import (
     TarotDeck,
     TarotCardItem,
-    TarotCard,
-    ExtendedMeaning,
     OraculumDeck,
     OraculumItem,
     UserReading,
-    TarotMeaningCategory,
 )
 from tg_bot.models import BotFileCache
 from server.logger import logger
 from django.conf import settings
 
 from tarot.utils.random import get_random_icon
+from tarot.utils.meanings import get_meaning_catalog, get_meaning_pages
 
 # Инициализируем асинхронный клиент
 redis_client = aioredis.StrictRedis(
@@ -98,99 +96,22 @@ class MeaningHandler:
         ]
         
         
-    def split_text(self, text, chunk_size=1024):
-        # Шаг 1: разбиваем по строкам (как у тебя)
-        lines = text.split("\n")
-        chunks = []
-        current_chunk = ""
-
-        for line in lines:
-            needed_length = len(line)
-            if current_chunk:
-                needed_length += 1  # символ '\n'
-
-            if len(current_chunk) + needed_length > chunk_size:
-                if current_chunk:
-                    chunks.append(current_chunk)
-                current_chunk = line
-            else:
-                if current_chunk:
-                    current_chunk += "\n" + line
-                else:
-                    current_chunk = line
-
-        if current_chunk:
-            chunks.append(current_chunk)
-
-        # Шаг 2: теперь разбиваем каждый чанк, если он > chunk_size, по словам (~1024)
-        final_chunks = []
-
-        for chunk in chunks:
-            if len(chunk) <= chunk_size:
-                final_chunks.append(chunk)
-            else:
-                # Разбиваем большой чанк по словам, стараясь не превышать chunk_size
-                words = chunk.split(' ')
-                temp_chunk = ""
-                for word in words:
-                    # Проверяем, поместится ли слово в текущий подчанк
-                    test_chunk = temp_chunk + (" " if temp_chunk else "") + word
-                    if len(test_chunk) <= chunk_size:
-                        temp_chunk = test_chunk
-                    else:
-                        # Слово не помещается — сохраняем текущий подчанк и начинаем новый
-                        if temp_chunk:
-                            final_chunks.append(temp_chunk)
-                        temp_chunk = word  # начинаем с текущего слова
-                # Добавляем последний подчанк
-                if temp_chunk:
-                    final_chunks.append(temp_chunk)
-
-        # Шаг 3: массив уже плоский — ничего дополнительно "выравнивать" не нужно,
-        # потому что мы добавляли строки напрямую в final_chunks
-
-        return final_chunks
-        
     async def create_pagination_keyboard(
         self, reading_id, current_card_idx, meaning_type, current_page, total_pages, card_ids
     ):
         try:
-            card_id = card_ids[current_card_idx]
-            # Загружаем категории
-            all_meanings_qs = ExtendedMeaning.objects.prefetch_related(
-                "category_base"
-            ).filter(tarot_card__card_id=card_id)
-
-            # Собираем все значения в список через async for
-            meanings_list = []
-            async for item in all_meanings_qs:
-                # Предполагаем, что у item есть category_base
-                # Используем str() для ID, чтобы корректно сравнивать с meaning_type
-                cat_id = str(item.category_base.id)
-                cat_name = item.category_base.name
-                meanings_list.append((cat_id, cat_name))
-            
-            meanings_list.append(("base", "Базовый"))
-            meanings_list.sort(key=lambda x: x[1])
+            # Имена карт и категории берем из кэшированного индекса, без запросов в БД
+            catalog = await get_meaning_catalog()
+            meanings_list = catalog.get_categories(card_ids[current_card_idx])
 
             curr_m_idx = next((i for i, m in enumerate(meanings_list) if m[0] == str(meaning_type)), 0)
             # Индексы соседей
             idx_prev = current_card_idx - 1
             idx_next = current_card_idx + 1
 
-            # Получаем имена для кнопок (если они существуют)
-            # Внимание: для простоты запроса делаем асинхронный поиск
-            name_prev = None
-            if idx_prev >= 0:
-                card_obj = await TarotCard.objects.aget(card_id=card_ids[idx_prev])
-                name_prev = card_obj.name
-
-            name_next = None
-            if idx_next < len(card_ids):
-                card_obj = await TarotCard.objects.aget(card_id=card_ids[idx_next])
-                name_next = card_obj.name
-            
-            keyboard = []
+            # Имена для кнопок (если карты существуют)
+            name_prev = catalog.card_names.get(card_ids[idx_prev]) if idx_prev >= 0 else None
+            name_next = catalog.card_names.get(card_ids[idx_next]) if idx_next < len(card_ids) else None
 
             btn_prev_card = [f"{name_prev} ⬅️" if name_prev else get_random_icon(), 
                              f"meaning_{reading_id}_{idx_prev}_base_1" if name_prev else "meaning_ignore"]
@@ -239,33 +160,27 @@ class MeaningHandler:
         # 2. Получаем ID текущей карты из списка
         card_id = card_ids[card_index]
         
-        # 3. Получаем текст и делим его
-        text = await self.get_card_meaning(card_id, meaning_type)
-        text_parts = self.split_text(text)
+        # 3. Страницы трактовки (разбиты заранее и закэшированы)
+        text_parts = await get_meaning_pages(card_id, meaning_type)
         
-        # 4. ВЫЗОВ С 6 АРГУМЕНТАМИ
         keyboard = await self.create_pagination_keyboard(
             reading_id, 
             card_index, 
             meaning_type, 
             page, 
             len(text_parts), 
-            card_ids  # <--- Добавили недостающий аргумент
+            card_ids
         )
         
-        # 5. Имя карты для заголовка
-        base_card = await TarotCard.objects.aget(card_id=card_id)
-        
-        if meaning_type == "base":
-            header = "Базовый смысл"
-        else:
-            category_obj = await TarotMeaningCategory.objects.aget(id=meaning_type)
-            header = category_obj.name
+        # 4. Имя карты и заголовок
+        catalog = await get_meaning_catalog()
+        card_name = catalog.card_names.get(card_id, "")
+        header = catalog.get_header(meaning_type)
         
         # Отправка
         await update.effective_message.reply_text(
             text=(
-                f"<b>{base_card.name}</b>\n"
+                f"<b>{card_name}</b>\n"
                 f"{header}\n"
                 f"стр {page}/{len(text_parts)}\n\n"
                 f"{text_parts[page - 1]}"
@@ -274,26 +189,6 @@ class MeaningHandler:
             reply_to_message_id=reading.message_id,
             parse_mode=ParseMode.HTML,
         )
-    
-    async def get_card_meaning(self, card_id: str, meaning_type: str) -> str:
-        """
-        Универсальный метод получения текста трактовки.
-        """
-        try:
-            if meaning_type == "base":
-                card = await TarotCard.objects.aget(card_id=card_id)
-                return card.meaning
-            
-            # Предполагаем, что CategoryBase — имя модели, которое у тебя в коде
-            meaning_obj = await ExtendedMeaning.objects.filter(
-                tarot_card__card_id=card_id, 
-                category_base__id=meaning_type
-            ).aget()
-            
-            return meaning_obj.text
-        except Exception as e:
-            logger.error(f"Ошибка получения трактовки (card_id={card_id}, type={meaning_type}): {e}")
-            return "Трактовка не найдена."
         
     async def handle_pagination(self, update: Update, context: CallbackContext):
         query = update.callback_query
@@ -316,21 +211,16 @@ class MeaningHandler:
         card_ids = [str(item.get("id")) for item in (reading.card_ids or [])]
         card_id = card_ids[card_idx]
         
-        # 2. Получение текста
-        text = await self.get_card_meaning(card_id, meaning_type)
-        text_parts = self.split_text(text)
+        # 2. Страницы трактовки
+        text_parts = await get_meaning_pages(card_id, meaning_type)
         current_page = max(1, min(page, len(text_parts)))
         
         # 3. Имя карты и заголовок
-        base_card = await TarotCard.objects.aget(card_id=card_id)
-        
-        if meaning_type == "base":
-            header = "Базовый смысл"
-        else:
-            category_obj = await TarotMeaningCategory.objects.aget(id=meaning_type)
-            header = category_obj.name
+        catalog = await get_meaning_catalog()
+        card_name = catalog.card_names.get(card_id, "")
+        header = catalog.get_header(meaning_type)
 
-        # 4. Клавиатура (аргументы теперь совпадают 1 в 1)
+        # 4. Клавиатура
         keyboard = await self.create_pagination_keyboard(
             reading_id, 
             card_idx, 
@@ -341,7 +231,7 @@ class MeaningHandler:
         )
 
         await query.edit_message_text(
-            text=f"<b>{base_card.name}</b>\n<i>{header}</i>\nстр {current_page}/{len(text_parts)}\n\n{text_parts[current_page-1]}",
+            text=f"<b>{card_name}</b>\n<i>{header}</i>\nстр {current_page}/{len(text_parts)}\n\n{text_parts[current_page-1]}",
             reply_markup=keyboard,
             parse_mode="HTML"
         )
@@ -124,7 +124,7 @@ class OhHandler:
                 gtype = context.user_data["oh_cmd"]["type"]
                 dtype = "oraculum" if gtype == "oraculum" else "tarot"
 
-                decks, current, total = await self.make_decks_page(
+                decks, current, total = await self.bot.make_decks_page(
                     current_page=page, items_per_page=6, deck_type=dtype, mode="return"
                 )
 
@@ -212,7 +212,7 @@ class OhHandler:
         # Разбиваем 6 колод на ряды по 2 кнопки (получится 3 ряда)
         # Это удобно для "одной руки" — кнопки крупные и легко попадать большим пальцем
         row = []
-        async for deck in decks:
+        for deck in decks:
             row.append(
                 InlineKeyboardButton(str(deck.name), callback_data=f"oh_deck_set_{deck.id}")
             )
@@ -20,10 +20,8 @@ from telegram.ext import (
 from telegram.constants import ParseMode
 
 from tg_bot.models import TgUser, Bot
-from tarot.models import (
-    Rune,
-    UserReading,
-)
+from tarot.models import UserReading
+from tarot.utils.runes import get_rune_catalog
 from server.logger import logger
 from django.conf import settings
 
@@ -48,12 +46,17 @@ class RuneHandler:
     def __init__(self, bot_instance):
         self.bot = bot_instance
 
+    async def warmup(self):
+        """Загружает футарк при старте бота, чтобы первый /futhark не ждал БД."""
+        catalog = await get_rune_catalog()
+        logger.info(f"Футарк загружен: {len(catalog.runes)} рун")
+
     def get_handlers(self):
         return [
             MessageHandler(
                 filters.TEXT 
                 & filters.ChatType.PRIVATE
-                & filters.Regex(r"^(?i)(/futhark(?:_triplet)?|рун[аы](?:\s+триплет)?)$"),
+                & filters.Regex(r"(?i)^(/futhark(?:_triplet)?|рун[аы](?:\s+триплет)?)$"),
                 self.handle_rune_reading, # Ваш новый метод в RuneHandler
             ),
             CallbackQueryHandler(
@@ -67,15 +70,16 @@ class RuneHandler:
         return textwrap.wrap(text, chunk_size, replace_whitespace=False, drop_whitespace=False)
     
     async def get_rune_paged_and_keyboard(self, reading_id, position=None, page=0):
-        # 1. Забираем расклад из БД
+        # 1. Забираем расклад из БД; руны — из футарка в памяти
         reading = await UserReading.objects.aget(id=reading_id)
+        catalog = await get_rune_catalog()
         
         # Если позиция не передана, показываем общую информацию о раскладе
         if position is None:
             # Сначала собираем названия/символы для текста
             rune_list_text = []
             for item in reading.card_ids:
-                r = await Rune.objects.aget(id=item["id"])
+                r = catalog.get(item["id"])
                 # Добавляем эмодзи переворота, если нужно
                 emoji = " 🔄" if item.get("inverted") else ""
                 rune_list_text.append(f"{r.symbol} {r.type}{emoji}")
@@ -89,7 +93,7 @@ class RuneHandler:
         else:
             # 2. Находим данные текущей руны (только если позиция есть)
             rune_data = next((item for item in reading.card_ids if item["position"] == position), None)
-            rune = await Rune.objects.aget(id=rune_data["id"])
+            rune = catalog.get(rune_data["id"])
             inverted = rune_data["inverted"]
 
             # 3. Формируем текст руны
@@ -119,7 +123,7 @@ class RuneHandler:
         # 4. Ряд кнопок с рунами (формируется всегда)
         runes_row = []
         for item in reading.card_ids:
-            r = await Rune.objects.aget(id=item["id"])
+            r = catalog.get(item["id"])
             
             # НЕТ ВЫДЕЛЕНИЯ, если position is None
             symbol_text = r.symbol
@@ -144,10 +148,10 @@ class RuneHandler:
         if await self.bot.check_reading_cooldown(update, category):
             return
 
-        reading = None
+        journal = None
         try:
-            # 1. Создание БЕЗ текста
-            reading = await self.bot.save_reading(
+            # 1. Расклад в статусе PENDING; руны и итог допишутся одним UPDATE
+            journal = await self.bot.start_reading(
                 user=user,
                 message_id=update.effective_message.message_id,
                 text="",
@@ -155,39 +159,36 @@ class RuneHandler:
                 card_ids=[],
                 count=3 if is_triplet else 1
             )
-            # 2. Статус PENDING
-            reading.reading_status = UserReading.ReadingStatus.PENDING
-            await reading.asave(update_fields=['reading_status'])
-
-            runes = [rune async for rune in Rune.objects.all()]
+            catalog = await get_rune_catalog()
             
             if is_triplet:
-                raw_selected = random.sample(runes, 3)
-                reading.card_ids = [{"id": r.id, "inverted": random.choice([True, False]), "position": i + 1} for i, r in enumerate(raw_selected)]
-                reading.text = f"Рунный триплет {', '.join([r.symbol for r in raw_selected])}"
-                await reading.asave(update_fields=['text', 'card_ids'])
+                raw_selected = catalog.sample(3)
+                journal.update(
+                    card_ids=[{"id": r.id, "inverted": random.choice([True, False]), "position": i + 1} for i, r in enumerate(raw_selected)],
+                    text=f"Рунный триплет {', '.join([r.symbol for r in raw_selected])}",
+                )
+                # 2. Статус SUCCESS — кнопкам нужен id расклада
+                reading = await journal.commit()
                 
                 text, markup = await self.get_rune_paged_and_keyboard(reading.id, position=None)
                 await update.message.reply_text(text, parse_mode=ParseMode.HTML, reply_markup=markup)
             else:
-                random_rune = random.choice(runes)
+                random_rune = catalog.choice()
                 inverted = "flip" in msg_text.lower() and random.choice([True, False])
-                reading.card_ids = [{"id": random_rune.id, "inverted": inverted}]
-                reading.text = f"{random_rune.symbol} {'(Перевернуто)' if inverted else ''}"
-                await reading.asave(update_fields=['text','card_ids'])
+                journal.update(
+                    card_ids=[{"id": random_rune.id, "inverted": inverted}],
+                    text=f"{random_rune.symbol} {'(Перевернуто)' if inverted else ''}",
+                )
+                # 2. Статус SUCCESS
+                reading = await journal.commit()
                 
                 await update.message.reply_text(reading.text, parse_mode=ParseMode.HTML)
                 await update.message.reply_sticker(random_rune.sticker)
 
-            # 3. Статус SUCCESS
-            reading.reading_status = UserReading.ReadingStatus.SUCCESS
-            await reading.asave(update_fields=['reading_status'])
-
         except Exception as e:
             logger.error(f"Ошибка /futark: {e}", exc_info=True)
-            if reading:
-                reading.reading_status = UserReading.ReadingStatus.ERROR
-                await reading.asave(update_fields=['reading_status'])
+            if journal:
+                await journal.fail()
             await update.message.reply_text(self.messages.get_error_message("generic", error_details=str(e)))
 
     async def handle_rune_callback(self, update: Update, context: CallbackContext):
@@ -4,7 +4,6 @@ import os
 from typing import List, Optional, Dict
 
 import asyncio
-import json
 import redis.asyncio as aioredis
 from aiohttp import ClientError, ClientTimeout, ClientSession
 import random
@@ -50,10 +49,14 @@ from tarot.models import (
     DeckSearch,
 )
 from tg_bot.models import BotFileCache
+from tg_bot.services.bot_registry import bot_registry
+from tg_bot.services.user_cache import tg_user_cache
 from server.logger import logger
 from django.conf import settings
 
 from tarot.utils.image_utils import create_spread_image
+from tarot.utils.decks import get_deck_pages, get_rendered_deck_page
+from tarot.utils.reading_journal import ReadingJournal
 from tarot.bot.allcard_handler import AllCardHandler
 from tarot.bot.ai_interpret_handler import AIInterpretHandler
 from tarot.bot.rune_handler import RuneHandler
@@ -69,16 +72,35 @@ redis_client = aioredis.StrictRedis(
     db=3,
     decode_responses=True # Рекомендуется: автоматически декодирует bytes в строки python
 )
-redis_client_bot = aioredis.StrictRedis(
-    host=os.getenv("REDIS_HOST", "localhost"), 
-    port=int(os.getenv("REDIS_PORT", 6379)), 
-    db=2,
-    decode_responses=True # Рекомендуется: автоматически декодирует bytes в строки python
-)
 
 REDIS_TTL_SECONDS = 10
 REDIS_KEY_TEMPLATE = "user:{user_id}:{category}:{app_id}"
 
+# Проверка кулдауна за один запрос к Redis.
+# KEYS[1] - кулдаун запрошенной категории, KEYS[2] - ID сообщения о кулдауне,
+# KEYS[3..n] - кулдауны остальных категорий.
+# Возвращает {ttl} если кулдауна нет, иначе {ttl, msg_id, номера свободных категорий...}
+COOLDOWN_CHECK_LUA = """
+local ttl = redis.call('TTL', KEYS[1])
+if ttl <= 0 then
+    return {ttl}
+end
+local msg_id = redis.call('GET', KEYS[2])
+if msg_id then
+    redis.call('EXPIRE', KEYS[2], ttl)
+else
+    msg_id = ''
+end
+local result = {ttl, msg_id}
+for i = 3, #KEYS do
+    if redis.call('EXISTS', KEYS[i]) == 0 then
+        table.insert(result, i - 2)
+    end
+end
+return result
+"""
+cooldown_check_script = redis_client.register_script(COOLDOWN_CHECK_LUA)
+
 class TarotBot(AbstractBot):
     def __init__(self):
         self.allcard_handler = AllCardHandler(self)
@@ -88,6 +110,9 @@ class TarotBot(AbstractBot):
         self.cards_handler = CardsHandler(self)
         self.handlers = self.get_handlers()
 
+    async def warmup(self):
+        await self.rune_handler.warmup()
+
     def get_handlers(self):
         return [
             MessageHandler(filters.PHOTO, self.handle_photo_msg),
@@ -136,23 +161,13 @@ class TarotBot(AbstractBot):
         if not tg_user:
             return None
 
-        user_obj, _ = await TgUser.objects.aget_or_create(
-            tg_id=tg_user.id,
-            defaults={
-                "username": tg_user.username,
-                "first_name": tg_user.first_name,
-                "last_name": tg_user.last_name,
-                "language_code": tg_user.language_code,
-                "is_bot": tg_user.is_bot,
-            },
-        )
-        return user_obj
+        return await tg_user_cache.get_user(tg_user)
 
-    async def save_reading(
+    async def start_reading(
         self, 
         user: TgUser, 
         message_id: int, 
-        text: str, 
+        text: str = "", 
         category: str = "tarot", 
         count: int = 1,
         deck_id: int = None, 
@@ -160,14 +175,19 @@ class TarotBot(AbstractBot):
         is_major_only: bool = False,
         card_ids: list = None,
         **kwargs,
-    ):
+    ) -> ReadingJournal:
+        """
+        Открывает журнал расклада и ставит кулдаун категории.
+        Расклад сразу вставляется в БД в статусе PENDING, чтобы упавшее
+        гадание оставило след; итог journal.commit() допишет одним UPDATE.
+        """
         # 1. Защита от пустых значений для JSONField
         if card_ids is None:
             card_ids = []
-        original_query = kwargs.pop("original_query", "")
+        original_query = kwargs.pop("original_query", "") or ""
 
-        # 2. Создаем запись в новой типизированной модели UserReading
-        reading = await UserReading.objects.acreate(
+        # 2. Создаем запись UserReading в статусе PENDING
+        journal = ReadingJournal.start(
             bot_id=self.app_bot_id,
             user=user,
             category=category,
@@ -180,18 +200,18 @@ class TarotBot(AbstractBot):
             card_ids=card_ids, 
             original_query=original_query,
         )
-        logger.info(f"Результат гадания сохранен: {reading}")
+        reading = await journal.persist()
 
         # 3. Сохраняем отметку в Redis
         try:
-            # Формируем ключ, например: "user:123456789:tarot"
+            # Формируем ключ, например: "user:123456789:tarot:1"
             redis_key = REDIS_KEY_TEMPLATE.format(user_id=user.tg_id, category=category, app_id=self.app_bot_id)
             await redis_client.set(redis_key, reading.id, ex=REDIS_TTL_SECONDS) 
             logger.info(f"Ключ {redis_key} успешно записан в Redis на {REDIS_TTL_SECONDS} сек.")
         except Exception as e:
             logger.error(f"Ошибка записи в Redis для пользователя {user.id}: {e}")
 
-        return reading
+        return journal
 
     def parse_reading_options(self, msg_text: str) -> dict:
         """
@@ -351,11 +371,26 @@ class TarotBot(AbstractBot):
         
         return options
 
+    async def get_other_bots(self) -> set:
+        """
+        Возвращает юзернеймы других запущенных TarotBot
+        из локального снимка реестра ботов.
+        """
+        other_bots = set()
+        for bot_info in await bot_registry.get_bots(bot_type='TarotBot'):
+            bot_username = bot_info.get('username')
+            if bot_info.get('bot_id') != self.app_bot_id and bot_username:
+                other_bots.add(f"@{bot_username}")
+        return other_bots
+
     async def check_reading_cooldown(self, update: Update, category: str) -> bool:
         """
         Проверяет, есть ли активный кулдаун на гадание для пользователя.
         Возвращает True, если гадание ЗАБЛОКИРОВАНО (надо подождать).
         Возвращает False, если гадание ДОСТУПНО.
+
+        Все данные из Redis (TTL категории, свободные категории, ID сообщения
+        о кулдауне) собираются одним Lua-скриптом за один запрос.
         """
         user_id = update.effective_user.id
         user = update.effective_user
@@ -365,9 +400,19 @@ class TarotBot(AbstractBot):
         # Ключ для хранения ID сообщения кулдауна
         msg_ttl_key = f"user:ttl:message:{user_id}:{category}:{app_id}"
 
+        # Остальные категории, которые можно предложить вместо заблокированной
+        other_categories = [
+            cat_choice for cat_choice in UserReading.ReadingCategory.values
+            if cat_choice != category
+        ]
+        other_keys = [
+            REDIS_KEY_TEMPLATE.format(user_id=user_id, category=cat_choice, app_id=app_id)
+            for cat_choice in other_categories
+        ]
+
         try:
-            # Запрашиваем оставшееся время жизни ключа (в секундах)
-            time_left = await redis_client.ttl(redis_key)
+            result = await cooldown_check_script(keys=[redis_key, msg_ttl_key, *other_keys])
+            time_left = int(result[0])
 
             # Redis возвращает:
             # -1, если ключ существует, но у него нет TTL (бессрочный)
@@ -383,9 +428,6 @@ class TarotBot(AbstractBot):
                     f"для категории {category_upper}"
                 )
 
-                # Проверяем все остальные категории на наличие активного кулдауна
-                available_commands = []
-
                 # Словарь соответствия категорий командам
                 category_to_command = {
                     UserReading.ReadingCategory.ONE: "/one",
@@ -395,35 +437,16 @@ class TarotBot(AbstractBot):
                     UserReading.ReadingCategory.CANVAS_SPREAD: "/spread",
                 }
 
-                # Проверяем каждую категорию
-                for cat_choice in UserReading.ReadingCategory.values:
-                    if cat_choice == category:
-                        continue  # Пропускаем текущую заблокированную категорию
-
-                    # Формируем ключ для проверки
-                    check_key = REDIS_KEY_TEMPLATE.format(user_id=user_id, category=cat_choice, app_id=app_id)
-                    check_ttl = await redis_client.ttl(check_key)
-
-                    # Если ключа нет (time_left == -2) - категория доступна
-                    if check_ttl == -2:
-                        command = category_to_command.get(cat_choice)
-                        if command:
-                            available_commands.append(command)
-
-                # === ИЩЕМ ДРУГИХ БОТОВ В REDIS ===
-                all_bots = await redis_client_bot.hgetall("running_bots")
-                other_bots = set() 
-
-                for bot_id, bot_info_json in all_bots.items():
-                    bot_info = json.loads(bot_info_json)
-                    # Ищем ботов типа TarotBot
-                    if (
-                        bot_info.get('type') == 'TarotBot' and
-                        bot_info.get('bot_id') != self.app_bot_id
-                        ): 
-                        bot_username = bot_info.get('username')
-                        if bot_username:
-                            other_bots.add(f"@{bot_username}")
+                # Скрипт вернул номера свободных категорий (с 1, в порядке other_keys)
+                existing_msg_id = result[1] or None
+                available_commands = []
+                for index in result[2:]:
+                    command = category_to_command.get(other_categories[int(index) - 1])
+                    if command:
+                        available_commands.append(command)
+
+                # === ИЩЕМ ДРУГИХ БОТОВ (локальный кэш) ===
+                other_bots = await self.get_other_bots()
 
                 message_parts = [f"⚠️ Подождите {time_left} секунд до гадания {category_upper}"]
 
@@ -440,22 +463,8 @@ class TarotBot(AbstractBot):
 
                 message = "\n\n".join(message_parts)
 
-                # command_text = update.message.text
-                # if command_text:
-                #     hide_msg = await update.effective_message.reply_text(
-                #         ".",
-                #         reply_markup=ReplyKeyboardMarkup(
-                #             [[KeyboardButton(command_text[:100])]],
-                #             resize_keyboard=True,
-                #             one_time_keyboard=True
-                #         )
-                #     )
-                #     await hide_msg.delete()
-
                 # === ОБНОВЛЕНИЕ ИЛИ ОТПРАВКА СООБЩЕНИЯ ===
-                # Проверяем, есть ли уже отправленное сообщение об этом кулдауне
-                existing_msg_id = await redis_client.get(msg_ttl_key)
-
+                # TTL ключа с ID сообщения скрипт уже продлил до остатка кулдауна
                 if existing_msg_id:
                     try:
                         # Используем update.get_bot() для вызова edit_message_text
@@ -464,9 +473,6 @@ class TarotBot(AbstractBot):
                             message_id=int(existing_msg_id),
                             text=message
                         )
-                        # ОБНОВЛЯЕМ TTL: перезаписываем тот же ID с актуальным остатком времени,
-                        # чтобы ключ в Redis не удалился раньше времени
-                        await redis_client.set(msg_ttl_key, existing_msg_id, ex=time_left)
                         await update.effective_message.delete()
 
                     except Exception as edit_err:
@@ -486,8 +492,7 @@ class TarotBot(AbstractBot):
 
         except Exception as e:
             # Если Redis упал, не блокируем пользователя, а логируем ошибку
-            import logging
-            logging.error(f"Ошибка проверки TTL в Redis: {e}", exc_info=True)
+            logger.error(f"Ошибка проверки TTL в Redis: {e}", exc_info=True)
 
         return False
 
@@ -807,21 +812,18 @@ class TarotBot(AbstractBot):
         if is_locked:
             return
 
-        reading = None
+        journal = None
         try:
             user = await self.get_or_create_tg_user(update)
             
-            # Создаём чтение сразу после команды
-            reading = await self.save_reading(
+            # Расклад в статусе PENDING; итог допишется одним UPDATE в конце
+            journal = await self.start_reading(
                 user=user,
                 message_id=update.effective_message.message_id,
                 text="",
                 category=category,
                 count=1
             )
-            # Статус: ожидание
-            reading.reading_status = UserReading.ReadingStatus.PENDING
-            await reading.asave()
 
             tarot_url = "https://www.tarot.com"
             decks_url = "/tarot/decks"
@@ -865,9 +867,8 @@ class TarotBot(AbstractBot):
             result_text = f"{random_card['name']}\n{random_card['url']}"
 
             # ✅ Успех — вставляем данные в текст и меняем статус
-            reading.text = result_text
-            reading.reading_status = UserReading.ReadingStatus.SUCCESS
-            await reading.asave()
+            journal.update(text=result_text)
+            await journal.commit()
 
             await update.effective_message.reply_photo(
                 random_card["img"],
@@ -879,9 +880,8 @@ class TarotBot(AbstractBot):
         except Exception as e:
             logger.error(f"Ошибка в handle_one_command: {e}", exc_info=True)
             # ❌ Ошибка
-            if reading:
-                reading.reading_status = UserReading.ReadingStatus.ERROR
-                await reading.asave()
+            if journal:
+                await journal.fail()
             try:
                 await context.bot.delete_message(update.effective_chat.id, tech_msg_id)
             except:
@@ -935,42 +935,35 @@ class TarotBot(AbstractBot):
     ):
         """
         Формирует страницу с колодами и inline-клавиатуру для пагинации.
+        Страницы и готовые тексты кэшируются до изменения колод.
         """
-        # Выбираем модель колоды в зависимости от типа
-        if deck_type == "oraculum":
-            all_decks = OraculumDeck.objects.all().order_by("id")
-        elif deck_type == "tarot":
-            all_decks = TarotDeck.objects.all().order_by("id")
-        else:
-            raise ValueError("Неизвестный тип колоды")
+        decks_pages = await get_deck_pages(deck_type, items_per_page)
 
-        all_decks_count = await all_decks.acount()
-
-        # Разбиваем колоды на страницы
-        decks_pages = [
-            all_decks[i : i + items_per_page]
-            for i in range(0, all_decks_count, items_per_page)
-        ]
-
-        # Формируем текст текущей страницы
         if current_page >= len(decks_pages):
             current_page = 0  # Если страница выходит за пределы, возвращаемся на первую
 
-        decks_page = decks_pages[current_page]
-        decks_text = []
+        # Если режим возврата данных
+        if mode == "return":
+            return decks_pages[current_page], current_page, len(decks_pages)
+
+        return await get_rendered_deck_page(
+            deck_type,
+            items_per_page,
+            current_page,
+            lambda decks_page, page, total: self.render_decks_page(decks_page, page, total, deck_type),
+        )
+
+    def render_decks_page(self, decks_page, current_page: int, total_pages: int, deck_type: str):
         command_name = "card"
         if deck_type == "oraculum":
             command_name = "oraculum"
-        async for deck in decks_page:
+
+        decks_text = []
+        for deck in decks_page:
             command = self.cards_handler.messages.build_deck_command(f"/{command_name}", deck.slug)
             decks_text.append(
                 self.cards_handler.messages.get_deck_list_item(command, deck.name)
             )
-
-        # Если режим возврата данных
-        if mode == "return":
-            return decks_page, current_page, len(decks_pages)
-
         decks_text = "\n".join(decks_text)
 
         keyboard = []
@@ -984,7 +977,7 @@ class TarotBot(AbstractBot):
             )
 
         # Добавляем кнопку "Вперед", если есть следующая страница
-        if current_page < len(decks_pages) - 1:
+        if current_page < total_pages - 1:
             keyboard.append(
                 InlineKeyboardButton(
                     text="➡️ Вперед",
@@ -1069,7 +1062,7 @@ class TarotBot(AbstractBot):
             await update.message.reply_text(error_msg, parse_mode=ParseMode.HTML)
             return
 
-        reading = None
+        journal = None
         tech_msg = None
         
         try:
@@ -1124,7 +1117,7 @@ class TarotBot(AbstractBot):
             card_records = [{"id": str(c["card_id"]), "flip": c["flipped"]} for c in cards]
             logger.info(f"Получены карты {card_records}")
 
-            reading = await self.save_reading(
+            journal = await self.start_reading(
                 user=user,
                 message_id=update.effective_message.message_id,
                 text=f"{deck.name if deck else 'Дефолтная колода'}: " + ", ".join(
@@ -1137,8 +1130,6 @@ class TarotBot(AbstractBot):
                 is_major_only=options.get('major', False),
                 card_ids=card_records
             )
-            reading.status = UserReading.ReadingStatus.PENDING
-            await reading.asave()
 
             description_text = messages.format_description(
                 deck.name if deck else None, 
@@ -1187,8 +1178,7 @@ class TarotBot(AbstractBot):
             else:
                 raise Exception("create_spread_image вернул None")
             
-            reading.reading_status = UserReading.ReadingStatus.SUCCESS
-            await reading.asave()
+            await journal.commit()
 
         except Exception as e:
             # Определяем тип ошибки и сообщение
@@ -1200,9 +1190,8 @@ class TarotBot(AbstractBot):
                 error_msg = messages.get_error_message("generic", error_details=str(e)[:100])
 
             # ❌ Статус ERROR
-            if reading:
-                reading.reading_status = UserReading.ReadingStatus.ERROR
-                await reading.asave()
+            if journal:
+                await journal.fail()
 
             # Пробуем показать ошибку в tech_msg, если он ещё жив
             try:
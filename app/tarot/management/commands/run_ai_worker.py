@@ -0,0 +1,30 @@
+import asyncio
+
+from django.conf import settings
+from django.core.management.base import BaseCommand
+
+from server.logger import logger
+
+
+class Command(BaseCommand):
+    help = "Запуск воркера ИИ-трактовок: стримит ответы моделей вне процессов ботов"
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--concurrency",
+            type=int,
+            default=settings.AI_WORKER_CONCURRENCY,
+            help="Сколько трактовок стримить одновременно (по умолчанию: AI_WORKER_CONCURRENCY)",
+        )
+
+    def handle(self, *args, **options):
+        from tarot.bot.ai_worker import AIWorker
+
+        if not settings.AI_WORKER_ENABLED:
+            logger.warning("AI_WORKER_ENABLED выключен: боты запускают трактовки сами, очередь будет пустой.")
+
+        logger.info(f"Запуск воркера ИИ, одновременных трактовок: {options['concurrency']}")
+        try:
+            asyncio.run(AIWorker(options["concurrency"]).run())
+        except KeyboardInterrupt:
+            logger.info("Воркер ИИ остановлен пользователем.")
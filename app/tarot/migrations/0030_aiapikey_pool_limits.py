@@ -0,0 +1,29 @@
+# Generated by Django 5.2 on 2026-10-19 11:01
+
+import django.core.validators
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('tarot', '0029_tarotcarditem_custom_description_and_more'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='aiapikey',
+            name='max_concurrency',
+            field=models.PositiveSmallIntegerField(default=2, help_text='Сколько генераций может идти через ключ одновременно. Служит и весом ключа в пуле', validators=[django.core.validators.MinValueValidator(1)], verbose_name='Одновременных запросов'),
+        ),
+        migrations.AddField(
+            model_name='aiapikey',
+            name='rpm_limit',
+            field=models.PositiveIntegerField(default=0, help_text='Лимит запросов в минуту для ключа, 0 — без ограничения', verbose_name='Запросов в минуту'),
+        ),
+        migrations.AlterField(
+            model_name='aiapikey',
+            name='exhausted_until',
+            field=models.DateTimeField(blank=True, help_text='После этого времени исчерпанный ключ снова включается автоматически. Если пусто — ключ остается исчерпанным до ручного сброса', null=True, verbose_name='Заблокирован до'),
+        ),
+    ]
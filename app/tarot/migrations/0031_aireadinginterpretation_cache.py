@@ -0,0 +1,29 @@
+# Generated by Django 5.2 on 2026-10-19 11:02
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('tarot', '0030_aiapikey_pool_limits'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='aireadinginterpretation',
+            name='cache_hit',
+            field=models.BooleanField(default=False, help_text='Ответ не запрашивался у модели, а взят из прошлой интерпретации', verbose_name='Из кэша'),
+        ),
+        migrations.AddField(
+            model_name='aireadinginterpretation',
+            name='prompt_fingerprint',
+            field=models.CharField(blank=True, db_index=True, help_text='sha256 от системного промпта, категории, карт и нормализованного вопроса', max_length=64, verbose_name='Отпечаток промпта'),
+        ),
+        migrations.AddField(
+            model_name='aireadinginterpretation',
+            name='source_interpretation',
+            field=models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='cache_hits', to='tarot.aireadinginterpretation', verbose_name='Исходная интерпретация'),
+        ),
+    ]
@@ -1,3 +1,4 @@
+from django.core.validators import MinValueValidator
 from django.db import models
 
 
@@ -71,7 +72,20 @@ class AIApiKey(models.Model):
     is_active = models.BooleanField(default=True, verbose_name="Активен")
     is_exhausted = models.BooleanField(default=False, verbose_name="Лимит исчерпан")
     exhausted_until = models.DateTimeField(
-        null=True, blank=True, verbose_name="Заблокирован до"
+        null=True, blank=True, verbose_name="Заблокирован до",
+        help_text="После этого времени исчерпанный ключ снова включается автоматически. "
+                  "Если пусто — ключ остается исчерпанным до ручного сброса",
+    )
+    max_concurrency = models.PositiveSmallIntegerField(
+        default=2,
+        validators=[MinValueValidator(1)],
+        verbose_name="Одновременных запросов",
+        help_text="Сколько генераций может идти через ключ одновременно. Служит и весом ключа в пуле",
+    )
+    rpm_limit = models.PositiveIntegerField(
+        default=0,
+        verbose_name="Запросов в минуту",
+        help_text="Лимит запросов в минуту для ключа, 0 — без ограничения",
     )
     
     system_prompt = models.TextField(
@@ -178,6 +178,28 @@ class AIReadingInterpretation(models.Model):
         verbose_name="Всего токенов"
     )
 
+    # --- Кэш одинаковых раскладов ---
+    prompt_fingerprint = models.CharField(
+        max_length=64,
+        blank=True,
+        db_index=True,
+        verbose_name="Отпечаток промпта",
+        help_text="sha256 от системного промпта, категории, карт и нормализованного вопроса",
+    )
+    cache_hit = models.BooleanField(
+        default=False,
+        verbose_name="Из кэша",
+        help_text="Ответ не запрашивался у модели, а взят из прошлой интерпретации",
+    )
+    source_interpretation = models.ForeignKey(
+        "self",
+        on_delete=models.SET_NULL,
+        null=True,
+        blank=True,
+        related_name="cache_hits",
+        verbose_name="Исходная интерпретация",
+    )
+
     # Временные метки
     created_at = models.DateTimeField(auto_now_add=True, verbose_name="Создан запрос")
     updated_at = models.DateTimeField(auto_now=True, verbose_name="Обновлен")
@@ -0,0 +1,43 @@
+# tarot/signals.py
+from django.db.models.signals import post_save, post_delete
+from django.dispatch import receiver
+
+from tarot.models import (
+    TarotCard,
+    TarotMeaningCategory,
+    ExtendedMeaning,
+    Rune,
+    TarotCardItem,
+    OraculumItem,
+    TarotDeck,
+    OraculumDeck,
+)
+from tarot.utils.versions import invalidate_meanings, invalidate_runes, invalidate_album, invalidate_decks
+
+
+@receiver([post_save, post_delete], sender=TarotCard)
+@receiver([post_save, post_delete], sender=TarotMeaningCategory)
+@receiver([post_save, post_delete], sender=ExtendedMeaning)
+def on_meanings_changed(sender, **kwargs):
+    """Карты, категории или толкования изменились — страницы трактовок устарели."""
+    invalidate_meanings()
+
+
+@receiver([post_save, post_delete], sender=Rune)
+def on_runes_changed(sender, **kwargs):
+    invalidate_runes()
+
+
+@receiver([post_save, post_delete], sender=TarotCard)
+@receiver([post_save, post_delete], sender=TarotCardItem)
+@receiver([post_save, post_delete], sender=OraculumItem)
+def on_album_changed(sender, **kwargs):
+    """Состав колод или номера карт изменились — порядок страниц альбома устарел."""
+    invalidate_album()
+
+
+@receiver([post_save, post_delete], sender=TarotDeck)
+@receiver([post_save, post_delete], sender=OraculumDeck)
+def on_decks_changed(sender, **kwargs):
+    """Колоду добавили, переименовали или выключили — списки /decks устарели."""
+    invalidate_decks()
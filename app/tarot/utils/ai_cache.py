@@ -0,0 +1,42 @@
+# tarot/utils/ai_cache.py
+import hashlib
+import re
+
+from django.conf import settings
+from django.utils.timezone import now, timedelta
+
+from tarot.models import UserReading, AIReadingInterpretation
+
+
+def normalize_text(text: str) -> str:
+    return re.sub(r"\s+", " ", (text or "").strip())
+
+
+def make_prompt_fingerprint(system_prompt: str, reading: UserReading) -> str:
+    """
+    Отпечаток того, что уходит в модель: версия системного промпта,
+    категория, карты с переворотами (в порядке позиций) и вопрос.
+    Вопрос сравнивается без учета регистра и лишних пробелов.
+    """
+    parts = [
+        hashlib.sha256((system_prompt or "").encode()).hexdigest(),
+        reading.category,
+        normalize_text(reading.text),
+        normalize_text(reading.original_query).lower(),
+    ]
+    return hashlib.sha256("\x1f".join(parts).encode()).hexdigest()
+
+
+async def find_cached_interpretation(fingerprints) -> AIReadingInterpretation | None:
+    """Свежая успешная интерпретация с одним из отпечатков или None."""
+    ttl = settings.AI_INTERPRETATION_CACHE_TTL
+    if ttl <= 0 or not fingerprints:
+        return None
+
+    return await AIReadingInterpretation.objects.filter(
+        prompt_fingerprint__in=list(fingerprints),
+        status=AIReadingInterpretation.AIStatus.SUCCESS,
+        # Попадания ссылаются на исходник, страницы есть только у него
+        cache_hit=False,
+        created_at__gte=now() - timedelta(seconds=ttl),
+    ).order_by("-created_at").afirst()
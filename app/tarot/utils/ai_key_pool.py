@@ -0,0 +1,170 @@
+# tarot/utils/ai_key_pool.py
+import os
+import random
+import uuid
+
+import redis.asyncio as aioredis
+from django.utils.timezone import now, timedelta
+
+from tarot.models import AIApiKey
+from server.logger import logger
+
+
+redis_client = aioredis.StrictRedis(
+    host=os.getenv("REDIS_HOST", "localhost"),
+    port=int(os.getenv("REDIS_PORT", 6379)),
+    db=3,
+    decode_responses=True,
+)
+
+LEASES_KEY_TEMPLATE = "ai:key:{key_id}:leases"
+RPM_KEY_TEMPLATE = "ai:key:{key_id}:rpm"
+# Аренда ключа живет не дольше самой долгой генерации; упавший процесс не держит слот вечно
+LEASE_TTL_MS = 5 * 60 * 1000
+RPM_WINDOW_MS = 60 * 1000
+# На сколько отключается ключ после ошибки квоты
+EXHAUSTED_COOLDOWN = timedelta(minutes=30)
+
+QUOTA_ERROR_PHRASES = ["429", "rate_limit", "quota", "too many requests", "exhausted", "limit exceeded"]
+
+# Выбирает среди кандидатов ключ с наименьшей загрузкой (в работе / max_concurrency),
+# при равенстве — с меньшим числом запросов за минуту, и сразу занимает в нем слот.
+# KEYS: по два на кандидата — аренды и запросы за минуту
+# ARGV: now_ms, lease_ttl_ms, rpm_window_ms, token, затем пары max_concurrency, rpm_limit
+ACQUIRE_LUA = """
+local now = tonumber(ARGV[1])
+local lease_ttl = tonumber(ARGV[2])
+local rpm_window = tonumber(ARGV[3])
+local token = ARGV[4]
+
+local best, best_load, best_used = nil, nil, nil
+for i = 1, #KEYS / 2 do
+    local leases = KEYS[2 * i - 1]
+    local rpm = KEYS[2 * i]
+    local max_concurrency = tonumber(ARGV[3 + 2 * i])
+    local rpm_limit = tonumber(ARGV[4 + 2 * i])
+
+    redis.call('ZREMRANGEBYSCORE', leases, '-inf', now)
+    redis.call('ZREMRANGEBYSCORE', rpm, '-inf', now - rpm_window)
+    local in_flight = redis.call('ZCARD', leases)
+    local used = redis.call('ZCARD', rpm)
+
+    if in_flight < max_concurrency and (rpm_limit == 0 or used < rpm_limit) then
+        local load = in_flight / max_concurrency
+        if best == nil or load < best_load or (load == best_load and used < best_used) then
+            best, best_load, best_used = i, load, used
+        end
+    end
+end
+
+if best == nil then
+    return 0
+end
+
+redis.call('ZADD', KEYS[2 * best - 1], now + lease_ttl, token)
+redis.call('PEXPIRE', KEYS[2 * best - 1], lease_ttl)
+redis.call('ZADD', KEYS[2 * best], now, token)
+redis.call('PEXPIRE', KEYS[2 * best], rpm_window)
+return best
+"""
+
+
+def is_quota_error(error: Exception) -> bool:
+    """Признаки того, что у ключа кончилась квота (429, rate limit, quota)."""
+    err_msg = str(error).lower()
+    return any(phrase in err_msg for phrase in QUOTA_ERROR_PHRASES)
+
+
+class AIKeyLease:
+    """Занятый слот ключа на время одной генерации."""
+
+    def __init__(self, key: AIApiKey, token: str | None):
+        self.key = key
+        self.token = token
+
+
+class AIKeyPool:
+    """
+    Пул AI-ключей бота.
+
+    Запросы распределяются по всем исправным ключам с учетом max_concurrency
+    и rpm_limit каждого; счетчики живут в Redis и общие для всех процессов.
+    Исчерпанный ключ с exhausted_until в прошлом включается обратно сам.
+    """
+
+    def __init__(self, client=redis_client):
+        self.client = client
+        self._acquire_script = client.register_script(ACQUIRE_LUA)
+
+    async def get_healthy_keys(self, bot_id) -> list[AIApiKey]:
+        current_time = now()
+        # Ключи, у которых вышел срок блокировки, возвращаем в работу
+        restored = await AIApiKey.objects.filter(
+            bot_id=bot_id,
+            is_exhausted=True,
+            exhausted_until__lte=current_time,
+        ).aupdate(is_exhausted=False, exhausted_until=None)
+        if restored:
+            logger.info(f"Включено обратно AI-ключей бота {bot_id}: {restored}")
+
+        keys_qs = AIApiKey.objects.filter(bot_id=bot_id, is_active=True, is_exhausted=False)
+        return [key async for key in keys_qs]
+
+    async def acquire(self, bot_id, exclude=(), keys=None) -> AIKeyLease | None:
+        """
+        Занимает слот в наименее загруженном ключе.
+        keys — уже загруженный get_healthy_keys список, чтобы не читать ключи повторно.
+        Возвращает None, если ключей нет или все заняты.
+        """
+        if keys is None:
+            keys = await self.get_healthy_keys(bot_id)
+        keys = [key for key in keys if key.id not in exclude]
+        if not keys:
+            return None
+        # Порядок среди равно загруженных ключей случайный — так нагрузка расходится по кругу
+        random.shuffle(keys)
+
+        token = uuid.uuid4().hex
+        redis_keys, args = [], []
+        for key in keys:
+            redis_keys += [
+                LEASES_KEY_TEMPLATE.format(key_id=key.id),
+                RPM_KEY_TEMPLATE.format(key_id=key.id),
+            ]
+            args += [key.max_concurrency, key.rpm_limit]
+
+        now_ms = int(now().timestamp() * 1000)
+        try:
+            index = await self._acquire_script(
+                keys=redis_keys,
+                args=[now_ms, LEASE_TTL_MS, RPM_WINDOW_MS, token, *args],
+            )
+        except Exception as e:
+            # Без Redis лимиты не считаем, но генерацию не блокируем
+            logger.warning(f"Пул AI-ключей недоступен, берем ключ без учета лимитов: {e}")
+            return AIKeyLease(keys[0], None)
+
+        if not index:
+            return None
+        return AIKeyLease(keys[int(index) - 1], token)
+
+    async def release(self, lease: AIKeyLease):
+        if lease.token is None:
+            return
+        try:
+            await self.client.zrem(LEASES_KEY_TEMPLATE.format(key_id=lease.key.id), lease.token)
+        except Exception as e:
+            # Слот освободится сам по LEASE_TTL_MS
+            logger.warning(f"Не удалось освободить слот ключа #{lease.key.id}: {e}")
+
+    async def mark_exhausted(self, key: AIApiKey, cooldown=EXHAUSTED_COOLDOWN):
+        logger.warning(f"💥 Обнаружено исчерпание лимитов для ключа #{key.id}! Отключаем на {cooldown}.")
+        try:
+            key.is_exhausted = True
+            key.exhausted_until = now() + cooldown
+            await key.asave(update_fields=["is_exhausted", "exhausted_until", "updated_at"])
+        except Exception as db_err:
+            logger.error(f"Не удалось обновить статус API ключа в БД: {db_err}")
+
+
+ai_key_pool = AIKeyPool()
@@ -0,0 +1,204 @@
+# tarot/utils/ai_queue.py
+import os
+import time
+import uuid
+
+import redis.asyncio as aioredis
+
+
+redis_client = aioredis.StrictRedis(
+    host=os.getenv("REDIS_HOST", "localhost"),
+    port=int(os.getenv("REDIS_PORT", 6379)),
+    db=3,
+    decode_responses=True,
+)
+
+JOB_KEY_PREFIX = "ai:job:"
+JOB_KEY_TEMPLATE = JOB_KEY_PREFIX + "{job_id}"
+USER_QUEUE_PREFIX = "ai:queue:user:"
+# Кольцо пользователей с непустой очередью: пользователь в кольце <=> в его очереди есть задачи
+RING_KEY = "ai:queue:ring"
+# Пинок воркеру, чтобы он не ждал конца опроса
+WAKEUP_KEY = "ai:queue:wakeup"
+JOB_TTL_SECONDS = 24 * 60 * 60
+# Сколько трактовок один пользователь может держать в очереди
+MAX_QUEUED_PER_USER = 3
+
+
+class AIJobStatus:
+    QUEUED = "queued"
+    RUNNING = "running"
+    CANCELLED = "cancelled"
+    DONE = "done"
+    FAILED = "failed"
+
+
+# KEYS: очередь пользователя, кольцо, хэш задачи, пинок воркеру
+# ARGV: job_id, ключ пользователя, лимит очереди, ttl задачи, затем пары поле/значение задачи
+# Возвращает число пользователей в кольце перед новым или -1, если очередь пользователя полна
+ENQUEUE_LUA = """
+local queued = redis.call('LLEN', KEYS[1])
+if queued >= tonumber(ARGV[3]) then
+    return -1
+end
+
+redis.call('HSET', KEYS[3], unpack(ARGV, 5))
+redis.call('EXPIRE', KEYS[3], tonumber(ARGV[4]))
+redis.call('RPUSH', KEYS[1], ARGV[1])
+
+local ahead = redis.call('LLEN', KEYS[2])
+if queued == 0 then
+    redis.call('RPUSH', KEYS[2], ARGV[2])
+else
+    ahead = ahead - 1
+end
+redis.call('RPUSH', KEYS[4], 1)
+redis.call('LTRIM', KEYS[4], -1, -1)
+return ahead
+"""
+
+# Берет по одной задаче у пользователей по кругу, чтобы один активный
+# пользователь не занимал все потоки, и переводит ее из queued в running.
+# Ключи очереди и задачи собираются из префиксов внутри скрипта — сервер Redis
+# у нас один, кластера нет.
+# KEYS: кольцо; ARGV: префикс очередей пользователей, префикс задач
+# Возвращает {job_id, статус до взятия} или false, если кольцо пусто
+DEQUEUE_LUA = """
+local user_key = redis.call('LPOP', KEYS[1])
+if not user_key then
+    return false
+end
+
+local queue = ARGV[1] .. user_key
+local job_id = redis.call('LPOP', queue)
+if redis.call('LLEN', queue) > 0 then
+    redis.call('RPUSH', KEYS[1], user_key)
+end
+if not job_id then
+    return false
+end
+
+local job_key = ARGV[2] .. job_id
+local status = redis.call('HGET', job_key, 'status')
+if status == 'queued' then
+    redis.call('HSET', job_key, 'status', 'running')
+end
+return {job_id, status or ''}
+"""
+
+# Отмена задачи владельцем. Задача из очереди сразу убирается из списка пользователя,
+# чтобы не занимать место в лимите MAX_QUEUED_PER_USER, а опустевшая очередь — из кольца.
+# Запущенной задаче только меняется статус, остановит ее воркер.
+# KEYS: хэш задачи, очередь пользователя, кольцо; ARGV: job_id, ключ пользователя
+# Возвращает статус до отмены (queued или running) или false, если отменять нечего
+CANCEL_LUA = """
+local job = redis.call('HMGET', KEYS[1], 'user_key', 'status')
+local owner, status = job[1], job[2]
+if owner ~= ARGV[2] or (status ~= 'queued' and status ~= 'running') then
+    return false
+end
+
+redis.call('HSET', KEYS[1], 'status', 'cancelled')
+if status == 'queued' then
+    redis.call('LREM', KEYS[2], 0, ARGV[1])
+    if redis.call('LLEN', KEYS[2]) == 0 then
+        redis.call('LREM', KEYS[3], 0, ARGV[2])
+    end
+end
+return status
+"""
+
+
+class AIJobQueue:
+    """
+    Очередь ИИ-трактовок для воркера run_ai_worker.
+
+    У каждого пользователя своя очередь, воркер обходит пользователей по кругу.
+    Задача — хэш ai:job:{id} со статусом; отмена убирает задачу из очереди,
+    а уже запущенные воркер останавливает по статусу.
+    """
+
+    def __init__(self, client=redis_client):
+        self.client = client
+        self._enqueue_script = client.register_script(ENQUEUE_LUA)
+        self._dequeue_script = client.register_script(DEQUEUE_LUA)
+        self._cancel_script = client.register_script(CANCEL_LUA)
+
+    async def enqueue(self, user_key, **fields) -> tuple[str | None, int]:
+        """
+        Ставит задачу в очередь пользователя.
+        Возвращает (job_id, сколько пользователей впереди); job_id None — очередь пользователя полна.
+        """
+        job_id = uuid.uuid4().hex
+        job = {
+            **{name: str(value) for name, value in fields.items()},
+            "user_key": str(user_key),
+            "status": AIJobStatus.QUEUED,
+            "created_at": str(time.time()),
+        }
+        args = [job_id, str(user_key), MAX_QUEUED_PER_USER, JOB_TTL_SECONDS]
+        for name, value in job.items():
+            args += [name, value]
+
+        ahead = await self._enqueue_script(
+            keys=[
+                f"{USER_QUEUE_PREFIX}{user_key}",
+                RING_KEY,
+                JOB_KEY_TEMPLATE.format(job_id=job_id),
+                WAKEUP_KEY,
+            ],
+            args=args,
+        )
+        if int(ahead) < 0:
+            return None, 0
+        return job_id, int(ahead)
+
+    async def dequeue(self, timeout=5) -> dict | None:
+        """
+        Следующая задача по кругу пользователей или None, если за timeout секунд ничего не пришло.
+        Отмененные в очереди задачи пропускаются.
+        """
+        while True:
+            taken = await self._dequeue_script(keys=[RING_KEY], args=[USER_QUEUE_PREFIX, JOB_KEY_PREFIX])
+            if not taken:
+                if not await self.client.blpop([WAKEUP_KEY], timeout=timeout):
+                    return None
+                continue
+
+            job_id, status = taken
+            if status != AIJobStatus.QUEUED:
+                # Отменена в очереди или истекла
+                continue
+
+            job = await self.client.hgetall(JOB_KEY_TEMPLATE.format(job_id=job_id))
+            job["id"] = job_id
+            return job
+
+    async def set_status(self, job_id, status):
+        await self.client.hset(JOB_KEY_TEMPLATE.format(job_id=job_id), "status", status)
+
+    async def get_statuses(self, job_ids) -> dict:
+        if not job_ids:
+            return {}
+        async with self.client.pipeline(transaction=False) as pipe:
+            for job_id in job_ids:
+                pipe.hget(JOB_KEY_TEMPLATE.format(job_id=job_id), "status")
+            statuses = await pipe.execute()
+        return dict(zip(job_ids, statuses))
+
+    async def cancel(self, job_id, user_key) -> str | None:
+        """
+        Отменяет задачу пользователя. Возвращает статус, в котором задача была
+        (queued или running), или None, если отменять нечего.
+        """
+        status = await self._cancel_script(
+            keys=[
+                JOB_KEY_TEMPLATE.format(job_id=job_id),
+                f"{USER_QUEUE_PREFIX}{user_key}",
+                RING_KEY,
+            ],
+            args=[job_id, str(user_key)],
+        )
+        return status or None
+
+ai_job_queue = AIJobQueue()
@@ -0,0 +1,126 @@
+# tarot/utils/ai_stream.py
+import os
+
+import redis.asyncio as aioredis
+
+from tarot.models import AIReadingInterpretation, AIReadingPage
+from server.logger import logger
+
+
+redis_client = aioredis.StrictRedis(
+    host=os.getenv("REDIS_HOST", "localhost"),
+    port=int(os.getenv("REDIS_PORT", 6379)),
+    db=3,
+    decode_responses=True,
+)
+
+PAGES_KEY_TEMPLATE = "ai:stream:{interpretation_id}:pages"
+STATUS_KEY_TEMPLATE = "ai:stream:{interpretation_id}:status"
+# Буфер идущей генерации; если процесс упал, ключи просто истекут
+STREAM_TTL_SECONDS = 60 * 60
+# После завершения навигация еще минуту обслуживается из буфера, дальше — из БД
+FINISHED_TTL_SECONDS = 60
+# Каждые N страниц пишем в Postgres одной вставкой, чтобы падение не теряло весь ответ
+CHECKPOINT_PAGES = 5
+
+
+class AIStreamBuffer:
+    """
+    Страницы ИИ-ответа во время стриминга.
+
+    Страницы держатся в памяти и дублируются в Redis-список, откуда их читает
+    навигация из других апдейтов. В Postgres страницы уходят пачками:
+    каждые CHECKPOINT_PAGES страниц и остаток при завершении.
+    """
+
+    def __init__(self, interpretation_id, client=redis_client):
+        self.interpretation_id = interpretation_id
+        self.client = client
+        self.pages: list[str] = []
+        self.saved_count = 0
+        self.pages_key = PAGES_KEY_TEMPLATE.format(interpretation_id=interpretation_id)
+        self.status_key = STATUS_KEY_TEMPLATE.format(interpretation_id=interpretation_id)
+
+    async def start(self):
+        try:
+            async with self.client.pipeline(transaction=True) as pipe:
+                pipe.delete(self.pages_key)
+                pipe.set(self.status_key, AIReadingInterpretation.AIStatus.PENDING, ex=STREAM_TTL_SECONDS)
+                await pipe.execute()
+        except Exception as e:
+            # Без Redis навигация во время генерации увидит только сохраненные пачки
+            logger.warning(f"Не удалось создать буфер стриминга #{self.interpretation_id}: {e}")
+
+    async def add_page(self, content: str):
+        self.pages.append(content)
+        try:
+            async with self.client.pipeline(transaction=True) as pipe:
+                pipe.rpush(self.pages_key, content)
+                pipe.expire(self.pages_key, STREAM_TTL_SECONDS)
+                await pipe.execute()
+        except Exception as e:
+            logger.warning(f"Не удалось дописать страницу в буфер #{self.interpretation_id}: {e}")
+
+        if len(self.pages) - self.saved_count >= CHECKPOINT_PAGES:
+            await self.checkpoint()
+
+    async def checkpoint(self):
+        """Сохраняет в БД страницы, накопленные с прошлой пачки."""
+        new_pages = self.pages[self.saved_count:]
+        if not new_pages:
+            return
+        await AIReadingPage.objects.abulk_create([
+            AIReadingPage(
+                interpretation_id=self.interpretation_id,
+                content=content,
+                page_number=self.saved_count + offset,
+            )
+            for offset, content in enumerate(new_pages)
+        ])
+        self.saved_count += len(new_pages)
+
+    async def finish(self, status: str, tail: str = ""):
+        """
+        Дописывает недособранную страницу tail и остаток страниц в БД
+        и помечает буфер завершенным. Вызывается и при успехе, и при остановке или ошибке.
+        """
+        tail = tail.strip()
+        if tail:
+            await self.add_page(tail)
+        await self.checkpoint()
+        try:
+            async with self.client.pipeline(transaction=True) as pipe:
+                pipe.set(self.status_key, status, ex=FINISHED_TTL_SECONDS)
+                pipe.expire(self.pages_key, FINISHED_TTL_SECONDS)
+                await pipe.execute()
+        except Exception as e:
+            logger.warning(f"Не удалось закрыть буфер стриминга #{self.interpretation_id}: {e}")
+
+
+async def get_pages(interpretation_id, client=redis_client) -> tuple[str | None, list[str]]:
+    """
+    Возвращает (статус, тексты страниц) интерпретации.
+    Пока буфер жив — из Redis, иначе из БД. Статус None — интерпретации нет.
+    """
+    status_key = STATUS_KEY_TEMPLATE.format(interpretation_id=interpretation_id)
+    pages_key = PAGES_KEY_TEMPLATE.format(interpretation_id=interpretation_id)
+    try:
+        async with client.pipeline(transaction=True) as pipe:
+            pipe.get(status_key)
+            pipe.lrange(pages_key, 0, -1)
+            status, pages = await pipe.execute()
+        if status:
+            return status, pages
+    except Exception as e:
+        logger.warning(f"Буфер стриминга #{interpretation_id} недоступен, читаем из БД: {e}")
+
+    status = await AIReadingInterpretation.objects.filter(
+        id=interpretation_id
+    ).values_list("status", flat=True).afirst()
+    if status is None:
+        return None, []
+
+    pages_qs = AIReadingPage.objects.filter(
+        interpretation_id=interpretation_id
+    ).order_by("page_number").values_list("content", flat=True)
+    return status, [content async for content in pages_qs]
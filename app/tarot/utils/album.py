@@ -0,0 +1,53 @@
+# tarot/utils/album.py
+from tarot.models import TarotCardItem, OraculumItem
+from tg_bot.services.versioned_cache import VersionedCache
+from tarot.utils.versions import ALBUM_SCOPE
+
+
+album_cache = VersionedCache()
+
+TAROT_ALBUM_TYPES = ("card", "deck", "all")
+ORACULUM_ALBUM_TYPES = ("oraculum-deck", "oraculum")
+
+
+def card_order(card_id: str):
+    """Порядок карты в колоде: числовые card_id по значению, остальные — после них."""
+    return (0, int(card_id), "") if card_id.isdigit() else (1, 0, card_id)
+
+
+async def build_album_index(item_type: str, target_id) -> tuple[int, ...]:
+    if item_type in TAROT_ALBUM_TYPES:
+        qs = TarotCardItem.objects.all()
+        if item_type == "card":
+            qs = qs.filter(tarot_card__card_id=target_id)
+        elif item_type == "deck":
+            qs = qs.filter(deck_id=target_id)
+        rows = [row async for row in qs.values_list("id", "deck_id", "tarot_card__card_id")]
+
+        if item_type == "card":
+            rows.sort(key=lambda row: row[0])
+        elif item_type == "deck":
+            rows.sort(key=lambda row: (card_order(row[2]), row[0]))
+        else:
+            rows.sort(key=lambda row: (row[1], card_order(row[2]), row[0]))
+        return tuple(row[0] for row in rows)
+
+    qs = OraculumItem.objects.all()
+    if item_type == "oraculum-deck":
+        qs = qs.filter(deck_id=target_id)
+    return tuple([item_id async for item_id in qs.order_by("id").values_list("id", flat=True)])
+
+
+async def get_album_index(item_type: str, target_id) -> tuple[int, ...]:
+    """
+    Упорядоченные id карт альбома (колода, одна карта во всех колодах, все колоды, оракулы).
+    Страница альбома — это id по индексу, число страниц — длина индекса.
+    Сбрасывается при изменении карт в колодах.
+    """
+    if item_type not in TAROT_ALBUM_TYPES + ORACULUM_ALBUM_TYPES:
+        return ()
+    return await album_cache.get(
+        ("album", item_type, str(target_id)),
+        lambda: build_album_index(item_type, target_id),
+        scopes=[ALBUM_SCOPE],
+    )
@@ -0,0 +1,62 @@
+# tarot/utils/decks.py
+from tarot.models import TarotDeck, OraculumDeck
+from tg_bot.services.versioned_cache import VersionedCache
+from tarot.utils.versions import DECKS_SCOPE
+
+
+deck_list_cache = VersionedCache()
+
+DECK_MODELS = {
+    "tarot": TarotDeck,
+    "oraculum": OraculumDeck,
+}
+
+
+class DeckListItem:
+    __slots__ = ("id", "name", "slug")
+
+    def __init__(self, deck_id, name, slug):
+        self.id = deck_id
+        self.name = name
+        self.slug = slug
+
+
+async def build_deck_pages(deck_type: str, items_per_page: int) -> tuple[tuple[DeckListItem, ...], ...]:
+    if deck_type not in DECK_MODELS:
+        raise ValueError("Неизвестный тип колоды")
+
+    decks = [
+        DeckListItem(deck_id, name, slug)
+        async for deck_id, name, slug in DECK_MODELS[deck_type].objects.order_by("id").values_list("id", "name", "slug")
+    ]
+    pages = tuple(
+        tuple(decks[i : i + items_per_page])
+        for i in range(0, len(decks), items_per_page)
+    )
+    # Пустой список колод — одна пустая страница, чтобы номер 0 всегда был валидным
+    return pages or ((),)
+
+
+async def get_deck_pages(deck_type: str, items_per_page: int) -> tuple[tuple[DeckListItem, ...], ...]:
+    """Активные колоды типа, разбитые на страницы; сбрасывается при изменении колод."""
+    return await deck_list_cache.get(
+        ("pages", deck_type, items_per_page),
+        lambda: build_deck_pages(deck_type, items_per_page),
+        scopes=[DECKS_SCOPE],
+    )
+
+
+async def get_rendered_deck_page(deck_type: str, items_per_page: int, current_page: int, render):
+    """
+    Готовые текст и клавиатура страницы списка колод.
+    render(page, current_page, total_pages) вызывается один раз на версию колод.
+    """
+    async def loader():
+        pages = await get_deck_pages(deck_type, items_per_page)
+        return render(pages[current_page], current_page, len(pages))
+
+    return await deck_list_cache.get(
+        ("rendered", deck_type, items_per_page, current_page),
+        loader,
+        scopes=[DECKS_SCOPE],
+    )
@@ -0,0 +1,115 @@
+# tarot/utils/edit_coalescer.py
+import asyncio
+import time
+
+from telegram import Message, InlineKeyboardMarkup
+from telegram.error import BadRequest, RetryAfter
+
+from server.logger import logger
+
+
+# Границы интервала между правками одного сообщения (сек)
+MIN_EDIT_INTERVAL = 1.0
+MAX_EDIT_INTERVAL = 10.0
+# Интервал держим в несколько раз больше средней задержки Telegram,
+# чтобы правки не шли одна за другой, пока предыдущая еще в пути
+LATENCY_FACTOR = 3
+# Вес нового замера в скользящем среднем задержки
+LATENCY_SMOOTHING = 0.2
+# После 429 интервал удваивается и затем возвращается к норме постепенно
+BACKOFF_DECAY = 0.75
+# Дольше этого финальную правку не ждем — при большем флуд-контроле сдаемся
+MAX_FINAL_WAIT = 30
+
+
+class EditCoalescer:
+    """
+    Склеивает частые правки стримингового сообщения в редкие вызовы Bot API.
+
+    update() отправляет правку, только если с прошлой прошел интервал, иначе
+    пропускает ее — следующий вызов принесет более свежий текст. Интервал
+    подстраивается под скользящее среднее
+    задержки editMessageText и растет после 429. Правки, не меняющие текст
+    и клавиатуру, не отправляются. flush() отправляет итоговое состояние один раз.
+    """
+
+    def __init__(self, message: Message, min_interval=MIN_EDIT_INTERVAL, max_interval=MAX_EDIT_INTERVAL):
+        self.message = message
+        self.min_interval = min_interval
+        self.max_interval = max_interval
+        self.interval = min_interval
+        self.latency = None
+        self.next_edit_at = 0.0
+        self.sent_text = None
+        self.sent_markup = None
+        self.edits_sent = 0
+
+    def is_sent(self, text: str, reply_markup: InlineKeyboardMarkup | None) -> bool:
+        return text == self.sent_text and reply_markup == self.sent_markup
+
+    async def update(self, text: str, reply_markup: InlineKeyboardMarkup | None = None) -> bool:
+        """Отправляет правку, если она что-то меняет и интервал уже прошел."""
+        if self.is_sent(text, reply_markup):
+            return False
+        if time.monotonic() < self.next_edit_at:
+            return False
+        return await self._send(text, reply_markup)
+
+    async def flush(self, text: str, reply_markup: InlineKeyboardMarkup | None = None) -> bool:
+        """Итоговая правка: ждет окончания интервала или флуд-контроля и отправляет один раз."""
+        if self.is_sent(text, reply_markup):
+            return False
+
+        wait = self.next_edit_at - time.monotonic()
+        if wait > MAX_FINAL_WAIT:
+            logger.warning(f"Финальная правка сообщения {self.message.message_id} пропущена: ждать {wait:.0f} сек")
+            return False
+        if wait > 0:
+            await asyncio.sleep(wait)
+
+        if await self._send(text, reply_markup):
+            return True
+
+        # Единственная повторная попытка, если в момент отправки словили 429
+        wait = self.next_edit_at - time.monotonic()
+        if 0 < wait <= MAX_FINAL_WAIT:
+            await asyncio.sleep(wait)
+            return await self._send(text, reply_markup)
+        return False
+
+    async def _send(self, text: str, reply_markup: InlineKeyboardMarkup | None) -> bool:
+        started = time.monotonic()
+        try:
+            if text == self.sent_text:
+                # Поменялась только клавиатура — текст не пересылаем
+                await self.message.edit_reply_markup(reply_markup=reply_markup)
+            else:
+                await self.message.edit_text(text=text, reply_markup=reply_markup)
+        except RetryAfter as e:
+            self.interval = min(self.interval * 2, self.max_interval)
+            self.next_edit_at = time.monotonic() + e.retry_after
+            logger.warning(
+                f"Флуд-контроль при правке сообщения {self.message.message_id}: "
+                f"ждем {e.retry_after} сек, интервал {self.interval:.1f} сек"
+            )
+            return False
+        except BadRequest as e:
+            if "message is not modified" not in str(e).lower():
+                raise
+            # Telegram уже показывает это состояние — считаем его отправленным
+        else:
+            self.edits_sent += 1
+            self._observe_latency(time.monotonic() - started)
+
+        self.sent_text = text
+        self.sent_markup = reply_markup
+        self.next_edit_at = time.monotonic() + self.interval
+        return True
+
+    def _observe_latency(self, latency: float):
+        if self.latency is None:
+            self.latency = latency
+        else:
+            self.latency += LATENCY_SMOOTHING * (latency - self.latency)
+        target = max(self.latency * LATENCY_FACTOR, self.min_interval)
+        self.interval = min(max(target, self.interval * BACKOFF_DECAY), self.max_interval)
@@ -0,0 +1,149 @@
+# tarot/utils/meanings.py
+from tarot.models import TarotCard, TarotMeaningCategory, ExtendedMeaning
+from tg_bot.services.versioned_cache import VersionedCache
+from tarot.utils.versions import MEANINGS_SCOPE
+
+
+meaning_cache = VersionedCache()
+
+# Лимит подписи к сообщению Telegram
+MEANING_CHUNK_SIZE = 1024
+BASE_MEANING = "base"
+BASE_MEANING_NAME = "Базовый"
+BASE_MEANING_HEADER = "Базовый смысл"
+MEANING_NOT_FOUND_TEXT = "Трактовка не найдена."
+
+
+def split_text(text, chunk_size=MEANING_CHUNK_SIZE) -> list[str]:
+    # Шаг 1: разбиваем по строкам
+    lines = text.split("\n")
+    chunks = []
+    current_chunk = ""
+
+    for line in lines:
+        needed_length = len(line)
+        if current_chunk:
+            needed_length += 1  # символ '\n'
+
+        if len(current_chunk) + needed_length > chunk_size:
+            if current_chunk:
+                chunks.append(current_chunk)
+            current_chunk = line
+        else:
+            if current_chunk:
+                current_chunk += "\n" + line
+            else:
+                current_chunk = line
+
+    if current_chunk:
+        chunks.append(current_chunk)
+
+    # Шаг 2: разбиваем каждый чанк, если он > chunk_size, по словам
+    final_chunks = []
+
+    for chunk in chunks:
+        if len(chunk) <= chunk_size:
+            final_chunks.append(chunk)
+        else:
+            words = chunk.split(' ')
+            temp_chunk = ""
+            for word in words:
+                # Проверяем, поместится ли слово в текущий подчанк
+                test_chunk = temp_chunk + (" " if temp_chunk else "") + word
+                if len(test_chunk) <= chunk_size:
+                    temp_chunk = test_chunk
+                else:
+                    # Слово не помещается — сохраняем текущий подчанк и начинаем новый
+                    if temp_chunk:
+                        final_chunks.append(temp_chunk)
+                    temp_chunk = word
+            if temp_chunk:
+                final_chunks.append(temp_chunk)
+
+    return final_chunks
+
+
+class MeaningCatalog:
+    """
+    Неизменяемый индекс трактовок: имена карт по card_id и список
+    категорий трактовок каждой карты (с базовой, отсортирован по имени,
+    как кнопки листания категорий).
+    """
+
+    def __init__(self, card_names: dict, category_names: dict, card_categories: dict):
+        self.card_names = card_names
+        self.category_names = category_names
+        self.card_categories = card_categories
+
+    def get_categories(self, card_id) -> list[tuple[str, str]]:
+        return self.card_categories.get(card_id, [(BASE_MEANING, BASE_MEANING_NAME)])
+
+    def get_header(self, meaning_type) -> str:
+        if meaning_type == BASE_MEANING:
+            return BASE_MEANING_HEADER
+        return self.category_names.get(str(meaning_type), "")
+
+
+async def build_meaning_catalog() -> MeaningCatalog:
+    card_names = {
+        card_id: name
+        async for card_id, name in TarotCard.objects.values_list("card_id", "name")
+    }
+    category_names = {
+        str(category_id): name
+        async for category_id, name in TarotMeaningCategory.objects.values_list("id", "name")
+    }
+
+    categories_by_card = {}
+    async for card_id, category_id in ExtendedMeaning.objects.filter(
+        category_base__isnull=False,
+    ).values_list("tarot_card__card_id", "category_base_id"):
+        categories_by_card.setdefault(card_id, set()).add(str(category_id))
+
+    card_categories = {}
+    for card_id in card_names:
+        categories = [
+            (category_id, category_names[category_id])
+            for category_id in categories_by_card.get(card_id, ())
+        ]
+        categories.append((BASE_MEANING, BASE_MEANING_NAME))
+        categories.sort(key=lambda category: category[1])
+        card_categories[card_id] = categories
+
+    return MeaningCatalog(card_names, category_names, card_categories)
+
+
+async def get_meaning_catalog() -> MeaningCatalog:
+    """Кэшированный индекс трактовок; сбрасывается при изменении карт, категорий или толкований."""
+    return await meaning_cache.get(
+        ("catalog",),
+        build_meaning_catalog,
+        scopes=[MEANINGS_SCOPE],
+    )
+
+
+async def load_meaning_text(card_id, meaning_type) -> str | None:
+    if meaning_type == BASE_MEANING:
+        return await TarotCard.objects.filter(card_id=card_id).values_list("meaning", flat=True).afirst()
+    if not str(meaning_type).isdigit():
+        return None
+    return await ExtendedMeaning.objects.filter(
+        tarot_card__card_id=card_id,
+        category_base_id=meaning_type,
+    ).order_by("id").values_list("text", flat=True).afirst()
+
+
+async def get_meaning_pages(card_id, meaning_type, chunk_size=MEANING_CHUNK_SIZE) -> list[str]:
+    """
+    Страницы трактовки карты, разбитые один раз на (карту, категорию, размер страницы).
+    Всегда хотя бы одна страница.
+    """
+    async def loader():
+        text = await load_meaning_text(card_id, meaning_type)
+        return split_text(text or "", chunk_size) or [MEANING_NOT_FOUND_TEXT]
+
+    return await meaning_cache.get(
+        ("pages", str(card_id), str(meaning_type), chunk_size),
+        loader,
+        scopes=[MEANINGS_SCOPE],
+    )
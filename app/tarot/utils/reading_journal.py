@@ -0,0 +1,98 @@
+# tarot/utils/reading_journal.py
+from datetime import timedelta
+
+from django.db.models import Q
+from django.utils.timezone import now
+
+from tarot.models import UserReading
+from server.logger import logger
+
+
+# Через сколько PENDING считается зависшим (процесс упал посреди добора)
+# и расклад снова можно дополнять
+PENDING_CLAIM_TIMEOUT = timedelta(minutes=1)
+
+
+class ReadingJournal:
+    """
+    Жизненный цикл UserReading: промежуточные изменения копятся в памяти,
+    в БД уходят одной записью.
+
+    Новый расклад вставляется persist() сразу в статусе PENDING — если
+    процесс упадет посреди гадания, в БД останется след. Дальше поля
+    меняются только в памяти, а commit() дописывает изменившиеся поля
+    одним update_fields. Без persist() commit() делает одну вставку.
+    Добор карт к готовому раскладу начинается с claim(): PENDING ставится
+    в БД условным UPDATE, поэтому повторное нажатие не дорисует карту дважды.
+
+    fail() сохраняет расклад со статусом ERROR при любом состоянии журнала
+    и сам не бросает исключений — его можно звать из except.
+    """
+
+    def __init__(self, reading: UserReading):
+        self.reading = reading
+        self.dirty: set[str] = set()
+
+    @classmethod
+    def start(cls, **fields) -> "ReadingJournal":
+        """Новый расклад в статусе PENDING, пока без записи в БД."""
+        fields.setdefault("reading_status", UserReading.ReadingStatus.PENDING)
+        return cls(UserReading(**fields))
+
+    @classmethod
+    async def claim(cls, reading: UserReading) -> "ReadingJournal | None":
+        """
+        Журнал для добора карт к сохраненному раскладу.
+        Возвращает None, если расклад уже в PENDING — его дополняет другое нажатие.
+        """
+        pending = UserReading.ReadingStatus.PENDING
+        updated_at = now()
+        claimed = await UserReading.objects.filter(
+            Q(pk=reading.pk),
+            ~Q(reading_status=pending) | Q(updated_at__lt=updated_at - PENDING_CLAIM_TIMEOUT),
+        ).aupdate(reading_status=pending, updated_at=updated_at)
+        if not claimed:
+            return None
+
+        reading.reading_status = pending
+        reading.updated_at = updated_at
+        return cls(reading)
+
+    @property
+    def is_saved(self) -> bool:
+        return self.reading.pk is not None
+
+    def update(self, **fields):
+        """Меняет поля только в памяти."""
+        for name, value in fields.items():
+            setattr(self.reading, name, value)
+        self.dirty.update(fields)
+
+    def mark_changed(self, *names):
+        """Для полей, измененных на месте (например, card_ids.extend)."""
+        self.dirty.update(names)
+
+    async def persist(self) -> UserReading:
+        """Вставляет расклад, если его еще нет в БД."""
+        if not self.is_saved:
+            await self.reading.asave(force_insert=True)
+            self.dirty.clear()
+            logger.info(f"Расклад #{self.reading.pk} сохранен со статусом {self.reading.reading_status}")
+        return self.reading
+
+    async def commit(self, status=UserReading.ReadingStatus.SUCCESS) -> UserReading:
+        """Итоговая запись: одна вставка или одно обновление изменившихся полей."""
+        self.update(reading_status=status)
+        if not self.is_saved:
+            return await self.persist()
+
+        # auto_now при update_fields обновляется, только если поле указано явно
+        await self.reading.asave(update_fields=[*sorted(self.dirty), "updated_at"])
+        self.dirty.clear()
+        return self.reading
+
+    async def fail(self):
+        try:
+            await self.commit(UserReading.ReadingStatus.ERROR)
+        except Exception as e:
+            logger.error(f"Не удалось сохранить ошибку расклада {self.reading.pk}: {e}", exc_info=True)
@@ -0,0 +1,61 @@
+# tarot/utils/runes.py
+import random
+
+from tarot.models import Rune
+from tg_bot.services.versioned_cache import VersionedCache
+from tarot.utils.versions import RUNES_SCOPE
+
+
+rune_cache = VersionedCache()
+
+RUNE_FIELDS = (
+    "id", "type", "symbol", "sticker",
+    "straight_keys", "straight_meaning", "straight_pos_1", "straight_pos_2", "straight_pos_3",
+    "inverted_keys", "inverted_meaning", "inverted_pos_1", "inverted_pos_2", "inverted_pos_3",
+)
+
+
+class RuneInfo:
+    """Копия строки Rune без привязки к ORM; поля называются так же, как в модели."""
+
+    __slots__ = RUNE_FIELDS
+
+    def __init__(self, **fields):
+        for name in RUNE_FIELDS:
+            setattr(self, name, fields.get(name))
+
+
+class RuneCatalog:
+    """
+    Неизменяемый футарк: все руны в порядке id и индекс по id.
+    Строится один раз на процесс и пересобирается после правок рун в админке.
+    """
+
+    def __init__(self, runes: list[RuneInfo]):
+        self.runes = tuple(runes)
+        self.by_id = {rune.id: rune for rune in self.runes}
+
+    def get(self, rune_id) -> RuneInfo:
+        return self.by_id[int(rune_id)]
+
+    def sample(self, count) -> list[RuneInfo]:
+        return random.sample(self.runes, count)
+
+    def choice(self) -> RuneInfo:
+        return random.choice(self.runes)
+
+
+async def build_rune_catalog() -> RuneCatalog:
+    return RuneCatalog([
+        RuneInfo(**fields)
+        async for fields in Rune.objects.order_by("id").values(*RUNE_FIELDS)
+    ])
+
+
+async def get_rune_catalog() -> RuneCatalog:
+    """Кэшированный футарк; сбрасывается при изменении рун."""
+    return await rune_cache.get(
+        ("catalog",),
+        build_rune_catalog,
+        scopes=[RUNES_SCOPE],
+    )
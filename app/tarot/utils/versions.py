@@ -0,0 +1,25 @@
+# tarot/utils/versions.py
+from tg_bot.services.versioned_cache import bump_version
+
+
+# Области версий для кэшей таро (см. tg_bot.services.versioned_cache)
+MEANINGS_SCOPE = "tarot:meanings"
+RUNES_SCOPE = "tarot:runes"
+ALBUM_SCOPE = "tarot:album"
+DECKS_SCOPE = "tarot:decks"
+
+
+def invalidate_meanings():
+    bump_version(MEANINGS_SCOPE)
+
+
+def invalidate_runes():
+    bump_version(RUNES_SCOPE)
+
+
+def invalidate_album():
+    bump_version(ALBUM_SCOPE)
+
+
+def invalidate_decks():
+    bump_version(DECKS_SCOPE)
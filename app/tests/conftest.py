@@ -499,4 +499,54 @@ def get_card_names_from_response(redis_client, token, timeout=10):
         
         time.sleep(0.1)
     
-    return []
\ No newline at end of file
+    return []
+
+
+def create_gacha_season(tg_id=990001):
+    """Бот, игрок и сезон гачи из двух команд по две карты"""
+    from types import SimpleNamespace
+    from django.utils.timezone import now
+    from datetime import timedelta
+    from tg_bot.models import Bot, TgUser
+    from roster.models.team import Season, Team, Card
+
+    bot = Bot.objects.create(name="Gacha test", token=f"gacha_test_token_{tg_id}", chat_id="0", bot_type="GachaBot")
+    user = TgUser.objects.create(tg_id=tg_id, first_name="Gacha")
+    season = Season.objects.create(
+        name="Тестовый сезон",
+        start_date=now() - timedelta(days=1),
+        end_date=now() + timedelta(days=30),
+        bot=bot,
+    )
+    cards = []
+    for team_name in ("Альфа", "Бета"):
+        team = Team.objects.create(season=season, name=team_name)
+        cards += [Card.objects.create(team=team, name=f"{team_name} {i}") for i in (1, 2)]
+
+    return SimpleNamespace(bot=bot, user=user, season=season, cards=cards)
+
+
+def delete_gacha_season(world):
+    world.season.delete()
+    world.user.delete()
+    world.bot.delete()
+
+
+@pytest.fixture
+def gacha_season(db):
+    """Сезон гачи в транзакции теста"""
+    return create_gacha_season()
+
+
+@pytest.fixture
+def committed_gacha_season(django_db_blocker):
+    """
+    Сезон гачи, записанный в базу без транзакции теста: нужен, когда к данным
+    обращаются другие соединения (конкурентные потоки). Удаляется после теста.
+    """
+    with django_db_blocker.unblock():
+        world = create_gacha_season(tg_id=990003)
+        try:
+            yield world
+        finally:
+            delete_gacha_season(world)
@@ -0,0 +1,87 @@
+# tests/test_ai_queue.py
+import asyncio
+
+import pytest
+
+from tarot.utils.ai_queue import (
+    AIJobQueue, AIJobStatus, JOB_KEY_TEMPLATE, MAX_QUEUED_PER_USER, RING_KEY, USER_QUEUE_PREFIX,
+)
+
+
+def run(coro):
+    return asyncio.get_event_loop().run_until_complete(coro)
+
+
+@pytest.fixture
+def queue(redis_client):
+    return AIJobQueue(client=redis_client)
+
+
+def enqueue(queue, user_key, reading_id=1):
+    return run(queue.enqueue(user_key, reading_id=reading_id))
+
+
+def dequeue_all(queue):
+    jobs = []
+    while job := run(queue.dequeue(timeout=1)):
+        jobs.append(job)
+    return jobs
+
+
+def test_round_robin_between_users(queue):
+    """Активный пользователь не занимает всю очередь: задачи берутся по кругу"""
+    assert enqueue(queue, 1, reading_id=11)[1] == 0
+    # Пользователь уже в кольце — перед ним никого не прибавилось
+    assert enqueue(queue, 1, reading_id=12)[1] == 0
+    assert enqueue(queue, 2, reading_id=21)[1] == 1
+    enqueue(queue, 1, reading_id=13)
+
+    jobs = dequeue_all(queue)
+
+    assert [job["reading_id"] for job in jobs] == ["11", "21", "12", "13"]
+    assert all(job["status"] == AIJobStatus.RUNNING for job in jobs)
+
+
+def test_queue_limit_per_user(queue, redis_client):
+    for _ in range(MAX_QUEUED_PER_USER):
+        assert enqueue(queue, 1)[0]
+
+    assert enqueue(queue, 1) == (None, 0)
+    assert enqueue(queue, 2)[0]
+    assert run(redis_client.llen(f"{USER_QUEUE_PREFIX}1")) == MAX_QUEUED_PER_USER
+
+
+def test_cancel_queued_frees_slot(queue, redis_client):
+    """Отмененная в очереди задача не занимает лимит и не попадает к воркеру"""
+    job_ids = [enqueue(queue, 1, reading_id=reading_id)[0] for reading_id in range(MAX_QUEUED_PER_USER)]
+
+    assert run(queue.cancel(job_ids[0], 1)) == AIJobStatus.QUEUED
+
+    assert run(redis_client.lrange(f"{USER_QUEUE_PREFIX}1", 0, -1)) == job_ids[1:]
+    assert enqueue(queue, 1, reading_id=99)[0]
+    assert [job["reading_id"] for job in dequeue_all(queue)] == ["1", "2", "99"]
+    assert run(redis_client.hget(JOB_KEY_TEMPLATE.format(job_id=job_ids[0]), "status")) == AIJobStatus.CANCELLED
+
+
+def test_cancel_last_job_leaves_ring(queue, redis_client):
+    """Опустевшая после отмены очередь уходит из кольца — воркер не крутит пустого пользователя"""
+    job_id, _ = enqueue(queue, 1)
+    enqueue(queue, 2, reading_id=21)
+
+    run(queue.cancel(job_id, 1))
+
+    assert run(redis_client.lrange(RING_KEY, 0, -1)) == ["2"]
+    assert [job["reading_id"] for job in dequeue_all(queue)] == ["21"]
+
+
+def test_cancel_running_and_foreign(queue):
+    job_id, _ = enqueue(queue, 1)
+    run(queue.dequeue(timeout=1))
+
+    # Чужую задачу отменить нельзя
+    assert run(queue.cancel(job_id, 2)) is None
+    assert run(queue.cancel(job_id, 1)) == AIJobStatus.RUNNING
+    assert run(queue.get_statuses([job_id])) == {job_id: AIJobStatus.CANCELLED}
+    # Повторная отмена и отмена несуществующей задачи
+    assert run(queue.cancel(job_id, 1)) is None
+    assert run(queue.cancel("missing", 1)) is None
@@ -0,0 +1,202 @@
+# tests/test_collection.py
+import threading
+
+import pytest
+from django.db import connection
+
+from tg_bot.models import TgUser
+from roster.models.roll import UserRoll, UserCollection
+from roster.services.collection import get_collection, record_rolls
+
+
+def add_rolls(season, cards, user=None, burned=()):
+    """Броски в обход record_rolls (как старые данные до появления сводки)"""
+    return UserRoll.objects.bulk_create([
+        UserRoll(
+            user=user or season.user,
+            bot=season.bot,
+            season=season.season,
+            card=card,
+            is_used_for_craft=index in burned,
+        )
+        for index, card in enumerate(cards)
+    ])
+
+
+def counts(collection):
+    return {int(card_id): count for card_id, count in collection.card_counts.items()}
+
+
+def assert_matches_rolls(season, user=None):
+    """Сводка совпадает с живыми (не сожженными) бросками"""
+    user = user or season.user
+    collection = get_collection(user.id, season.season.id)
+    expected = {}
+    for card_id in UserRoll.objects.filter(
+        user=user, season=season.season, is_used_for_craft=False,
+    ).values_list("card_id", flat=True):
+        expected[card_id] = expected.get(card_id, 0) + 1
+
+    assert counts(collection) == expected
+    assert collection.unique_count == len(expected)
+    assert collection.duplicates_count == sum(expected.values()) - len(expected)
+    return collection
+
+
+@pytest.mark.django_db
+def test_get_collection_backfills_from_rolls(gacha_season):
+    """Первое обращение заполняет сводку из UserRoll, сожженные копии не считаются"""
+    c0, c1, c2, _ = gacha_season.cards
+    add_rolls(gacha_season, [c0, c0, c1, c2], burned={3})
+
+    collection = assert_matches_rolls(gacha_season)
+
+    assert counts(collection) == {c0.id: 2, c1.id: 1}
+    assert UserCollection.objects.filter(user=gacha_season.user, season=gacha_season.season).count() == 1
+
+
+@pytest.mark.django_db
+def test_record_rolls_backfills_and_adds(gacha_season):
+    """record_rolls без сводки сначала заполняет её из старых бросков, потом добавляет новые"""
+    c0, c1, c2, _ = gacha_season.cards
+    add_rolls(gacha_season, [c0, c1])
+
+    roll_ids, burned, collection = record_rolls(
+        gacha_season.user.id, gacha_season.bot.id, gacha_season.season.id, [c1.id, c2.id],
+    )
+
+    assert len(roll_ids) == 2
+    assert burned == 0
+    assert counts(collection) == {c0.id: 1, c1.id: 2, c2.id: 1}
+    assert_matches_rolls(gacha_season)
+
+
+@pytest.mark.django_db
+def test_admin_edit_and_delete_refresh_collection(gacha_season):
+    """Правка и удаление броска через save()/delete() сбрасывают сводку"""
+    c0, c1, c2, _ = gacha_season.cards
+    roll, other = add_rolls(gacha_season, [c0, c1])
+    get_collection(gacha_season.user.id, gacha_season.season.id)
+
+    roll.card = c2
+    roll.save()
+    assert counts(assert_matches_rolls(gacha_season)) == {c1.id: 1, c2.id: 1}
+
+    other.delete()
+    assert counts(assert_matches_rolls(gacha_season)) == {c2.id: 1}
+
+
+@pytest.mark.django_db
+def test_moving_roll_to_another_user_refreshes_both(gacha_season):
+    """Бросок передан другому пользователю — устаревают сводки обоих"""
+    c0 = gacha_season.cards[0]
+    other_user = TgUser.objects.create(tg_id=990002, first_name="Другой")
+    (roll,) = add_rolls(gacha_season, [c0])
+    get_collection(gacha_season.user.id, gacha_season.season.id)
+    get_collection(other_user.id, gacha_season.season.id)
+
+    roll.user = other_user
+    roll.save()
+
+    assert counts(assert_matches_rolls(gacha_season)) == {}
+    assert counts(assert_matches_rolls(gacha_season, other_user)) == {c0.id: 1}
+
+
+@pytest.mark.django_db
+def test_card_delete_refreshes_collection(gacha_season):
+    """Удаление карты каскадом удаляет броски — сводка не должна их помнить"""
+    c0, c1, _, _ = gacha_season.cards
+    add_rolls(gacha_season, [c0, c0, c1])
+    get_collection(gacha_season.user.id, gacha_season.season.id)
+
+    c0.delete()
+
+    assert counts(assert_matches_rolls(gacha_season)) == {c1.id: 1}
+
+
+def live_copies(season):
+    """Живые копии по картам: card_id -> id бросков от старых к новым"""
+    copies = {}
+    for roll_id, card_id in UserRoll.objects.filter(
+        user=season.user, season=season.season, is_used_for_craft=False,
+    ).order_by("rolled_at", "id").values_list("id", "card_id"):
+        copies.setdefault(card_id, []).append(roll_id)
+    return copies
+
+
+@pytest.mark.django_db
+def test_burn_duplicates_burns_requested_count(gacha_season):
+    """Сжигается ровно burn_count самых ранних дублей"""
+    c0, c1, c2, c3 = gacha_season.cards
+    add_rolls(gacha_season, [c0, c0, c0, c1, c1, c2])
+
+    _, burned, collection = record_rolls(
+        gacha_season.user.id, gacha_season.bot.id, gacha_season.season.id, [c3.id], burn_count=2,
+    )
+
+    assert burned == 2
+    assert UserRoll.objects.filter(user=gacha_season.user, is_used_for_craft=True).count() == 2
+    # Из 3 дублей (2 у c0, 1 у c1) после сжигания двух остается один
+    assert collection.duplicates_count == 1
+    assert_matches_rolls(gacha_season)
+
+
+@pytest.mark.django_db
+def test_burn_duplicates_keeps_first_copy(gacha_season):
+    """Даже при burn_count больше числа дублей у каждой карты остается первая копия"""
+    c0, c1, c2, _ = gacha_season.cards
+    add_rolls(gacha_season, [c0, c1, c0, c0, c1, c2])
+    first_copies = {card_id: roll_ids[0] for card_id, roll_ids in live_copies(gacha_season).items()}
+
+    _, burned, collection = record_rolls(
+        gacha_season.user.id, gacha_season.bot.id, gacha_season.season.id, [], burn_count=10,
+    )
+
+    assert burned == 3
+    assert live_copies(gacha_season) == {card_id: [roll_id] for card_id, roll_id in first_copies.items()}
+    assert collection.duplicates_count == 0
+    assert collection.unique_count == 3
+    assert_matches_rolls(gacha_season)
+
+
+def test_concurrent_burns_do_not_double_count(committed_gacha_season):
+    """
+    Два одновременных крафта: сводка блокируется, поэтому второй видит
+    результат первого — дубли не сжигаются дважды и не уходят в минус.
+    Нужны отдельные соединения, поэтому данные записаны вне транзакции теста.
+    """
+    season = committed_gacha_season
+    c0, c1, _, c3 = season.cards
+    add_rolls(season, [c0, c0, c0, c1, c1])
+    # Сводка должна существовать до гонки, иначе оба потока полезут её создавать
+    get_collection(season.user.id, season.season.id)
+
+    barrier = threading.Barrier(2)
+    results, errors = [], []
+
+    def craft():
+        try:
+            barrier.wait(timeout=10)
+            _, burned, _ = record_rolls(
+                season.user.id, season.bot.id, season.season.id, [c3.id], burn_count=2,
+            )
+            results.append(burned)
+        except Exception as e:
+            errors.append(e)
+        finally:
+            connection.close()
+
+    threads = [threading.Thread(target=craft) for _ in range(2)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join(timeout=30)
+
+    assert not errors
+    # Дублей было 3: первый крафт сжигает 2, второй — оставшийся 1
+    assert sorted(results) == [1, 2]
+    assert UserRoll.objects.filter(user=season.user, season=season.season, is_used_for_craft=True).count() == 3
+    assert all(len(roll_ids) >= 1 for roll_ids in live_copies(season).values())
+
+    collection = assert_matches_rolls(season)
+    assert counts(collection) == {c0.id: 1, c1.id: 1, c3.id: 2}
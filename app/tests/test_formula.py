@@ -0,0 +1,113 @@
+# tests/test_formula.py
+import math
+
+import pytest
+
+from roster.services.formula import (
+    FormulaError, compile_formula, evaluate_range, MAX_FACTORIAL_ARG, MAX_POW_EXPONENT,
+)
+
+
+def test_default_formula_matches_python():
+    """Формула по умолчанию из админки считается так же, как в Python"""
+    weights = evaluate_range("1 / (math.factorial({star}) * ({star} + 1))")
+
+    assert weights == {
+        star: pytest.approx(1 / (math.factorial(star) * (star + 1)))
+        for star in range(1, 6)
+    }
+
+
+def test_coefficient_and_allowed_functions():
+    weights = evaluate_range("max(abs(-{star}), round(math.sqrt(4))) + math.pow({star}, 2) + {star} ** 2", coefficient=2)
+
+    assert weights[1] == pytest.approx(2 * (2 + 1 + 1))
+    assert weights[3] == pytest.approx(2 * (3 + 9 + 9))
+
+
+@pytest.mark.parametrize("formula", [
+    # Импорт и обращение к встроенным функциям
+    "__import__('os').system('true')",
+    "__import__",
+    "open('/etc/passwd')",
+    "eval('1')",
+    "pow({star}, 2)",
+    "_pow({star}, 2)",
+    # Лямбды и comprehension'ы
+    "(lambda: 1)()",
+    "lambda star: star",
+    "[x for x in range(3)]",
+    "sum(x for x in range(3))",
+    "{x: x for x in range(3)}",
+    # Атрибуты (в том числе dunder) вне math.<функция>(...)
+    "{star}.__class__",
+    "().__class__.__bases__[0].__subclasses__()",
+    "math.pi",
+    "math.factorial",
+    "math.exp({star})",
+    "os.system('true')",
+    # Строки, байты и прочие недопустимые константы
+    "'abc'",
+    "len('aaaa')",
+    "b'1'",
+    "True + {star}",
+    "None",
+    # Прочие конструкции
+    "other_name + 1",
+    "{star} if {star} else 1",
+    "{star} > 1",
+    "{star} & 1",
+    "not {star}",
+    "[1, 2][0]",
+    "max({star}, key=abs)",
+])
+def test_whitelist_rejects(formula):
+    with pytest.raises(FormulaError):
+        compile_formula(formula)
+
+
+def test_syntax_error_is_formula_error():
+    with pytest.raises(FormulaError, match="Синтаксическая ошибка"):
+        compile_formula("1 +")
+
+
+@pytest.mark.parametrize("formula", [
+    f"math.factorial({MAX_FACTORIAL_ARG + 1})",
+    "math.factorial(-1)",
+    "math.factorial(2.5)",
+    "math.factorial({star} * 1000)",
+])
+def test_factorial_guard(formula):
+    with pytest.raises(FormulaError, match="factorial"):
+        evaluate_range(formula)
+
+
+def test_factorial_limit_is_allowed():
+    assert evaluate_range(f"math.factorial({MAX_FACTORIAL_ARG}) * 0 + {{star}}")[1] == 1
+
+
+@pytest.mark.parametrize("formula", [
+    f"2 ** {MAX_POW_EXPONENT + 1}",
+    f"math.pow(2, {MAX_POW_EXPONENT + 1})",
+    f"2 ** -{MAX_POW_EXPONENT + 1}",
+    # Степень степени: внутренняя 9 ** 9 уже превышает лимит для внешней
+    "9 ** 9 ** 9",
+    "{star} ** ({star} * 100)",
+])
+def test_pow_guard(formula):
+    with pytest.raises(FormulaError, match="Степень"):
+        evaluate_range(formula)
+
+
+def test_pow_overflow_is_formula_error():
+    with pytest.raises(FormulaError, match="★1"):
+        evaluate_range("1e300 ** 2")
+
+
+def test_division_by_zero_names_star():
+    with pytest.raises(FormulaError, match="★1"):
+        evaluate_range("1 / ({star} - 1)")
+
+
+def test_compiled_formula_is_cached():
+    assert compile_formula("{star} + 1") is compile_formula("{star} + 1")
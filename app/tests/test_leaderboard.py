@@ -0,0 +1,99 @@
+# tests/test_leaderboard.py
+import asyncio
+from datetime import timedelta
+from types import SimpleNamespace
+
+import pytest
+from django.utils.timezone import now
+
+from tg_bot.models import TgUser
+from roster import tasks
+from roster.models.roll import UserRoll, LeaderboardEntry
+from roster.services.leaderboard import Leaderboard, get_keys, get_rank_score
+
+
+def run(coro):
+    return asyncio.get_event_loop().run_until_complete(coro)
+
+
+# Раскладка из одной команды на две карты: собраны обе — коллекция полная
+LAYOUT = SimpleNamespace(
+    cards_count=2,
+    teams=[SimpleNamespace(cards=[SimpleNamespace(id=1), SimpleNamespace(id=2)],
+                           count_collected=lambda collected: len({1, 2} & collected))],
+)
+
+
+@pytest.fixture
+def board(redis_client):
+    return Leaderboard(client=redis_client)
+
+
+def test_equal_counts_ordered_by_completion(board, monkeypatch):
+    """При равном числе карт выше тот, кто раньше собрал коллекцию, а не больший id"""
+    clock = iter([1000.0, 2000.0, 3000.0, 4000.0])
+    monkeypatch.setattr("roster.services.leaderboard.time", SimpleNamespace(time=lambda: next(clock)))
+
+    run(board.record(1, 10, LAYOUT, {1, 2}))
+    run(board.record(1, 20, LAYOUT, {1, 2}))
+    run(board.record(1, 30, LAYOUT, {1}))
+    # Повторный бросок не переписывает время сбора
+    run(board.record(1, 10, LAYOUT, {1, 2}))
+
+    top = run(board.get_top(1))
+
+    assert [(entry.user_id, entry.rank) for entry in top] == [(10, 1), (20, 2), (30, 3)]
+    assert [entry.unique_count for entry in top] == [2, 2, 1]
+    assert [entry.teams_completed for entry in top] == [1, 1, 0]
+    assert top[0].completed_at == 1000.0
+    assert top[2].completed_at is None
+
+
+def test_rank_and_counts_stay_integer(board, redis_client):
+    run(board.record(1, 10, LAYOUT, {1, 2}))
+
+    me = run(board.get_rank(1, 10))
+
+    assert me.rank == 1
+    assert me.unique_count == 2
+    assert run(redis_client.sismember(get_keys(1)["dirty"], "10"))
+
+
+def test_rank_score_prefers_earlier_completion():
+    assert get_rank_score(5, 1000.0) > get_rank_score(5, 2000.0) > get_rank_score(5)
+    assert get_rank_score(5, 1000.0) < get_rank_score(6)
+    assert int(get_rank_score(5, 1_900_000_000.0)) == 5
+
+
+@pytest.mark.django_db
+def test_rebuild_orders_ties_by_completion(gacha_season, redis_client):
+    """Пересборка по UserRoll дает тот же порядок, что и live-рейтинг"""
+    season = gacha_season
+    late = season.user
+    early = TgUser.objects.create(tg_id=990004, first_name="Ранний")
+    for user, hours_ago in ((late, 1), (early, 5)):
+        rolls = UserRoll.objects.bulk_create([
+            UserRoll(user=user, bot=season.bot, season=season.season, card=card) for card in season.cards
+        ])
+        UserRoll.objects.filter(id__in=[roll.id for roll in rolls]).update(rolled_at=now() - timedelta(hours=hours_ago))
+
+    assert tasks.rebuild_leaderboard(season.season.id) == 2
+
+    ranking = tasks.redis_client.zrevrange(get_keys(season.season.id)["unique"], 0, -1)
+    assert ranking == [str(early.id), str(late.id)]
+    entries = LeaderboardEntry.objects.filter(season=season.season).order_by("-unique_count", "completed_at")
+    assert [entry.user_id for entry in entries] == [early.id, late.id]
+
+
+@pytest.mark.django_db
+def test_rebuild_skips_closed_season(gacha_season, redis_client):
+    """Закрытый сезон: броски в архиве, итоговый рейтинг не стирается"""
+    season = gacha_season.season
+    LeaderboardEntry.objects.create(season=season, user=gacha_season.user, unique_count=4, teams_completed=2)
+    season.closed_at = now()
+    season.is_active = False
+    season.save(update_fields=["closed_at", "is_active"])
+
+    assert tasks.rebuild_leaderboard(season.id) == 0
+
+    assert LeaderboardEntry.objects.filter(season=season, user=gacha_season.user, unique_count=4).exists()
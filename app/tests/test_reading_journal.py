@@ -0,0 +1,116 @@
+# tests/test_reading_journal.py
+import asyncio
+from unittest.mock import AsyncMock
+
+import pytest
+from django.utils.timezone import now
+
+from tarot.models import UserReading
+from tarot.utils.reading_journal import ReadingJournal, PENDING_CLAIM_TIMEOUT
+
+
+# Метка тестовых раскладов: асинхронный ORM пишет мимо транзакции теста
+MESSAGE_ID = 990201
+Status = UserReading.ReadingStatus
+
+
+def run(coro):
+    return asyncio.get_event_loop().run_until_complete(coro)
+
+
+@pytest.fixture
+def asave(mocker):
+    return mocker.patch.object(UserReading, "asave", new_callable=AsyncMock)
+
+
+@pytest.fixture
+def readings():
+    yield UserReading.objects.filter(message_id=MESSAGE_ID)
+    run(UserReading.objects.filter(message_id=MESSAGE_ID).adelete())
+
+
+def test_commit_unsaved_inserts_once(asave):
+    """Без persist() расклад попадает в БД одной вставкой уже с итоговым статусом"""
+    journal = ReadingJournal.start(message_id=MESSAGE_ID)
+    journal.update(text="Шут", count=1)
+
+    reading = run(journal.commit())
+
+    asave.assert_awaited_once_with(force_insert=True)
+    assert reading.reading_status == Status.SUCCESS
+    assert reading.text == "Шут"
+
+
+def test_commit_saved_updates_only_changed_fields(asave):
+    journal = ReadingJournal(UserReading(pk=1, message_id=MESSAGE_ID, card_ids=[{"id": 1, "flip": False}]))
+    journal.update(text="Шут, Маг", count=2)
+    journal.reading.card_ids.append({"id": 2, "flip": True})
+    journal.mark_changed("card_ids")
+
+    run(journal.commit())
+
+    asave.assert_awaited_once_with(update_fields=["card_ids", "count", "reading_status", "text", "updated_at"])
+    assert journal.dirty == set()
+
+
+def test_fail_records_error_and_does_not_raise(asave):
+    journal = ReadingJournal(UserReading(pk=1, message_id=MESSAGE_ID))
+    asave.side_effect = RuntimeError("БД недоступна")
+
+    run(journal.fail())
+
+    asave.assert_awaited_once_with(update_fields=["reading_status", "updated_at"])
+    assert journal.reading.reading_status == Status.ERROR
+
+
+@pytest.mark.django_db
+def test_persist_then_commit(readings):
+    """PENDING виден в БД сразу, commit() дописывает только изменившиеся поля"""
+    journal = ReadingJournal.start(message_id=MESSAGE_ID, original_query="Вопрос")
+    reading = run(journal.persist())
+    assert run(readings.aget()).reading_status == Status.PENDING
+
+    journal.update(text="Шут")
+    # Поле изменено мимо журнала — commit() его не пишет
+    reading.original_query = "Не сохранится"
+    run(journal.commit())
+
+    stored = run(readings.aget())
+    assert stored.pk == reading.pk
+    assert stored.reading_status == Status.SUCCESS
+    assert stored.text == "Шут"
+    assert stored.original_query == "Вопрос"
+
+
+@pytest.mark.django_db
+def test_fail_after_persist_keeps_row(readings):
+    journal = ReadingJournal.start(message_id=MESSAGE_ID)
+    run(journal.persist())
+
+    run(journal.fail())
+
+    assert run(readings.aget()).reading_status == Status.ERROR
+
+
+@pytest.mark.django_db
+def test_claim_blocks_second_click(readings):
+    """Пока расклад дополняется, повторное нажатие не получает журнал"""
+    reading = run(ReadingJournal.start(message_id=MESSAGE_ID).commit())
+
+    journal = run(ReadingJournal.claim(reading))
+    assert journal is not None
+    assert run(readings.aget()).reading_status == Status.PENDING
+
+    assert run(ReadingJournal.claim(run(readings.aget()))) is None
+
+    run(journal.commit())
+    assert run(ReadingJournal.claim(run(readings.aget()))) is not None
+
+
+@pytest.mark.django_db
+def test_claim_takes_over_stale_pending(readings):
+    """Зависший PENDING (процесс упал посреди добора) не блокирует расклад навсегда"""
+    reading = run(ReadingJournal.start(message_id=MESSAGE_ID).persist())
+    run(readings.aupdate(updated_at=now() - PENDING_CLAIM_TIMEOUT * 2))
+
+    assert run(ReadingJournal.claim(reading)) is not None
@@ -0,0 +1,131 @@
+# tests/test_roll_limiter.py
+import time
+import asyncio
+from types import SimpleNamespace
+
+import pytest
+
+from roster import tasks
+from roster.models.roll import UserRoll
+from roster.services.roll_limiter import RollLimiter, BIHOURLY_MS, DAY_MS
+
+
+USER = SimpleNamespace(tg_id=990001)
+BOT = SimpleNamespace(id=1)
+LIMITS = {"cooldown": 0, "bihourly": 2, "daily": 3}
+
+
+def run(coro):
+    return asyncio.get_event_loop().run_until_complete(coro)
+
+
+@pytest.fixture
+def limiter(redis_client):
+    """Лимитер с уже заполненным окном, чтобы не ходить в UserRoll"""
+    limiter = RollLimiter(client=redis_client)
+    _, _, seeded_key = limiter.get_keys(USER.tg_id, BOT.id)
+    run(redis_client.set(seeded_key, 1))
+    return limiter
+
+
+def fill_window(redis_client, limiter, members: dict):
+    window_key, _, _ = limiter.get_keys(USER.tg_id, BOT.id)
+    run(redis_client.zadd(window_key, members))
+    return window_key
+
+
+def test_admit_daily_limit(redis_client, limiter):
+    """Три броска за сутки (вне двухчасового окна) — суточный лимит исчерпан"""
+    old = int(time.time() * 1000) - BIHOURLY_MS - 60_000
+    fill_window(redis_client, limiter, {f"u:{i}": old for i in range(3)})
+
+    admission = run(limiter.admit(USER, BOT, LIMITS))
+
+    assert not admission
+    assert admission.daily_used == 3
+    assert admission.bihourly_used == 0
+
+
+def test_admit_bihourly_limit(redis_client, limiter):
+    """Два броска за последние 2 часа — отказ, хотя суточный лимит не исчерпан"""
+    recent = int(time.time() * 1000) - 60_000
+    fill_window(redis_client, limiter, {"u:1": recent, "u:2": recent})
+
+    admission = run(limiter.admit(USER, BOT, LIMITS))
+
+    assert not admission
+    assert admission.daily_used == 2
+    assert admission.bihourly_used == 2
+
+
+def test_admit_clips_multi_roll_and_drops_old_rolls(redis_client, limiter):
+    """Броски старше суток не считаются, мульти-бросок урезается до остатка лимита"""
+    now_ms = int(time.time() * 1000)
+    window_key = fill_window(redis_client, limiter, {"u:1": now_ms - DAY_MS - 60_000, "u:2": now_ms - 60_000})
+
+    admission = run(limiter.admit(USER, BOT, LIMITS, count=5))
+
+    assert admission.allowed == 1
+    assert admission.daily_used == 2
+    assert admission.bihourly_used == 2
+    assert run(redis_client.zscore(window_key, "u:1")) is None
+
+
+def test_release_returns_reservation(redis_client, limiter):
+    """Неудачный бросок снимает резерв и свой кулдаун"""
+    limits = {**LIMITS, "cooldown": 60}
+    window_key, cooldown_key, _ = limiter.get_keys(USER.tg_id, BOT.id)
+
+    admission = run(limiter.admit(USER, BOT, limits))
+    assert admission.allowed == 1
+    assert run(redis_client.zcard(window_key)) == 1
+    assert run(redis_client.get(cooldown_key)) == admission.token
+
+    run(limiter.release(USER, BOT, admission))
+
+    assert run(redis_client.zcard(window_key)) == 0
+    assert run(redis_client.exists(cooldown_key)) == 0
+    assert run(limiter.admit(USER, BOT, limits)).allowed == 1
+
+
+def test_confirm_replaces_reservation(redis_client, limiter):
+    """Записанный бросок заменяет резерв в окне"""
+    window_key, _, _ = limiter.get_keys(USER.tg_id, BOT.id)
+
+    admission = run(limiter.admit(USER, BOT, LIMITS, count=2))
+    run(limiter.confirm(USER, BOT, admission, [42]))
+
+    assert run(redis_client.zrange(window_key, 0, -1)) == ["u:42"]
+    assert run(redis_client.zscore(window_key, "u:42")) == admission.now_ms
+
+
+@pytest.mark.django_db
+def test_reconcile_keeps_rolls_committed_after_snapshot(redis_client, gacha_season, monkeypatch):
+    """
+    Бросок допущен до сверки, а записан после выборки из базы:
+    сверка не должна удалять его из окна. Удаляются только несуществующие
+    броски и зависшие резервы.
+    """
+    roll = UserRoll.objects.create(
+        user=gacha_season.user,
+        bot=gacha_season.bot,
+        card=gacha_season.cards[0],
+        season=gacha_season.season,
+    )
+    missing_id = UserRoll.objects.order_by("-id").values_list("id", flat=True).first() + 1000
+
+    now_ms = int(time.time() * 1000)
+    admitted_ms = now_ms - 1000
+    window_key = f"roll:window:{gacha_season.user.tg_id}:{gacha_season.bot.id}"
+    tasks.redis_client.zadd(window_key, {
+        f"u:{roll.id}": admitted_ms,
+        f"u:{missing_id}": admitted_ms,
+        "r:old:1": now_ms - tasks.STALE_RESERVATION_MS - 60_000,
+        "r:fresh:1": admitted_ms,
+    })
+    # Выборка сделана до коммита броска
+    monkeypatch.setattr(tasks, "_load_db_windows", lambda: {})
+
+    tasks.reconcile_roll_windows()
+
+    assert set(tasks.redis_client.zrange(window_key, 0, -1)) == {f"u:{roll.id}", "r:fresh:1"}
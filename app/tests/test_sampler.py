@@ -0,0 +1,117 @@
+# tests/test_sampler.py
+import random
+from collections import Counter
+from types import SimpleNamespace
+
+import pytest
+
+from roster.services.sampler import CardSampler, MIN_REJECTION_MASS
+
+
+DRAWS = 50000
+# Допуск на частоту при DRAWS бросках (несколько стандартных отклонений)
+TOLERANCE = 0.015
+
+
+def make_cards(n):
+    return [SimpleNamespace(id=card_id) for card_id in range(1, n + 1)]
+
+
+def frequencies(cards):
+    counter = Counter(card.id for card in cards)
+    return {card_id: count / len(cards) for card_id, count in counter.items()}
+
+
+@pytest.fixture(autouse=True)
+def seeded_random():
+    state = random.getstate()
+    random.seed(20240601)
+    yield
+    random.setstate(state)
+
+
+@pytest.mark.parametrize("weights", [
+    [1, 1, 1, 1],
+    [0.5, 1 / 6, 1 / 24, 1 / 120, 1 / 720],
+    [10, 0, 3, 0.001],
+])
+def test_alias_table_reproduces_probabilities(weights):
+    """Алиас-таблица в сумме дает ровно исходные вероятности"""
+    sampler = CardSampler(make_cards(len(weights)), weights)
+    n = len(weights)
+
+    restored = [sampler.prob[i] / n for i in range(n)]
+    for i in range(n):
+        if sampler.prob[i] < 1.0:
+            restored[sampler.alias[i]] += (1.0 - sampler.prob[i]) / n
+
+    assert restored == pytest.approx(sampler.probabilities, abs=1e-9)
+
+
+def test_alias_draw_distribution():
+    """Частоты бросков совпадают с весами"""
+    weights = [6, 3, 1, 0]
+    sampler = CardSampler(make_cards(4), weights)
+
+    freq = frequencies(sampler.draw(DRAWS))
+
+    assert 4 not in freq
+    for card_id, weight in zip((1, 2, 3), weights):
+        assert freq[card_id] == pytest.approx(weight / 10, abs=TOLERANCE)
+
+
+def test_zero_weights_fall_back_to_uniform():
+    """Все веса нулевые — бросок не падает, карты выпадают равномерно"""
+    sampler = CardSampler(make_cards(4), [0, 0, 0, 0])
+
+    freq = frequencies(sampler.draw(DRAWS))
+
+    assert set(freq) == {1, 2, 3, 4}
+    for value in freq.values():
+        assert value == pytest.approx(0.25, abs=TOLERANCE)
+
+
+def test_empty_sampler_draws_nothing():
+    assert CardSampler([], []).draw(3) == []
+
+
+def test_craft_rejection_sampling_skips_excluded():
+    """Крафт с небольшой исключенной массой: повторный бросок, пропорции остальных сохраняются"""
+    weights = [4, 3, 2, 1]
+    sampler = CardSampler(make_cards(4), weights)
+    exclude = {1}
+    assert 1 - 0.4 >= MIN_REJECTION_MASS
+
+    freq = frequencies(sampler.draw(DRAWS, exclude=exclude))
+
+    assert 1 not in freq
+    for card_id, weight in zip((2, 3, 4), (3, 2, 1)):
+        assert freq[card_id] == pytest.approx(weight / 6, abs=TOLERANCE)
+
+
+def test_craft_almost_complete_uses_remaining_cards():
+    """Исключено почти всё: выборка строится по оставшимся картам с их весами"""
+    weights = [50, 40, 6, 3, 1]
+    sampler = CardSampler(make_cards(5), weights)
+    exclude = {1, 2}
+    assert 1 - 0.9 < MIN_REJECTION_MASS
+
+    freq = frequencies(sampler.draw(DRAWS, exclude=exclude))
+
+    assert set(freq) == {3, 4, 5}
+    for card_id, weight in zip((3, 4, 5), (6, 3, 1)):
+        assert freq[card_id] == pytest.approx(weight / 10, abs=TOLERANCE)
+
+
+def test_craft_remaining_zero_weights_do_not_fail():
+    """Оставшиеся карты с нулевым весом выпадают равномерно"""
+    sampler = CardSampler(make_cards(3), [1, 0, 0])
+
+    freq = frequencies(sampler.draw(DRAWS, exclude={1}))
+
+    assert set(freq) == {2, 3}
+
+
+def test_craft_everything_collected():
+    sampler = CardSampler(make_cards(2), [1, 1])
+    assert sampler.draw(2, exclude={1, 2}) == []
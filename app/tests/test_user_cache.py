@@ -0,0 +1,87 @@
+# tests/test_user_cache.py
+import asyncio
+from types import SimpleNamespace
+
+import pytest
+
+from tg_bot.models import TgUser
+from tg_bot.services.user_cache import TgUserCache
+
+
+TG_ID = 990101
+
+
+def run(coro):
+    return asyncio.get_event_loop().run_until_complete(coro)
+
+
+def tg_user(**profile):
+    """Пользователь Telegram, как он приходит в апдейте"""
+    defaults = {"username": "cache_test", "first_name": "Кэш", "last_name": None, "language_code": "ru", "is_bot": False}
+    return SimpleNamespace(id=TG_ID, **{**defaults, **profile})
+
+
+@pytest.fixture
+def user_cache():
+    """
+    Кэш с проверкой версий на каждом обращении.
+    Асинхронный ORM пишет мимо транзакции теста, поэтому пользователя удаляем явно.
+    """
+    cache = TgUserCache(version_check_interval=0)
+    yield cache
+    if cache._flush_task:
+        cache._flush_task.cancel()
+    run(TgUser.objects.filter(tg_id=TG_ID).adelete())
+
+
+@pytest.mark.django_db
+def test_cached_user_is_built_without_query(user_cache, mocker):
+    """Повторный апдейт с тем же профилем не ходит в базу"""
+    created = run(user_cache.get_user(tg_user()))
+
+    get_or_create = mocker.patch.object(TgUser.objects, "aget_or_create")
+    cached = run(user_cache.get_user(tg_user()))
+
+    get_or_create.assert_not_called()
+    assert cached.pk == created.pk
+    assert cached.first_name == "Кэш"
+
+
+@pytest.mark.django_db
+def test_full_save_of_cached_user_keeps_created_at(user_cache):
+    """Полный asave() собранного из кэша пользователя не затирает created_at"""
+    created = run(user_cache.get_user(tg_user()))
+    cached = run(user_cache.get_user(tg_user()))
+
+    cached.first_name = "Новое имя"
+    run(cached.asave())
+
+    stored = run(TgUser.objects.aget(pk=created.pk))
+    assert stored.first_name == "Новое имя"
+    assert stored.created_at == created.created_at
+    assert stored.updated_at is not None
+
+
+@pytest.mark.django_db
+def test_changed_profile_is_written_on_flush(user_cache):
+    """Изменившийся профиль копится и пишется при flush()"""
+    created = run(user_cache.get_user(tg_user()))
+    run(user_cache.get_user(tg_user(first_name="Переименован")))
+
+    assert run(TgUser.objects.aget(pk=created.pk)).first_name == "Кэш"
+
+    run(user_cache.flush())
+
+    assert run(TgUser.objects.aget(pk=created.pk)).first_name == "Переименован"
+
+
+@pytest.mark.django_db
+def test_deleted_user_is_dropped_from_cache(user_cache):
+    """После удаления TgUser кэш не отдает старый pk, а создает пользователя заново"""
+    created = run(user_cache.get_user(tg_user()))
+    run(TgUser.objects.filter(pk=created.pk).adelete())
+
+    recreated = run(user_cache.get_user(tg_user()))
+
+    assert recreated.pk != created.pk
+    assert run(TgUser.objects.filter(pk=recreated.pk).aexists())
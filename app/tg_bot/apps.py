@@ -7,4 +7,7 @@ from django.core.management import call_command
 from server.logger import logger
 
 class TgBotConfig(AppConfig):
-    name = 'tg_bot'
\ No newline at end of file
+    name = 'tg_bot'
+
+    def ready(self):
+        from tg_bot import signals  # noqa: F401
@@ -8,4 +8,8 @@ class AbstractBot(ABC):
 
     @abstractmethod
     def get_handlers(self):
+        pass
+
+    async def warmup(self):
+        """Вызывается один раз после инициализации приложения: прогрев кэшей бота."""
         pass
\ No newline at end of file
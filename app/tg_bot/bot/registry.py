@@ -0,0 +1,23 @@
+# tg_bot/bot/registry.py
+from functools import lru_cache
+
+from django.utils.module_loading import import_string
+
+
+# Классы ботов по значению Bot.bot_type. Модуль бота импортируется только при
+# первом запросе его класса: процесс cardparser не тянет openai/tiktoken/PIL
+# бота таро, а процесс таро — curl_cffi парсера.
+BOT_CLASSES = {
+    "ParserBot": "cardparser.bot.parser.ParserBot",
+    "TarotBot": "tarot.bot.tarot.TarotBot",
+    "GachaBot": "roster.bot.roster.GachaBot",
+}
+
+
+@lru_cache(maxsize=None)
+def get_bot_class(bot_type: str):
+    """Класс бота по bot_type или None, если такого типа нет."""
+    path = BOT_CLASSES.get(bot_type)
+    if path is None:
+        return None
+    return import_string(path)
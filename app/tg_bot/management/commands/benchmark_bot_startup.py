@@ -0,0 +1,84 @@
+# tg_bot/management/commands/benchmark_bot_startup.py
+import json
+import os
+import subprocess
+import sys
+
+from django.core.management.base import BaseCommand, CommandError
+
+from tg_bot.bot.registry import BOT_CLASSES
+
+
+# Замер в чистом интерпретаторе: уже загруженные в этот процесс модули не должны влиять
+PROBE_SCRIPT = """
+import json
+import resource
+import sys
+import time
+
+started = time.perf_counter()
+import django
+django.setup()
+import tg_bot.tasks
+setup_time = time.perf_counter() - started
+
+from tg_bot.bot.registry import get_bot_class, BOT_CLASSES
+bot_types = sys.argv[1:] or list(BOT_CLASSES)
+started = time.perf_counter()
+for bot_type in bot_types:
+    get_bot_class(bot_type)()
+bot_time = time.perf_counter() - started
+
+print(json.dumps({
+    "setup": setup_time,
+    "bot": bot_time,
+    # ru_maxrss в Linux — в килобайтах
+    "rss_mb": resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024,
+    "heavy": [name for name in HEAVY_MODULES if name in sys.modules],
+}))
+"""
+
+HEAVY_MODULES = ["openai", "tiktoken", "PIL", "bs4", "curl_cffi"]
+
+
+class Command(BaseCommand):
+    help = 'Замеряет время запуска и память процесса бота для каждого типа (как в start_bot_processing)'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--bot-type',
+            choices=list(BOT_CLASSES),
+            help='Замерить только этот тип бота',
+        )
+        parser.add_argument(
+            '--repeat',
+            type=int,
+            default=3,
+            help='Сколько запусков на тип, берется лучший (по умолчанию: 3)',
+        )
+
+    def handle(self, *args, **options):
+        bot_types = [options['bot_type']] if options['bot_type'] else list(BOT_CLASSES)
+        # Последняя строка — все боты в одном процессе, как было до ленивого реестра
+        cases = [(bot_type, [bot_type]) for bot_type in bot_types] + [('все типы', list(BOT_CLASSES))]
+
+        self.stdout.write(f"{'Тип':<12} {'django.setup':>13} {'класс бота':>11} {'RSS, МБ':>9}  Тяжелые модули")
+        for title, case_types in cases:
+            runs = [self.probe(case_types) for _ in range(options['repeat'])]
+            best = min(runs, key=lambda run: run['setup'] + run['bot'])
+            self.stdout.write(
+                f"{title:<12} {best['setup'] * 1000:>10.0f} мс {best['bot'] * 1000:>8.0f} мс "
+                f"{best['rss_mb']:>9.1f}  {', '.join(best['heavy']) or '—'}"
+            )
+
+    def probe(self, bot_types) -> dict:
+        script = f"HEAVY_MODULES = {HEAVY_MODULES!r}\n{PROBE_SCRIPT}"
+        result = subprocess.run(
+            [sys.executable, '-c', script, *bot_types],
+            capture_output=True,
+            text=True,
+            env={**os.environ, 'DJANGO_SETTINGS_MODULE': os.environ.get('DJANGO_SETTINGS_MODULE', 'server.settings')},
+        )
+        if result.returncode != 0:
+            raise CommandError(f"Замер {', '.join(bot_types)} упал:\n{result.stderr}")
+        return json.loads(result.stdout.strip().splitlines()[-1])
@@ -28,6 +28,9 @@ class BotFile(models.Model):
         unique_together = ("bot", "file_id")
 
 
+DEFAULT_FILE_URL = "https://upload.wikimedia.org/wikipedia/commons/thumb/3/3a/Cat03.jpg/960px-Cat03.jpg"
+
+
 class BotFileMixin:
     """Миксин для асинхронного получения файла бота"""
 
@@ -35,7 +38,7 @@ class BotFileMixin:
         self,
         bot_id,
         field_name="files",
-        default="https://upload.wikimedia.org/wikipedia/commons/thumb/3/3a/Cat03.jpg/960px-Cat03.jpg",
+        default=DEFAULT_FILE_URL,
     ):
         # Оборачиваем получение менеджера, так как это вызывает синхронный запрос к контент-тайпам
         manager = await sync_to_async(lambda: getattr(self, field_name))()
@@ -49,6 +52,23 @@ class BotFileMixin:
         
         return default
 
+    @classmethod
+    async def aget_file_ids(cls, objects, bot_id, default=DEFAULT_FILE_URL) -> dict:
+        """file_id для нескольких объектов одним запросом: {pk объекта: file_id}."""
+        content_type = await sync_to_async(ContentType.objects.get_for_model)(cls)
+        object_ids = {obj.pk for obj in objects}
+
+        file_ids = {}
+        async for object_id, file_id in BotFile.objects.filter(
+            content_type=content_type,
+            object_id__in=object_ids,
+            bot_id=bot_id,
+        ).order_by("id").values_list("object_id", "file_id"):
+            # Как в aget_file_id: при нескольких файлах берется первый
+            file_ids.setdefault(object_id, file_id)
+
+        return {object_id: file_ids.get(object_id, default) for object_id in object_ids}
+
 def get_default_expires_at():
     """Возвращает время истечения по умолчанию (через 10 минут)."""
     return timezone.now() + timezone.timedelta(minutes=10)
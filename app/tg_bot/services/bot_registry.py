@@ -0,0 +1,157 @@
+# tg_bot/services/bot_registry.py
+import os
+import json
+import time
+import asyncio
+from datetime import datetime
+
+import redis.asyncio as aioredis
+
+from server.logger import logger
+
+
+redis_client = aioredis.StrictRedis(
+    host=os.getenv("REDIS_HOST", "localhost"),
+    port=int(os.getenv("REDIS_PORT", 6379)),
+    db=2,
+    decode_responses=True,
+)
+
+RUNNING_BOTS_KEY = "running_bots"
+HEARTBEATS_KEY = "running_bots:heartbeats"
+EVENTS_CHANNEL = "running_bots:events"
+
+HEARTBEAT_INTERVAL = 15
+HEARTBEAT_TTL = 45
+
+# Обновляет heartbeat бота и удаляет ботов, которые давно не отзывались.
+# KEYS: hash с данными ботов, zset с временем heartbeat, канал событий.
+# ARGV: bot_id, текущее время, JSON с данными бота, граница "мертвых" ботов.
+# О любых изменениях состава (новый бот / удаленные боты) публикуется событие.
+HEARTBEAT_LUA = """
+local added = redis.call('ZADD', KEYS[2], ARGV[2], ARGV[1])
+redis.call('HSET', KEYS[1], ARGV[1], ARGV[3])
+local dead = redis.call('ZRANGEBYSCORE', KEYS[2], '-inf', ARGV[4])
+for _, bot_id in ipairs(dead) do
+    redis.call('HDEL', KEYS[1], bot_id)
+end
+if #dead > 0 then
+    redis.call('ZREMRANGEBYSCORE', KEYS[2], '-inf', ARGV[4])
+end
+if added == 1 or #dead > 0 then
+    redis.call('PUBLISH', KEYS[3], 'changed')
+end
+return #dead
+"""
+
+
+class BotRegistry:
+    """
+    Реестр запущенных ботов в Redis.
+
+    Каждый бот регистрируется и раз в HEARTBEAT_INTERVAL секунд обновляет
+    heartbeat. Боты без heartbeat дольше HEARTBEAT_TTL удаляются автоматически.
+    Читатели работают с локальным снимком, который сбрасывается по событию
+    из канала EVENTS_CHANNEL (или по истечении HEARTBEAT_TTL).
+    """
+
+    def __init__(self, client=redis_client):
+        self.client = client
+        self.heartbeat_script = client.register_script(HEARTBEAT_LUA)
+        self._snapshot = None
+        self._snapshot_at = 0.0
+        # Растет при каждом сбросе снимка: загрузка, начатая до сброса, не сохраняется
+        self._generation = 0
+        self._listener_task = None
+
+    async def heartbeat(self, bot_id, bot_info: dict):
+        now_ts = time.time()
+        removed = await self.heartbeat_script(
+            keys=[RUNNING_BOTS_KEY, HEARTBEATS_KEY, EVENTS_CHANNEL],
+            args=[bot_id, now_ts, json.dumps(bot_info), now_ts - HEARTBEAT_TTL],
+        )
+        if removed:
+            logger.info(f"Из реестра удалено неактивных ботов: {removed}")
+
+    async def register(self, bot_id, username, bot_type):
+        """Регистрирует бота и возвращает его данные для последующих heartbeat."""
+        bot_info = {
+            'bot_id': bot_id,
+            'username': username,
+            'type': bot_type,
+            'started_at': datetime.now().isoformat(),
+        }
+        await self.heartbeat(bot_id, bot_info)
+        return bot_info
+
+    async def unregister(self, bot_id):
+        async with self.client.pipeline(transaction=True) as pipe:
+            pipe.hdel(RUNNING_BOTS_KEY, bot_id)
+            pipe.zrem(HEARTBEATS_KEY, bot_id)
+            pipe.publish(EVENTS_CHANNEL, "changed")
+            await pipe.execute()
+
+    async def run_heartbeat(self, bot_id, bot_info: dict):
+        """Бесконечный цикл heartbeat, запускается отдельной задачей рядом с ботом."""
+        while True:
+            await asyncio.sleep(HEARTBEAT_INTERVAL)
+            try:
+                await self.heartbeat(bot_id, bot_info)
+            except Exception as e:
+                logger.error(f"Ошибка heartbeat бота {bot_id}: {e}")
+
+    async def _listen_events(self):
+        pubsub = self.client.pubsub()
+        await pubsub.subscribe(EVENTS_CHANNEL)
+        try:
+            async for message in pubsub.listen():
+                if message['type'] == 'message':
+                    self.invalidate()
+        except Exception as e:
+            logger.warning(f"Подписка на события реестра ботов прервана: {e}")
+        finally:
+            self.invalidate()
+            await pubsub.aclose()
+
+    def invalidate(self):
+        self._snapshot = None
+        self._generation += 1
+
+    def _ensure_listener(self):
+        if self._listener_task is None or self._listener_task.done():
+            self._listener_task = asyncio.create_task(self._listen_events())
+
+    async def _load_snapshot(self) -> dict:
+        async with self.client.pipeline(transaction=False) as pipe:
+            pipe.zrangebyscore(HEARTBEATS_KEY, time.time() - HEARTBEAT_TTL, "+inf")
+            pipe.hgetall(RUNNING_BOTS_KEY)
+            alive_ids, all_bots = await pipe.execute()
+
+        alive_ids = set(alive_ids)
+        return {
+            int(bot_id): json.loads(bot_info_json)
+            for bot_id, bot_info_json in all_bots.items()
+            if bot_id in alive_ids
+        }
+
+    async def get_bots(self, bot_type: str | None = None) -> list[dict]:
+        """Возвращает живых ботов (опционально — только указанного типа)."""
+        self._ensure_listener()
+
+        snapshot = self._snapshot
+        if snapshot is None or time.monotonic() - self._snapshot_at > HEARTBEAT_TTL:
+            generation = self._generation
+            snapshot = await self._load_snapshot()
+            # Если пока шла загрузка пришло событие, снимок мог устареть:
+            # отдаем его этому вызову, но не кэшируем
+            if generation == self._generation:
+                self._snapshot = snapshot
+                self._snapshot_at = time.monotonic()
+
+        return [
+            bot_info for bot_info in snapshot.values()
+            if bot_type is None or bot_info.get('type') == bot_type
+        ]
+
+
+bot_registry = BotRegistry()
@@ -0,0 +1,197 @@
+# tg_bot/services/user_cache.py
+import os
+import time
+import asyncio
+import hashlib
+from collections import OrderedDict
+
+import redis.asyncio as aioredis
+from django.utils.timezone import now
+
+from tg_bot.models import TgUser
+from tg_bot.services.versioned_cache import (
+    VersionedCache, VERSION_CHECK_INTERVAL, bump_version, sync_redis_client,
+)
+from server.logger import logger
+
+
+redis_client = aioredis.StrictRedis(
+    host=os.getenv("REDIS_HOST", "localhost"),
+    port=int(os.getenv("REDIS_PORT", 6379)),
+    db=2,
+    decode_responses=True,
+)
+
+REDIS_KEY_TEMPLATE = "tg_user:{tg_id}"
+REDIS_TTL_SECONDS = 60 * 60 * 24
+LOCAL_TTL_SECONDS = 60 * 10
+LOCAL_MAX_SIZE = 10000
+FLUSH_INTERVAL = 5
+
+PROFILE_FIELDS = ("username", "first_name", "last_name", "language_code", "is_bot")
+
+# Область версий: при удалении пользователя локальные LRU всех процессов сбрасываются
+USERS_SCOPE = "tg_bot:users"
+
+
+def invalidate_user(tg_id):
+    """
+    Удаляет пользователя из кэша во всех процессах.
+    Синхронная — вызывается из сигналов модели.
+    """
+    try:
+        sync_redis_client.delete(REDIS_KEY_TEMPLATE.format(tg_id=tg_id))
+    except Exception as e:
+        logger.error(f"Не удалось удалить пользователя {tg_id} из Redis: {e}")
+    bump_version(USERS_SCOPE)
+
+
+def get_profile(tg_user) -> dict:
+    """Поля профиля TgUser из объекта пользователя Telegram."""
+    return {field: getattr(tg_user, field) for field in PROFILE_FIELDS}
+
+
+def get_fingerprint(profile: dict) -> str:
+    raw = "\x1f".join(str(profile[field]) for field in PROFILE_FIELDS)
+    return hashlib.md5(raw.encode()).hexdigest()[:16]
+
+
+class TgUserCache:
+    """
+    Кэш tg_id -> pk пользователя (LRU в процессе + Redis).
+
+    Вместе с pk хранится отпечаток профиля Telegram: если он совпал,
+    пользователь собирается из данных апдейта без запроса к базе.
+    Изменившиеся профили копятся и пишутся одним bulk_update
+    раз в FLUSH_INTERVAL секунд.
+    """
+
+    def __init__(self, client=redis_client, version_check_interval=VERSION_CHECK_INTERVAL):
+        self.client = client
+        self.versions = VersionedCache(client, check_interval=version_check_interval)
+        self._version = None
+        self._local = OrderedDict()
+        self._pending = {}
+        self._flush_task = None
+
+    def _build_user(self, pk, tg_id, profile: dict) -> TgUser:
+        # created_at отложено (deferred): полный asave() обновит только
+        # загруженные поля и не затрет дату создания, а updated_at выставит auto_now
+        return TgUser.from_db(
+            "default",
+            ["id", "tg_id", *PROFILE_FIELDS, "updated_at"],
+            [pk, tg_id, *(profile[field] for field in PROFILE_FIELDS), None],
+        )
+
+    async def _check_version(self):
+        version = await self.versions.get_versions([USERS_SCOPE])
+        if version != self._version:
+            self._local.clear()
+            self._version = version
+
+    def _get_local(self, tg_id):
+        entry = self._local.get(tg_id)
+        if entry is None:
+            return None
+        pk, fingerprint, cached_at = entry
+        if time.monotonic() - cached_at > LOCAL_TTL_SECONDS:
+            del self._local[tg_id]
+            return None
+        self._local.move_to_end(tg_id)
+        return pk, fingerprint
+
+    def _set_local(self, tg_id, pk, fingerprint):
+        self._local[tg_id] = (pk, fingerprint, time.monotonic())
+        self._local.move_to_end(tg_id)
+        while len(self._local) > LOCAL_MAX_SIZE:
+            self._local.popitem(last=False)
+
+    async def _remember(self, tg_id, pk, fingerprint):
+        self._set_local(tg_id, pk, fingerprint)
+        try:
+            await self.client.set(
+                REDIS_KEY_TEMPLATE.format(tg_id=tg_id),
+                f"{pk}:{fingerprint}",
+                ex=REDIS_TTL_SECONDS,
+            )
+        except Exception as e:
+            logger.warning(f"Не удалось сохранить пользователя {tg_id} в Redis: {e}")
+
+    async def _get_cached(self, tg_id):
+        await self._check_version()
+        cached = self._get_local(tg_id)
+        if cached:
+            return cached
+        try:
+            value = await self.client.get(REDIS_KEY_TEMPLATE.format(tg_id=tg_id))
+        except Exception as e:
+            logger.warning(f"Не удалось прочитать пользователя {tg_id} из Redis: {e}")
+            return None
+        if not value:
+            return None
+        pk, fingerprint = value.split(":", 1)
+        self._set_local(tg_id, int(pk), fingerprint)
+        return int(pk), fingerprint
+
+    def _schedule_update(self, user: TgUser, fingerprint: str):
+        self._pending[user.tg_id] = (user, fingerprint)
+        if self._flush_task is None or self._flush_task.done():
+            self._flush_task = asyncio.create_task(self._flush_later())
+
+    async def _flush_later(self):
+        await asyncio.sleep(FLUSH_INTERVAL)
+        await self.flush()
+
+    async def flush(self):
+        """Записывает накопленные изменения профилей одним запросом."""
+        if not self._pending:
+            return
+        pending, self._pending = self._pending, {}
+
+        users = []
+        for user, _ in pending.values():
+            user.updated_at = now()
+            users.append(user)
+        try:
+            await TgUser.objects.abulk_update(users, [*PROFILE_FIELDS, "updated_at"])
+        except Exception as e:
+            logger.error(f"Ошибка пакетного обновления пользователей: {e}")
+            return
+
+        # Отпечаток запоминаем только после записи: до этого момента
+        # изменения снова попадут в очередь при следующем апдейте.
+        for tg_id, (user, fingerprint) in pending.items():
+            await self._remember(tg_id, user.pk, fingerprint)
+
+    async def get_user(self, tg_user) -> TgUser:
+        """
+        Возвращает TgUser для пользователя Telegram.
+        При попадании в кэш created_at не загружено, а updated_at пусто
+        до первого сохранения.
+        """
+        profile = get_profile(tg_user)
+        fingerprint = get_fingerprint(profile)
+
+        cached = await self._get_cached(tg_user.id)
+        if cached:
+            pk, cached_fingerprint = cached
+            user = self._build_user(pk, tg_user.id, profile)
+            if cached_fingerprint != fingerprint:
+                self._schedule_update(user, fingerprint)
+            return user
+
+        user, created = await TgUser.objects.aget_or_create(
+            tg_id=tg_user.id,
+            defaults=profile,
+        )
+        if not created and any(getattr(user, field) != value for field, value in profile.items()):
+            self._schedule_update(self._build_user(user.pk, tg_user.id, profile), fingerprint)
+            for field, value in profile.items():
+                setattr(user, field, value)
+            return user
+
+        await self._remember(tg_user.id, user.pk, fingerprint)
+        return user
+
+
+tg_user_cache = TgUserCache()
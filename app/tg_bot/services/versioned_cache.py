@@ -0,0 +1,88 @@
+# tg_bot/services/versioned_cache.py
+import os
+import time
+
+import redis
+import redis.asyncio as aioredis
+
+from server.logger import logger
+
+
+redis_client = aioredis.StrictRedis(
+    host=os.getenv("REDIS_HOST", "localhost"),
+    port=int(os.getenv("REDIS_PORT", 6379)),
+    db=2,
+    decode_responses=True,
+)
+sync_redis_client = redis.StrictRedis(
+    host=os.getenv("REDIS_HOST", "localhost"),
+    port=int(os.getenv("REDIS_PORT", 6379)),
+    db=2,
+    decode_responses=True,
+)
+
+VERSION_KEY_TEMPLATE = "cache_version:{scope}"
+VERSION_CHECK_INTERVAL = 5
+
+
+def bump_version(*scopes):
+    """
+    Инвалидирует кэши указанных областей во всех процессах.
+    Синхронная — вызывается из сигналов моделей (админка, миграции, команды).
+    """
+    for scope in scopes:
+        try:
+            sync_redis_client.incr(VERSION_KEY_TEMPLATE.format(scope=scope))
+        except Exception as e:
+            logger.error(f"Не удалось сбросить версию кэша {scope}: {e}")
+
+
+class VersionedCache:
+    """
+    Кэш в памяти процесса для данных, которые редко меняются через админку.
+
+    Каждое значение привязано к версиям своих областей (scope) в Redis.
+    Версии перечитываются не чаще раза в VERSION_CHECK_INTERVAL секунд,
+    при изменении версии значение строится заново через loader.
+    """
+
+    def __init__(self, client=redis_client, check_interval=VERSION_CHECK_INTERVAL):
+        self.client = client
+        self.check_interval = check_interval
+        self._values = {}
+        self._versions = {}
+
+    async def get_versions(self, scopes) -> tuple:
+        now_ts = time.monotonic()
+        stale = [
+            scope for scope in scopes
+            if now_ts - self._versions.get(scope, (None, 0.0))[1] > self.check_interval
+        ]
+        if stale:
+            try:
+                values = await self.client.mget([VERSION_KEY_TEMPLATE.format(scope=scope) for scope in stale])
+            except Exception as e:
+                # Без Redis продолжаем со старыми версиями, чтобы не ронять хэндлеры
+                logger.warning(f"Не удалось прочитать версии кэша {stale}: {e}")
+                values = [self._versions.get(scope, ("0", 0.0))[0] for scope in stale]
+            for scope, value in zip(stale, values):
+                self._versions[scope] = (value or "0", now_ts)
+        return tuple(self._versions[scope][0] for scope in scopes)
+
+    async def get(self, key, loader, scopes):
+        """Возвращает значение по ключу, вызывая loader() при промахе или смене версий."""
+        versions = await self.get_versions(scopes)
+        cached = self._values.get(key)
+        if cached is not None and cached[0] == versions:
+            return cached[1]
+
+        value = await loader()
+        self._values[key] = (versions, value)
+        return value
+
+    def invalidate(self, key=None):
+        """Сбрасывает локальное значение (или все значения) в этом процессе."""
+        if key is None:
+            self._values.clear()
+        else:
+            self._values.pop(key, None)
@@ -0,0 +1,12 @@
+# tg_bot/signals.py
+from django.db.models.signals import post_delete
+from django.dispatch import receiver
+
+from tg_bot.models import TgUser
+from tg_bot.services.user_cache import invalidate_user
+
+
+@receiver(post_delete, sender=TgUser)
+def on_user_deleted(sender, instance, **kwargs):
+    """Удаленный пользователь не должен собираться из кэша по старому pk."""
+    invalidate_user(instance.tg_id)
@@ -2,7 +2,6 @@ import os
 import redis.asyncio as redis
 import asyncio
 import json
-from datetime import datetime
 
 from django.urls import reverse
 from django.conf import settings
@@ -14,9 +13,10 @@ from telegram.ext import ApplicationBuilder, CommandHandler
 from telegram import Update
 
 from tg_bot.models import Bot
-from cardparser.bot.parser import ParserBot
-from tarot.bot.tarot import TarotBot
-from roster.bot.roster import GachaBot
+from tg_bot.bot.registry import get_bot_class
+
+from tg_bot.services.bot_registry import bot_registry
+from tg_bot.services.user_cache import tg_user_cache
 
 from server.logger import logger
 
@@ -32,7 +32,7 @@ redis_client = redis.StrictRedis(
 
 # Асинхронная обработка бота
 async def run_bot(token, app_bot_id, handlersClass):
-    bot_class = globals().get(handlersClass)
+    bot_class = get_bot_class(handlersClass)
     if not bot_class:
         logger.error(f"Класс {handlersClass} не найден")
         return
@@ -71,6 +71,12 @@ async def run_bot(token, app_bot_id, handlersClass):
     for handler in handlers:
         app.add_handler(handler)
 
+    try:
+        await bot_instance.warmup()
+    except Exception as e:
+        # Кэши догрузятся при первом обращении
+        logger.warning(f"Не удалось прогреть кэши бота {app_bot_id}: {e}")
+
     webhook_url = reverse(viewname="webhook", kwargs={"token": token})
     webhook_url = "".join([settings.TG_WEBHOOK_HOST, webhook_url])
     logger.info(f"Попытка установить вебхук {webhook_url}")
@@ -95,13 +101,8 @@ async def run_bot(token, app_bot_id, handlersClass):
         logger.error(f"Ошибка при обновлении username бота: {e}")
         bot_username = None
     
-    bot_info = {
-        'bot_id': app_bot_id,
-        'username': app.bot.username,
-        'type': handlersClass,
-        'started_at': datetime.now().isoformat(),
-    }
-    await redis_client.hset("running_bots", app_bot_id, json.dumps(bot_info))
+    bot_info = await bot_registry.register(app_bot_id, app.bot.username, handlersClass)
+    heartbeat_task = asyncio.create_task(bot_registry.run_heartbeat(app_bot_id, bot_info))
     logger.info(f"Бот {app_bot_id} зарегистрирован в Redis")
 
     pubsub = redis_client.pubsub()
@@ -126,8 +127,26 @@ async def run_bot(token, app_bot_id, handlersClass):
     except Exception as e:
         logger.error(f"Ошибка в подписке бота {token}: {e}", exc_info=True)
     finally:
-        await pubsub.unsubscribe(channel_name)
-        await pubsub.close()
+        # Каждый шаг отдельно: сбой одного не должен оставлять бота в реестре
+        # или незакрытую подписку
+        heartbeat_task.cancel()
+        try:
+            # Отложенные изменения профилей иначе пропадут вместе с процессом
+            await tg_user_cache.flush()
+        except Exception as e:
+            logger.error(f"Не удалось записать профили пользователей бота {app_bot_id}: {e}")
+        try:
+            await bot_registry.unregister(app_bot_id)
+        except Exception as e:
+            logger.error(f"Не удалось удалить бота {app_bot_id} из реестра: {e}")
+        try:
+            await pubsub.unsubscribe(channel_name)
+        except Exception as e:
+            logger.error(f"Не удалось отписаться от канала {channel_name}: {e}")
+        try:
+            await pubsub.aclose()
+        except Exception as e:
+            logger.error(f"Не удалось закрыть подписку бота {app_bot_id}: {e}")
 
 
 @shared_task(bind=True)